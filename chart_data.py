@@ -0,0 +1,160 @@
+"""
+Downsampled, range-queryable views of the results payload for the charts.
+Each series gets a multi-resolution pyramid built once per results version: line series are
+thinned level by level with LTTB (Largest-Triangle-Three-Buckets), OHLC bars are merged in
+fixed blocks of BLOCK bars keeping open/high/low/close. A query picks the coarsest level that
+still resolves the requested range at the requested point count, so its cost depends on the
+points returned rather than on the length of the run.
+"""
+import threading
+
+import numpy as np
+
+LINE_SERIES = ("portfolioHistory", "actions", "positions")
+BLOCK = 4  # bars merged per pyramid level
+MIN_LEVEL_POINTS = 256  # line levels stop here; queries LTTB the chosen level down to any size
+
+
+def lttb(x, y, n_out):
+    """Indices of the n_out points LTTB keeps from (x, y); every index if n_out >= len(x)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    every = (n - 2) / (n_out - 2)
+    bounds = (np.floor(np.arange(n_out - 1) * every) + 1).astype(np.int64)
+    bounds[-1] = n - 1
+    # Mean of every bucket at once; the last bucket's "next" is the final point
+    sizes = np.diff(bounds)
+    avg_x = np.r_[np.add.reduceat(x[:n - 1], bounds[:-1])[1:] / sizes[1:], x[n - 1]]
+    avg_y = np.r_[np.add.reduceat(y[:n - 1], bounds[:-1])[1:] / sizes[1:], y[n - 1]]
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start, end = bounds[i], bounds[i + 1]
+        # Twice the triangle area between the last kept point, each candidate and the next bucket's mean
+        area = np.abs((x[a] - avg_x[i]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y[i] - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    keep[-1] = n - 1
+    return keep
+
+
+def _merge_ohlc(level):
+    starts = np.arange(0, len(level["open"]), BLOCK)
+    return {
+        "index": level["index"][starts],
+        "open": level["open"][starts],
+        "high": np.maximum.reduceat(level["high"], starts),
+        "low": np.minimum.reduceat(level["low"], starts),
+        "close": level["close"][np.r_[starts[1:], len(level["close"])] - 1],
+    }
+
+
+class ChartPyramid:
+    def __init__(self, payload):
+        self.metrics = payload.get("metrics") or {}
+        self.profile = payload.get("profile")
+        ohlc = payload.get("ohlc") or []
+        self.dates = np.array([bar["date"] for bar in ohlc], dtype=object)
+        self.date_keys = np.array(self.dates.tolist(), dtype="datetime64[ns]")
+
+        level = {"index": np.arange(len(ohlc))}
+        for field in ("open", "high", "low", "close"):
+            level[field] = np.array([bar[field] for bar in ohlc], dtype=np.float64)
+        self.ohlc_levels = [level]
+        while len(self.ohlc_levels[-1]["index"]) > BLOCK:
+            self.ohlc_levels.append(_merge_ohlc(self.ohlc_levels[-1]))
+
+        self.line_levels = {}
+        for name in LINE_SERIES:
+            y = np.asarray(payload.get(name) or [], dtype=np.float64)
+            levels = [(np.arange(len(y)), y)]
+            while len(levels[-1][0]) > MIN_LEVEL_POINTS:
+                x, values = levels[-1]
+                keep = lttb(x.astype(np.float64), values, max(MIN_LEVEL_POINTS, len(x) // BLOCK))
+                levels.append((x[keep], values[keep]))
+            self.line_levels[name] = levels
+
+    def summary(self):
+        """Metrics plus the extent of every series, so a chart can lay out its axes before fetching."""
+        return {
+            "metrics": self.metrics,
+            "start": self._date(0),
+            "end": self._date(len(self.dates) - 1),
+            "bars": len(self.dates),
+            "series": {name: len(levels[0][0]) for name, levels in self.line_levels.items()},
+        }
+
+    def index_range(self, start=None, end=None):
+        """Step indices [lo, hi) whose bar dates fall in [start, end]."""
+        lo = 0 if start is None else int(np.searchsorted(self.date_keys, np.datetime64(start), side="left"))
+        hi = len(self.date_keys) if end is None else int(np.searchsorted(self.date_keys, np.datetime64(end), side="right"))
+        return lo, hi
+
+    def _date(self, i):
+        return self.dates[i] if 0 <= i < len(self.dates) else None
+
+    def line(self, name, start=None, end=None, points=500):
+        lo, hi = self.index_range(start, end)
+        if end is None:
+            hi = max(hi, len(self.line_levels[name][0][0]))  # portfolioHistory has one extra point
+        levels = self.line_levels[name]
+        # Coarsest level that still has at least 2x the requested points inside the range
+        chosen = 0
+        for k in range(len(levels) - 1, -1, -1):
+            x = levels[k][0]
+            if np.searchsorted(x, hi) - np.searchsorted(x, lo) >= 2 * points or k == 0:
+                chosen = k
+                break
+        x, y = levels[chosen]
+        a, b = np.searchsorted(x, lo), np.searchsorted(x, hi)
+        x, y = x[a:b], y[a:b]
+        keep = lttb(x.astype(np.float64), y, points)
+        return {
+            "name": name,
+            "level": chosen,
+            "total": int(hi - lo),
+            "x": x[keep].tolist(),
+            "dates": [self._date(i) for i in x[keep].tolist()],
+            "y": y[keep].tolist(),
+        }
+
+    def ohlc(self, start=None, end=None, points=500):
+        """Bars in range, each merging BLOCK**level original bars, at most `points` of them."""
+        lo, hi = self.index_range(start, end)
+        for k, level in enumerate(self.ohlc_levels):
+            a = np.searchsorted(level["index"], lo, side="right") - 1 if lo else 0
+            b = np.searchsorted(level["index"], hi, side="left")
+            if b - a <= points or k == len(self.ohlc_levels) - 1:
+                break
+        a = max(int(a), 0)
+        bars = [
+            {"date": self._date(i), "open": o, "high": h, "low": l, "close": c}
+            for i, o, h, l, c in zip(level["index"][a:b].tolist(), level["open"][a:b].tolist(),
+                                     level["high"][a:b].tolist(), level["low"][a:b].tolist(),
+                                     level["close"][a:b].tolist())
+        ]
+        return {"level": k, "barsPerPoint": BLOCK ** k, "total": int(hi - lo), "ohlc": bars}
+
+
+class ChartData:
+    """ChartPyramid of a CachedJSONFile, rebuilt only when the file's ETag changes."""
+
+    def __init__(self, results_file):
+        self.results_file = results_file
+        self._etag = None
+        self._pyramid = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """(etag, ChartPyramid) for the current results, or None if there are none."""
+        snapshot = self.results_file.snapshot()
+        if snapshot is None:
+            return None
+        etag, data = snapshot
+        with self._lock:
+            if etag != self._etag:
+                self._pyramid = ChartPyramid(data)
+                self._etag = etag
+            return self._etag, self._pyramid
@@ -1,5 +1,6 @@
 import { useEffect, useRef } from "react";
-import { createChart, CandlestickSeries, type IChartApi } from "lightweight-charts";
+import { createChart, CandlestickSeries, type IChartApi, type Time, type UTCTimestamp } from "lightweight-charts";
+import { parseResultDate } from "@/data/td3Results";
 
 export interface OHLCItem {
   date: string;
@@ -73,7 +74,8 @@ export default function CandlestickChart({ data, height = 380, className = "" }:
     });
 
     const chartData = data.map((d) => {
-      const t = d.date.slice(0, 10);
+      // Daily bars keep their business day; intraday bars need a timestamp to stay distinct
+      const t: Time = d.date.length > 10 ? ((parseResultDate(d.date) / 1000) as UTCTimestamp) : d.date.slice(0, 10);
       return { time: t, open: d.open, high: d.high, low: d.low, close: d.close };
     });
     candlestickSeries.setData(chartData);
@@ -4,7 +4,7 @@ import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContai
 import { BarChart3 } from "lucide-react";
 import type { Stock } from "@/data/mockStocks";
 import { useQuery } from "@tanstack/react-query";
-import { fetchTD3Results } from "@/data/td3Results";
+import { barAt, barCount, fetchTD3Results } from "@/data/td3Results";
 
 interface StockChartProps {
   stock: Stock;
@@ -35,13 +35,16 @@ const StockChart = ({ stock }: StockChartProps) => {
     let hist = stock.historicalData;
 
     // For AAPL, if TD3 results are available, use real OHLC from TD3 output
-    if (stock.ticker === "AAPL" && td3?.ohlc?.length) {
-      const ohlc = td3.ohlc;
+    if (stock.ticker === "AAPL" && td3 && barCount(td3)) {
       const equity = td3.portfolioHistory;
-      const basePrice = ohlc[0]?.close ?? stock.currentPrice;
+      const basePrice = barAt(td3, 0)?.close ?? stock.currentPrice;
       const baseEquity = equity && equity.length > 0 ? equity[0] : 1;
 
-      hist = ohlc.map((bar, i) => {
+      // Only the bars in view are turned into rows (columnar results format dates per bar)
+      const first = Math.max(0, barCount(td3) - range);
+      hist = Array.from({ length: barCount(td3) - first }, (_, k) => {
+        const i = first + k;
+        const bar = barAt(td3, i)!;
         let predicted: number | undefined;
         if (equity && equity[i] != null && baseEquity !== 0) {
           const scaled = basePrice * (equity[i] / baseEquity);
@@ -59,7 +62,7 @@ const StockChart = ({ stock }: StockChartProps) => {
     // Thin out data for performance
     const step = Math.max(1, Math.floor(sliced.length / 80));
     return sliced.filter((_, i) => i % step === 0 || i === sliced.length - 1);
-  }, [stock, range]);
+  }, [stock, range, td3]);
 
   const currency = stock.exchange === "NASDAQ" ? "$" : "₹";
 
@@ -1,4 +1,4 @@
-import { useQuery } from "@tanstack/react-query";
+import { keepPreviousData, useQuery } from "@tanstack/react-query";
 import { motion } from "framer-motion";
 import {
   LineChart,
@@ -25,16 +25,165 @@ import {
   RefreshCw,
   Terminal,
   Gauge,
+  ZoomIn,
+  ZoomOut,
+  ChevronLeft,
+  ChevronRight,
+  Maximize2,
+  Square,
+  Timer,
 } from "lucide-react";
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { useQueryClient } from "@tanstack/react-query";
-import { fetchTD3Results, runTD3Model, type TD3Results } from "@/data/td3Results";
+import {
+  barDate,
+  cancelTD3Job,
+  fetchTD3OHLC,
+  fetchTD3Profile,
+  fetchTD3Results,
+  fetchTD3Series,
+  fetchTD3Summary,
+  parseResultDate,
+  rangeBetween,
+  resultBars,
+  runTD3Model,
+  type TD3Profile,
+  type TD3ResultsData,
+  type TD3SeriesName,
+  type TD3SeriesView,
+} from "@/data/td3Results";
 import { Button } from "@/components/ui/button";
 import { Skeleton } from "@/components/ui/skeleton";
 import { ScrollArea } from "@/components/ui/scroll-area";
 
-function RunOutput({ log, error }: { log: string[]; error?: string }) {
-  if (log.length === 0 && !error) return null;
+const MAX_LIVE_LOG_LINES = 500;
+// Points requested per chart view, about one per pixel of a full-width chart
+const CHART_POINTS = 600;
+// Zooming in stops once the view holds this many bars
+const MIN_VIEW_BARS = 20;
+const LINE_SERIES: TD3SeriesName[] = ["portfolioHistory", "actions", "positions"];
+
+function chartDate(date: string | null | undefined, index: number): string {
+  if (!date) return `${index}`;
+  const withTime = date.length > 10 ? { hour: "2-digit", minute: "2-digit" } as const : {};
+  return new Date(parseResultDate(date)).toLocaleString("en", { month: "short", day: "numeric", timeZone: "UTC", ...withTime });
+}
+
+function viewDate(ms: number): string {
+  return new Date(ms).toLocaleDateString("en", { year: "numeric", month: "short", day: "numeric", timeZone: "UTC" });
+}
+
+/** One row per step of either series, so the action and position lines share an axis. */
+function signalRows(actions: TD3SeriesView, positions: TD3SeriesView) {
+  const rows = new Map<number, { index: number; date: string; action?: number; position?: number }>();
+  const row = (x: number, date: string | null) => {
+    if (!rows.has(x)) rows.set(x, { index: x, date: chartDate(date, x) });
+    return rows.get(x)!;
+  };
+  actions.x.forEach((x, i) => { row(x, actions.dates[i]).action = actions.y[i]; });
+  positions.x.forEach((x, i) => { row(x, positions.dates[i]).position = positions.y[i]; });
+  return [...rows.values()].sort((a, b) => a.index - b.index);
+}
+
+/**
+ * The visible [start, end] in ms after scaling its span by `scale` (0.5 zooms in) and moving it
+ * by `shift` spans, kept inside `extent`; null once it covers the whole extent.
+ */
+function moveView(
+  view: [number, number],
+  extent: [number, number],
+  minSpan: number,
+  scale: number,
+  shift: number,
+): [number, number] | null {
+  const [lo, hi] = extent;
+  const span = Math.min(Math.max((view[1] - view[0]) * scale, minSpan), hi - lo);
+  const center = (view[0] + view[1]) / 2 + shift * (view[1] - view[0]);
+  const start = Math.min(Math.max(center - span / 2, lo), hi - span);
+  return span >= hi - lo ? null : [start, start + span];
+}
+
+function formatMicros(us: number): string {
+  if (us >= 1e6) return `${(us / 1e6).toFixed(2)} s`;
+  if (us >= 1e3) return `${(us / 1e3).toFixed(1)} ms`;
+  return `${us.toFixed(0)} µs`;
+}
+
+/** Where the run's time went: one row per phase, largest share first, plus the counters. */
+function ProfilePanel({ profile, className }: { profile: TD3Profile; className: string }) {
+  const phases = Object.entries(profile.phases).sort(([, a], [, b]) => b.totalMs - a.totalMs);
+  const counters = Object.entries(profile.counters);
+  return (
+    <div className={className}>
+      <div className="flex items-center justify-between border-b border-[#30363d] px-4 py-3">
+        <div className="flex items-center gap-2">
+          <Timer className="h-4 w-4 text-[#8b949e]" />
+          <span className="font-mono text-sm font-semibold text-[#c9d1d9]">Run Profile</span>
+        </div>
+        <span className="font-mono text-xs text-[#8b949e]">Wall time {formatMicros(profile.wallMs * 1e3)}</span>
+      </div>
+      <div className="overflow-x-auto px-4 py-3">
+        <table className="w-full font-mono text-xs tabular-nums text-[#c9d1d9]">
+          <thead className="text-[#8b949e]">
+            <tr className="text-right">
+              <th className="py-1 text-left font-medium">Phase</th>
+              <th className="py-1 font-medium">Count</th>
+              <th className="py-1 font-medium">Total</th>
+              <th className="w-40 py-1 pl-4 text-left font-medium">Share</th>
+              <th className="py-1 font-medium">p50</th>
+              <th className="py-1 font-medium">p95</th>
+              <th className="py-1 font-medium">p99</th>
+              <th className="py-1 font-medium">Max</th>
+            </tr>
+          </thead>
+          <tbody>
+            {phases.map(([name, phase]) => (
+              <tr key={name} className="border-t border-[#21262d] text-right">
+                <td className="py-1 text-left">{name}</td>
+                <td className="py-1">{phase.count}</td>
+                <td className="py-1">{formatMicros(phase.totalMs * 1e3)}</td>
+                <td className="py-1 pl-4">
+                  <div className="flex items-center gap-2">
+                    <div className="h-1.5 flex-1 rounded bg-[#21262d]">
+                      <div className="h-1.5 rounded bg-[#58a6ff]" style={{ width: `${Math.min(phase.sharePct, 100)}%` }} />
+                    </div>
+                    <span className="w-12 text-right">{phase.sharePct.toFixed(1)}%</span>
+                  </div>
+                </td>
+                <td className="py-1">{formatMicros(phase.p50Us)}</td>
+                <td className="py-1">{formatMicros(phase.p95Us)}</td>
+                <td className="py-1">{formatMicros(phase.p99Us)}</td>
+                <td className="py-1">{formatMicros(phase.maxUs)}</td>
+              </tr>
+            ))}
+          </tbody>
+        </table>
+        {counters.length > 0 && (
+          <div className="mt-3 flex flex-wrap gap-x-6 gap-y-1 font-mono text-xs text-[#8b949e]">
+            {counters.map(([name, value]) => (
+              <span key={name}>
+                {name} <span className="text-[#c9d1d9]">{value.toLocaleString("en")}</span>
+              </span>
+            ))}
+          </div>
+        )}
+      </div>
+    </div>
+  );
+}
+
+function RunOutput({
+  log,
+  error,
+  status,
+  onCancel,
+}: {
+  log: string[];
+  error?: string;
+  status?: string;
+  onCancel?: () => void;
+}) {
+  if (log.length === 0 && !error && !status) return null;
   return (
     <motion.div
       initial={{ opacity: 0, y: 10 }}
@@ -44,10 +193,19 @@ function RunOutput({ log, error }: { log: string[]; error?: string }) {
       <div className="mb-2 flex items-center gap-2 font-medium">
         <Terminal className="h-4 w-4 text-primary" />
         Run output
+        {onCancel && (
+          <Button onClick={onCancel} variant="outline" size="sm" className="ml-auto gap-2">
+            <Square className="h-3 w-3" />
+            Cancel run
+          </Button>
+        )}
       </div>
       {error && (
         <p className="mb-2 text-sm font-medium text-destructive">{error}</p>
       )}
+      {status && (
+        <p className="mb-2 text-sm text-muted-foreground">{status}</p>
+      )}
       <ScrollArea className="h-[200px] w-full rounded-md border border-border bg-secondary/30 p-3 font-mono text-xs">
         <pre className="whitespace-pre-wrap break-all">
           {log.length ? log.join("\n") : "(no output)"}
@@ -62,24 +220,57 @@ function TD3Charts({
   onRunAgain,
   isRunning,
 }: {
-  data: TD3Results;
+  data: TD3ResultsData;
   onRunAgain?: () => void;
   isRunning?: boolean;
 }) {
-  const { metrics, ohlc, portfolioHistory, actions, positions } = data;
+  const { metrics, portfolioHistory, actions, positions } = data;
+
+  // The charts show server-side views of the visible range: OHLC merged into at most
+  // CHART_POINTS candles, line series LTTB-downsampled. Without the chart endpoints (static
+  // td3_results.json) they fall back to the full arrays of `data`.
+  const [view, setView] = useState<[number, number] | null>(null);
+  useEffect(() => setView(null), [data]);
+  const range = view ? rangeBetween(view[0], view[1]) : {};
+  const chartQuery = { refetchOnWindowFocus: false, retry: false, placeholderData: keepPreviousData } as const;
+  const { data: summary } = useQuery({ queryKey: ["td3-chart", "summary"], queryFn: fetchTD3Summary, ...chartQuery });
+  const { data: ohlcView } = useQuery({
+    queryKey: ["td3-chart", "ohlc", range],
+    queryFn: () => fetchTD3OHLC(range, CHART_POINTS),
+    ...chartQuery,
+  });
+  const { data: seriesViews } = useQuery({
+    queryKey: ["td3-chart", "series", range],
+    queryFn: () => Promise.all(LINE_SERIES.map((name) => fetchTD3Series(name, range, CHART_POINTS))),
+    ...chartQuery,
+  });
+  const [portfolioView, actionsView, positionsView] = seriesViews ?? [];
+  const { data: profileView } = useQuery({ queryKey: ["td3-chart", "profile"], queryFn: fetchTD3Profile, ...chartQuery });
+  const profile = profileView ?? data.profile;
 
-  const portfolioChartData = portfolioHistory.map((value, i) => ({
-    index: i,
-    date: ohlc[i]?.date ? new Date(ohlc[i].date).toLocaleDateString("en", { month: "short", day: "numeric" }) : `${i}`,
-    value: value,
-  }));
+  const ohlc = ohlcView?.ohlc ?? resultBars(data);
 
-  const actionChartData = actions.map((a, i) => ({
-    index: i,
-    date: ohlc[i]?.date ? new Date(ohlc[i].date).toLocaleDateString("en", { month: "short", day: "numeric" }) : `${i}`,
-    action: a,
-    position: positions[i] ?? 0,
-  }));
+  const portfolioChartData = portfolioView
+    ? portfolioView.x.map((x, i) => ({ index: x, date: chartDate(portfolioView.dates[i], x), value: portfolioView.y[i] }))
+    : Array.from(portfolioHistory, (value, i) => ({ index: i, date: chartDate(barDate(data, i), i), value: value }));
+
+  const actionChartData = actionsView && positionsView
+    ? signalRows(actionsView, positionsView)
+    : Array.from(actions, (a, i) => ({
+        index: i,
+        date: chartDate(barDate(data, i), i),
+        action: a,
+        position: positions[i] ?? 0,
+      }));
+
+  const extent: [number, number] | null =
+    summary?.start && summary.end && summary.bars > MIN_VIEW_BARS
+      ? [parseResultDate(summary.start), parseResultDate(summary.end)]
+      : null;
+  const minSpan = extent && summary ? ((extent[1] - extent[0]) * MIN_VIEW_BARS) / summary.bars : 0;
+  const move = (scale: number, shift: number) => {
+    if (extent) setView(moveView(view ?? extent, extent, minSpan, scale, shift));
+  };
 
   const metricCards = [
     {
@@ -186,10 +377,45 @@ function TD3Charts({
             <span className="font-mono text-sm font-semibold text-[#c9d1d9]">AAPL · Candlestick</span>
           </div>
           <div className="flex gap-4 font-mono text-xs text-[#8b949e]">
+            {ohlcView && (
+              <span>
+                {ohlcView.ohlc.length} of {ohlcView.total} bars
+                {ohlcView.barsPerPoint > 1 ? ` · ${ohlcView.barsPerPoint} per candle` : ""}
+              </span>
+            )}
             <span><span className="text-[#3fb950]">O</span> Open</span>
             <span><span className="text-[#f85149]">C</span> Close</span>
           </div>
         </div>
+        {extent && (
+          <div className="flex items-center gap-1 border-b border-[#30363d] px-4 py-2">
+            {[
+              { label: "Zoom in", icon: ZoomIn, onClick: () => move(0.5, 0), disabled: view !== null && view[1] - view[0] <= minSpan },
+              { label: "Zoom out", icon: ZoomOut, onClick: () => move(2, 0), disabled: view === null },
+              { label: "Pan left", icon: ChevronLeft, onClick: () => move(1, -0.5), disabled: view === null || view[0] <= extent[0] },
+              { label: "Pan right", icon: ChevronRight, onClick: () => move(1, 0.5), disabled: view === null || view[1] >= extent[1] },
+              { label: "Show all", icon: Maximize2, onClick: () => setView(null), disabled: view === null },
+            ].map(({ label, icon: Icon, onClick, disabled }) => (
+              <Button
+                key={label}
+                onClick={onClick}
+                disabled={disabled}
+                variant="ghost"
+                size="sm"
+                title={label}
+                aria-label={label}
+                className="h-7 px-2 text-[#8b949e] hover:bg-[#21262d] hover:text-[#c9d1d9]"
+              >
+                <Icon className="h-4 w-4" />
+              </Button>
+            ))}
+            {view && (
+              <span className="ml-2 font-mono text-xs text-[#8b949e]">
+                {viewDate(view[0])} – {viewDate(view[1])}
+              </span>
+            )}
+          </div>
+        )}
         <CandlestickChart data={ohlc} height={380} className="w-full" />
       </motion.div>
 
@@ -253,12 +479,23 @@ function TD3Charts({
               <Tooltip contentStyle={tooltipStyle} labelStyle={{ color: "#c9d1d9" }} />
               <ReferenceLine y={0} stroke="#30363d" strokeDasharray="2 2" />
               <Legend wrapperStyle={{ fontFamily: "JetBrains Mono", fontSize: "11px" }} />
-              <Line type="monotone" dataKey="action" stroke="#a371f7" strokeWidth={2} dot={false} name="Action" isAnimationActive={false} />
-              <Line type="monotone" dataKey="position" stroke="#58a6ff" strokeWidth={1.5} strokeDasharray="4 4" dot={false} name="Position" isAnimationActive={false} />
+              <Line type="monotone" dataKey="action" stroke="#a371f7" strokeWidth={2} dot={false} name="Action" isAnimationActive={false} connectNulls />
+              <Line type="monotone" dataKey="position" stroke="#58a6ff" strokeWidth={1.5} strokeDasharray="4 4" dot={false} name="Position" isAnimationActive={false} connectNulls />
             </LineChart>
           </ResponsiveContainer>
         </div>
       </motion.div>
+
+      {/* Run profile — per-phase timing of the training run */}
+      {profile && (
+        <motion.div
+          initial={{ opacity: 0, y: 20 }}
+          animate={{ opacity: 1, y: 0 }}
+          transition={{ delay: 0.3 }}
+        >
+          <ProfilePanel profile={profile} className={chartPanelClass} />
+        </motion.div>
+      )}
     </section>
   );
 }
@@ -269,12 +506,16 @@ function TD3Empty({
   isRunning,
   runLog,
   runError,
+  runStatus,
+  onCancel,
 }: {
   refetch: () => void;
   onRun: () => void;
   isRunning: boolean;
   runLog: string[];
   runError?: string;
+  runStatus?: string;
+  onCancel?: () => void;
 }) {
   return (
     <section className="container mx-auto space-y-6 px-4 py-12">
@@ -310,7 +551,7 @@ function TD3Empty({
           </Button>
           {isRunning && (
             <p className="w-full text-center text-sm text-muted-foreground">
-              Training TD3 on CSV — results and log will appear when done.
+              Training TD3 on CSV — the log streams below and results appear when done.
             </p>
           )}
           <Button onClick={() => refetch()} variant="outline" className="gap-2">
@@ -319,8 +560,8 @@ function TD3Empty({
           </Button>
         </div>
       </motion.div>
-      {runLog.length > 0 || runError ? (
-        <RunOutput log={runLog} error={runError} />
+      {runLog.length > 0 || runError || runStatus ? (
+        <RunOutput log={runLog} error={runError} status={runStatus} onCancel={onCancel} />
       ) : null}
     </section>
   );
@@ -331,6 +572,8 @@ export default function TD3Results() {
   const [runLog, setRunLog] = useState<string[]>([]);
   const [runError, setRunError] = useState<string | undefined>();
   const [isRunning, setIsRunning] = useState(false);
+  const [runStatus, setRunStatus] = useState<string | undefined>();
+  const [runJobId, setRunJobId] = useState<string | undefined>();
 
   const { data, isLoading, isError, refetch } = useQuery({
     queryKey: ["td3-results"],
@@ -344,22 +587,43 @@ export default function TD3Results() {
     setRunError(undefined);
     setRunLog([]);
     try {
-      const out = await runTD3Model(3);
+      const out = await runTD3Model(
+        3,
+        (job) => {
+          setRunJobId(job.jobId);
+          const { episode, episodes, val_sharpe, steps_per_sec } = job.progress;
+          if (job.status === "queued") {
+            setRunStatus(`Queued (position ${job.position ?? "?"})`);
+          } else if (episode !== undefined) {
+            const sharpe = val_sharpe != null ? ` | Val Sharpe ${val_sharpe}` : "";
+            const speed = steps_per_sec !== undefined ? ` | ${steps_per_sec} steps/s` : "";
+            setRunStatus(`Episode ${episode}/${episodes ?? job.episodes}${sharpe}${speed}`);
+          }
+        },
+        (line) => setRunLog((lines) => [...lines.slice(-(MAX_LIVE_LOG_LINES - 1)), line]),
+      );
+      setRunStatus(undefined);
       setRunLog(out.log || []);
       if (!out.success) {
         setRunError(out.error || "Run failed");
-      } else if (out.results) {
-        queryClient.setQueryData(["td3-results"], out.results);
       } else {
-        refetch();
+        if (out.results) {
+          queryClient.setQueryData(["td3-results"], out.results);
+        } else {
+          refetch();
+        }
+        queryClient.invalidateQueries({ queryKey: ["td3-chart"] });
       }
     } catch (e) {
       setRunError(e instanceof Error ? e.message : "Request failed");
     } finally {
       setIsRunning(false);
+      setRunJobId(undefined);
     }
   };
 
+  const handleCancel = isRunning && runJobId ? () => cancelTD3Job(runJobId) : undefined;
+
   if (isLoading) {
     return (
       <section className="container mx-auto space-y-8 px-4 py-10">
@@ -383,15 +647,17 @@ export default function TD3Results() {
         isRunning={isRunning}
         runLog={runLog}
         runError={runError}
+        runStatus={runStatus}
+        onCancel={handleCancel}
       />
     );
   }
 
   return (
     <>
-      {runLog.length > 0 || runError ? (
+      {runLog.length > 0 || runError || runStatus ? (
         <section className="container mx-auto px-4 pt-6">
-          <RunOutput log={runLog} error={runError} />
+          <RunOutput log={runLog} error={runError} status={runStatus} onCancel={handleCancel} />
         </section>
       ) : null}
       <TD3Charts data={data} onRunAgain={handleRun} isRunning={isRunning} />
@@ -14,27 +14,147 @@ export interface TD3OHLC {
   close: number;
 }
 
+/** Timing of one run phase (env_step, td3.critic, checkpoint, ...); see td3/src/utils/profiling.py. */
+export interface TD3PhaseProfile {
+  count: number;
+  totalMs: number;
+  sharePct: number;
+  meanUs: number;
+  minUs: number;
+  maxUs: number;
+  p50Us: number;
+  p95Us: number;
+  p99Us: number;
+  /** [bucket upper edge in µs, count] for each non-empty log2 bucket */
+  histogram: [number, number][];
+}
+
+export interface TD3Profile {
+  wallMs: number;
+  phases: Record<string, TD3PhaseProfile>;
+  counters: Record<string, number>;
+  captures?: { step: number; steps: number; path: string }[];
+}
+
 export interface TD3Results {
   metrics: TD3Metrics;
   ohlc: TD3OHLC[];
   portfolioHistory: number[];
   actions: number[];
   positions: number[];
+  profile?: TD3Profile;
+}
+
+/** OHLC bars as columns; `date` holds epoch ms, formatted per bar by barAt / barDate. */
+export interface TD3OHLCColumns {
+  date: Float64Array;
+  open: Float64Array;
+  high: Float64Array;
+  low: Float64Array;
+  close: Float64Array;
+  dateFormat: "date" | "datetime";
 }
 
+/** TD3Results decoded from the columnar format: every array is a view into the response body. */
+export interface TD3ColumnarResults {
+  metrics: TD3Metrics;
+  ohlc: TD3OHLCColumns;
+  portfolioHistory: Float64Array;
+  actions: Float64Array;
+  positions: Float64Array;
+  profile?: TD3Profile;
+}
+
+/** Results as fetchTD3Results returns them: JSON rows or columnar typed arrays. */
+export type TD3ResultsData = TD3Results | TD3ColumnarResults;
+
 const TD3_RESULTS_URL = "/td3_results.json";
 const API_BASE = import.meta.env.VITE_API_URL || "";
 
-export async function fetchTD3Results(): Promise<TD3Results | null> {
+const COLUMNAR_TYPE = "application/vnd.td3.columnar";
+
+interface ColumnarHeader {
+  version: number;
+  fields: Record<string, unknown>;
+  columns: { name: string; offset: number; shape: number[]; rows?: string; date?: "date" | "datetime" }[];
+}
+
+function formatDate(ms: number, format: "date" | "datetime"): string {
+  const iso = new Date(ms).toISOString();
+  return format === "date" ? iso.slice(0, 10) : `${iso.slice(0, 10)} ${iso.slice(11, 19)}`;
+}
+
+/**
+ * Decode the backend's columnar results (see td3/src/utils/columnar.py): a JSON header followed
+ * by 8-byte aligned little-endian float64 columns. Every column stays a Float64Array view over
+ * `buffer`; nothing is copied and dates are only formatted when a bar is read.
+ */
+export function decodeColumnarResults(buffer: ArrayBuffer): TD3ColumnarResults {
+  const view = new DataView(buffer);
+  const headerLength = view.getUint32(4, true);
+  const header: ColumnarHeader = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  const dataStart = Math.ceil((8 + headerLength) / 8) * 8;
+
+  const out: Record<string, unknown> = { ...header.fields };
+  for (const column of header.columns) {
+    const length = column.shape.reduce((a, b) => a * b, 1);
+    const values = new Float64Array(buffer, dataStart + column.offset, length);
+    if (!column.rows) {
+      out[column.name] = values;
+      continue;
+    }
+    const rows = (out[column.rows] ??= {}) as Record<string, unknown>;
+    rows[column.name.slice(column.rows.length + 1)] = values;
+    if (column.date) rows.dateFormat = column.date;
+  }
+  // An empty ohlc list is written as a plain empty column
+  if (!out.ohlc || out.ohlc instanceof Float64Array) {
+    const empty = new Float64Array(0);
+    out.ohlc = { date: empty, open: empty, high: empty, low: empty, close: empty, dateFormat: "date" };
+  }
+  return out as unknown as TD3ColumnarResults;
+}
+
+/** Number of OHLC bars in either form of the results. */
+export function barCount(results: TD3ResultsData): number {
+  return Array.isArray(results.ohlc) ? results.ohlc.length : results.ohlc.date.length;
+}
+
+/** Date of bar i, formatted on demand for columnar results. */
+export function barDate(results: TD3ResultsData, i: number): string | undefined {
+  const { ohlc } = results;
+  if (Array.isArray(ohlc)) return ohlc[i]?.date;
+  return i >= 0 && i < ohlc.date.length ? formatDate(ohlc.date[i], ohlc.dateFormat) : undefined;
+}
+
+/** Bar i as a row, built on demand for columnar results. */
+export function barAt(results: TD3ResultsData, i: number): TD3OHLC | undefined {
+  const { ohlc } = results;
+  if (Array.isArray(ohlc)) return ohlc[i];
+  const date = barDate(results, i);
+  if (date === undefined) return undefined;
+  return { date, open: ohlc.open[i], high: ohlc.high[i], low: ohlc.low[i], close: ohlc.close[i] };
+}
+
+/** Every bar as rows; columnar results are materialized, so prefer barAt for a slice. */
+export function resultBars(results: TD3ResultsData): TD3OHLC[] {
+  if (Array.isArray(results.ohlc)) return results.ohlc;
+  return Array.from({ length: barCount(results) }, (_, i) => barAt(results, i)!);
+}
+
+export async function fetchTD3Results(): Promise<TD3ResultsData | null> {
   const apiUrl = API_BASE ? `${API_BASE}/api/td3-results` : "/api/td3-results";
   try {
-    const res = await fetch(apiUrl);
+    const res = await fetch(apiUrl, { headers: { Accept: `${COLUMNAR_TYPE}, application/json;q=0.9` } });
     if (!res.ok) {
       const fallback = await fetch(TD3_RESULTS_URL);
       if (!fallback.ok) return null;
       const data: TD3Results = await fallback.json();
       return data;
     }
+    if (res.headers.get("Content-Type")?.startsWith(COLUMNAR_TYPE)) {
+      return decodeColumnarResults(await res.arrayBuffer());
+    }
     const data: TD3Results = await res.json();
     return data;
   } catch {
@@ -55,13 +175,30 @@ export interface RunTD3Response {
   error?: string;
 }
 
-export async function runTD3Model(episodes = 3): Promise<RunTD3Response> {
-  const apiUrl = API_BASE ? `${API_BASE}/api/run-td3` : "/api/run-td3";
-  const res = await fetch(apiUrl, {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ episodes }),
-  });
+export interface TD3JobStatus {
+  jobId: string;
+  status: "queued" | "running" | "succeeded" | "failed" | "cancelled";
+  episodes: number;
+  position?: number | null;
+  progress: {
+    phase?: string;
+    episode?: number;
+    episodes?: number;
+    timesteps?: number;
+    steps_per_sec?: number;
+    val_sharpe?: number | null;
+  };
+  error?: string | null;
+  cached?: boolean;
+}
+
+const JOB_POLL_MS = 2000;
+
+function apiPath(path: string): string {
+  return API_BASE ? `${API_BASE}${path}` : path;
+}
+
+async function parseRunResponse(res: Response): Promise<RunTD3Response> {
   const text = await res.text();
   try {
     return JSON.parse(text) as RunTD3Response;
@@ -73,3 +210,141 @@ export async function runTD3Model(episodes = 3): Promise<RunTD3Response> {
     };
   }
 }
+
+/** Live log lines and progress events of a job over Server-Sent Events; returns a close function. */
+export function streamTD3Job(
+  jobId: string,
+  onLog: (line: string) => void,
+  onProgress?: (progress: TD3JobStatus["progress"]) => void,
+): () => void {
+  if (typeof EventSource === "undefined") return () => {};
+  const source = new EventSource(apiPath(`/api/jobs/${jobId}/events`));
+  source.addEventListener("log", (e) => onLog(JSON.parse((e as MessageEvent).data).line));
+  source.addEventListener("progress", (e) => onProgress?.(JSON.parse((e as MessageEvent).data)));
+  source.addEventListener("dropped", (e) =>
+    onLog(`… ${JSON.parse((e as MessageEvent).data).count} lines skipped …`),
+  );
+  source.addEventListener("status", (e) => {
+    const { status } = JSON.parse((e as MessageEvent).data) as TD3JobStatus;
+    if (status !== "queued" && status !== "running") source.close();
+  });
+  return () => source.close();
+}
+
+/** Queue a run, poll its job until it finishes, then return its log and results. */
+export async function runTD3Model(
+  episodes = 3,
+  onStatus?: (status: TD3JobStatus) => void,
+  onLog?: (line: string) => void,
+  noCache = false,
+): Promise<RunTD3Response> {
+  const res = await fetch(apiPath("/api/run-td3"), {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ episodes, noCache }),
+  });
+  // 202: queued; 200: answered from the result cache (already succeeded)
+  if (res.status !== 202 && res.status !== 200) return parseRunResponse(res);
+
+  let job = (await res.json()) as TD3JobStatus;
+  const closeStream = onLog ? streamTD3Job(job.jobId, onLog) : () => {};
+  try {
+    while (job.status === "queued" || job.status === "running") {
+      onStatus?.(job);
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+      const statusRes = await fetch(apiPath(`/api/jobs/${job.jobId}`));
+      if (!statusRes.ok) return parseRunResponse(statusRes);
+      job = (await statusRes.json()) as TD3JobStatus;
+    }
+  } finally {
+    closeStream();
+  }
+  onStatus?.(job);
+  return parseRunResponse(await fetch(apiPath(`/api/jobs/${job.jobId}/result`)));
+}
+
+export async function cancelTD3Job(jobId: string): Promise<void> {
+  await fetch(apiPath(`/api/jobs/${jobId}/cancel`), { method: "POST" });
+}
+
+export type TD3SeriesName = "portfolioHistory" | "actions" | "positions";
+
+export interface TD3Range {
+  start?: string;
+  end?: string;
+}
+
+export interface TD3Summary {
+  metrics: TD3Metrics;
+  start: string | null;
+  end: string | null;
+  bars: number;
+  series: Record<TD3SeriesName, number>;
+}
+
+export interface TD3SeriesView {
+  name: TD3SeriesName;
+  level: number;
+  total: number;
+  x: number[];
+  dates: (string | null)[];
+  y: number[];
+}
+
+export interface TD3OHLCView {
+  level: number;
+  barsPerPoint: number;
+  total: number;
+  ohlc: TD3OHLC[];
+}
+
+/** Epoch ms of a results date: "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS", both in UTC. */
+export function parseResultDate(date: string): number {
+  return Date.parse(date.length > 10 ? `${date.replace(" ", "T")}Z` : date);
+}
+
+/** The range query covering [startMs, endMs]. */
+export function rangeBetween(startMs: number, endMs: number): TD3Range {
+  const iso = (ms: number) => new Date(ms).toISOString().slice(0, 19);
+  return { start: iso(startMs), end: iso(endMs) };
+}
+
+function chartQuery(range: TD3Range, points: number): string {
+  const params = new URLSearchParams({ points: String(Math.round(points)) });
+  if (range.start) params.set("start", range.start);
+  if (range.end) params.set("end", range.end);
+  return params.toString();
+}
+
+async function fetchJSON<T>(path: string): Promise<T | null> {
+  try {
+    const res = await fetch(apiPath(path));
+    return res.ok ? ((await res.json()) as T) : null;
+  } catch {
+    return null;
+  }
+}
+
+/** Metrics and series extents, without the arrays. */
+export function fetchTD3Summary(): Promise<TD3Summary | null> {
+  return fetchJSON<TD3Summary>("/api/td3-results/summary");
+}
+
+/** Per-phase timing breakdown of the last run (null for results written without one). */
+export function fetchTD3Profile(): Promise<TD3Profile | null> {
+  return fetchJSON<TD3Profile>("/api/td3-results/profile");
+}
+
+/** Price bars in the visible range, at most `points` of them (pass the chart's pixel width). */
+export function fetchTD3OHLC(range: TD3Range, points: number): Promise<TD3OHLCView | null> {
+  return fetchJSON<TD3OHLCView>(`/api/td3-results/ohlc?${chartQuery(range, points)}`);
+}
+
+/** One line series in the visible range, LTTB-downsampled to `points` on the server. */
+export function fetchTD3Series(
+  name: TD3SeriesName,
+  range: TD3Range,
+  points: number,
+): Promise<TD3SeriesView | null> {
+  return fetchJSON<TD3SeriesView>(`/api/td3-results/series/${name}?${chartQuery(range, points)}`);
+}
@@ -0,0 +1,408 @@
+"""
+Background job runner for TD3 training runs started from the backend.
+Jobs wait in a bounded FIFO queue and a fixed number of worker threads each drive one
+run_csv.py subprocess, so the Flask request threads never block on training and concurrent
+runs cannot oversubscribe the CPU. Every job writes to its own directory under jobs/.
+"""
+import collections
+import json
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+PROGRESS_PREFIX = "@@progress "  # must match td3/run_csv.py
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _stop(process, grace=5.0):
+    """SIGTERM now, SIGKILL if the process is still alive after `grace` seconds."""
+    if process.poll() is not None:
+        return
+    process.terminate()
+    threading.Timer(grace, lambda: process.poll() is None and process.kill()).start()
+
+
+class Subscriber:
+    """
+    Bounded per-client event buffer. The job never waits on a client: when a slow client's
+    buffer is full the oldest events are dropped and the client is told how many it missed.
+    """
+
+    def __init__(self, max_events=1000):
+        self.events = collections.deque(maxlen=max_events)
+        self.dropped = 0
+        self._cond = threading.Condition()
+
+    def put(self, event):
+        with self._cond:
+            if len(self.events) == self.events.maxlen:
+                self.dropped += 1
+            self.events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Next event, a ("dropped", {"count": n}) notice, or None on timeout."""
+        with self._cond:
+            if not self.events and not self._cond.wait_for(lambda: self.events, timeout):
+                return None
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                return "dropped", {"count": dropped}
+            return self.events.popleft()
+
+
+class Job:
+    def __init__(self, job_id, episodes, job_dir, max_log_lines):
+        self.id = job_id
+        self.episodes = episodes
+        self.dir = job_dir
+        self.result_path = os.path.join(job_dir, "td3_results.json")
+        self.status = QUEUED
+        self.progress = {}
+        self.log = collections.deque(maxlen=max_log_lines)
+        self.error = None
+        self.returncode = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_requested = False
+        self.timed_out = False
+        self.process = None
+        self.subscribers = set()
+        self.cache_key = None
+        self.cached = False
+
+    def to_dict(self):
+        return {
+            "jobId": self.id,
+            "status": self.status,
+            "episodes": self.episodes,
+            "progress": self.progress,
+            "error": self.error,
+            "returnCode": self.returncode,
+            "cached": self.cached,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobManager:
+    def __init__(self,
+                 td3_dir,
+                 jobs_dir,
+                 csv_path,
+                 latest_results_path=None,
+                 latest_bundle_path=None,
+                 result_cache=None,
+                 fork_server=None,
+                 max_workers=1,
+                 max_queued=8,
+                 timeout=600,
+                 keep_finished=50,
+                 max_log_lines=5000,
+        ):
+        self.td3_dir = td3_dir
+        self.jobs_dir = jobs_dir
+        self.csv_path = csv_path
+        self.latest_results_path = latest_results_path
+        self.latest_bundle_path = latest_bundle_path
+        self.result_cache = result_cache
+        # Optional worker_pool.ForkServer: runs are forked from a preloaded process instead of
+        # starting a fresh interpreter each time
+        self.fork_server = fork_server
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.keep_finished = keep_finished
+        self.max_log_lines = max_log_lines
+        # Split the cores between concurrent runs instead of letting every torch/BLAS pool take all of them
+        self.threads_per_job = max(1, (os.cpu_count() or 1) // max_workers)
+        if fork_server is not None:
+            fork_server.env = self._env()  # forked runs inherit the fork server's environment
+
+        self.jobs = collections.OrderedDict()
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        # Serializes swaps of the shared results file and bundle between finishing jobs
+        self._publish_lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"td3-job-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, episodes, use_cache=True):
+        """
+        Queue a run. With a result cache, a run whose CSV, options and code match a stored one
+        finishes immediately with the stored payload unless use_cache is False.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job = Job(job_id, episodes, os.path.join(self.jobs_dir, job_id), self.max_log_lines)
+        if self.result_cache is not None:
+            job.cache_key = self.result_cache.key(self.csv_path, self._run_options(job))
+            log_lines = None
+            if use_cache:
+                log_lines = self.result_cache.restore(job.cache_key, job.result_path, self._bundle_path(job))
+            if log_lines is not None:
+                return self._finish_from_cache(job, log_lines)
+
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFull(f"{self._queue.maxsize} runs already queued")
+            self.jobs[job.id] = job
+            self._prune()
+        return job
+
+    def _finish_from_cache(self, job, log_lines):
+        # The stored results and bundle are already in job.dir (ResultCache.restore)
+        job.log.extend(log_lines)
+        job.cached = True
+        job.started = time.time()
+        with self._lock:
+            self._finish(job, SUCCEEDED)
+            self.jobs[job.id] = job
+            self._prune()
+        if self.latest_results_path:
+            self._publish_latest(job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def position(self, job):
+        """1-based place in the FIFO queue for a queued job, else None."""
+        if job.status != QUEUED:
+            return None
+        with self._lock:
+            queued = [j for j in self.jobs.values() if j.status == QUEUED]
+        return next((i for i, j in enumerate(queued, 1) if j is job), None)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._lock:
+            if job.status in FINISHED_STATES:
+                return job
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                # The worker skips it when it reaches the head of the queue
+                self._finish(job, CANCELLED)
+                return job
+            process = job.process
+        if process is not None:
+            _stop(process)
+        return job
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            job = self.jobs.pop(job_id)
+            shutil.rmtree(job.dir, ignore_errors=True)
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        self._publish(job, "status", job.to_dict())
+        job.subscribers = set()
+
+    def _publish(self, job, event_type, data):
+        # Called with self._lock held; Subscriber.put never blocks
+        for subscriber in job.subscribers:
+            subscriber.put((event_type, data))
+
+    def subscribe(self, job, max_events=1000, replay_lines=200):
+        """
+        Attach a live event buffer to a job, primed with its status, latest progress and last
+        `replay_lines` log lines so a client connecting mid-run sees the current state.
+        """
+        subscriber = Subscriber(max_events)
+        with self._lock:
+            subscriber.put(("status", job.to_dict()))
+            if job.progress:
+                subscriber.put(("progress", job.progress))
+            for line in list(job.log)[-replay_lines:]:
+                subscriber.put(("log", {"line": line}))
+            if job.status not in FINISHED_STATES:
+                job.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, job, subscriber):
+        with self._lock:
+            job.subscribers.discard(subscriber)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                with self._lock:
+                    if job.cancel_requested:
+                        continue
+                    job.status = RUNNING
+                    job.started = time.time()
+                    self._publish(job, "status", job.to_dict())
+                self._run(job)
+            except Exception as e:
+                with self._lock:
+                    self._finish(job, FAILED, str(e))
+            finally:
+                self._queue.task_done()
+
+    def _run_options(self, job):
+        """run_csv.py options that affect the result (and therefore the cache key)."""
+        return ["--csv", self.csv_path, "--episodes", str(job.episodes)]
+
+    def _bundle_path(self, job):
+        return os.path.join(job.dir, "checkpoints", "td3_serving")
+
+    def _command(self, job):
+        return [
+            sys.executable, "run_csv.py",
+            *self._run_options(job),
+            "--out", job.result_path,
+            "--results-dir", os.path.join(job.dir, "checkpoints"),
+            "--progress",
+        ]
+
+    def _env(self):
+        threads = str(self.threads_per_job)
+        return {
+            **os.environ,
+            "PYTHONUNBUFFERED": "1",
+            "OMP_NUM_THREADS": threads,
+            "MKL_NUM_THREADS": threads,
+            "OPENBLAS_NUM_THREADS": threads,
+        }
+
+    def _start_process(self, job):
+        command = self._command(job)
+        if self.fork_server is not None:
+            return self.fork_server.spawn(command[1:])
+        return subprocess.Popen(
+            command,
+            cwd=self.td3_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            env=self._env(),
+        )
+
+    def _run(self, job):
+        os.makedirs(job.dir, exist_ok=True)
+        process = self._start_process(job)
+        with self._lock:
+            job.process = process
+            cancelled_early = job.cancel_requested
+        if cancelled_early:
+            _stop(process)
+
+        def on_timeout():
+            job.timed_out = True
+            _stop(process)
+
+        timer = threading.Timer(self.timeout, on_timeout)
+        timer.start()
+        try:
+            for line in process.stdout:
+                self._handle_line(job, line.rstrip("\n"))
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+            process.stdout.close()
+
+        with self._lock:
+            job.process = None
+            job.returncode = returncode
+            if job.cancel_requested:
+                self._finish(job, CANCELLED)
+            elif returncode == 0 and os.path.exists(job.result_path):
+                self._finish(job, SUCCEEDED)
+            elif job.timed_out:
+                self._finish(job, FAILED, f"Run timed out ({self.timeout // 60} min). Try fewer episodes.")
+            else:
+                self._finish(job, FAILED, f"Process exited with code {returncode}")
+
+        if job.status == SUCCEEDED:
+            if self.result_cache is not None and job.cache_key is not None:
+                self.result_cache.put(job.cache_key, job.result_path, list(job.log), self._bundle_path(job))
+            if self.latest_results_path:
+                self._publish_latest(job)
+
+    def _handle_line(self, job, line):
+        if line.startswith(PROGRESS_PREFIX):
+            try:
+                event = json.loads(line[len(PROGRESS_PREFIX):])
+            except ValueError:
+                event = None
+            if event is not None:
+                with self._lock:
+                    job.progress = {**job.progress, **event}
+                    self._publish(job, "progress", event)
+                return
+        with self._lock:
+            job.log.append(line)
+            self._publish(job, "log", {"line": line})
+
+    def _publish_latest(self, job):
+        """
+        Make a succeeded job's results and bundle the shared ones. Errors are logged and never
+        change the job's state: the run itself succeeded, and the previous results stay live.
+        """
+        try:
+            with self._publish_lock:
+                self._replace_latest(job)
+        except Exception:
+            logger.exception(f"Could not publish the results of job {job.id}")
+
+    def _replace_latest(self, job):
+        # The shared results and /api/predict must describe the same policy: without the run's
+        # bundle (e.g. a cache entry stored before bundles were cached) neither is replaced
+        bundle = self._bundle_path(job)
+        if self.latest_bundle_path and not os.path.isdir(bundle):
+            return
+
+        # Copy then rename, so readers of the shared results file never see a partial write
+        os.makedirs(os.path.dirname(self.latest_results_path), exist_ok=True)
+        tmp_path = f"{self.latest_results_path}.{job.id}.tmp"
+        shutil.copyfile(job.result_path, tmp_path)
+        os.replace(tmp_path, self.latest_results_path)
+
+        # The run's serving bundle becomes the one /api/predict answers with
+        if self.latest_bundle_path:
+            parent = os.path.dirname(self.latest_bundle_path)
+            os.makedirs(parent, exist_ok=True)
+            tmp_dir = os.path.join(parent, f".td3_serving.{job.id}.tmp")
+            shutil.copytree(bundle, tmp_dir)
+            old_dir = os.path.join(parent, f".td3_serving.{job.id}.old")
+            if os.path.exists(self.latest_bundle_path):
+                os.replace(self.latest_bundle_path, old_dir)
+            os.replace(tmp_dir, self.latest_bundle_path)
+            shutil.rmtree(old_dir, ignore_errors=True)
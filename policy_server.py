@@ -0,0 +1,159 @@
+"""
+Warm in-process inference for /api/predict.
+The serving bundle (Actor + scaler + feature layout, written by run_csv) is loaded once and
+reloaded only when it changes on disk. Concurrent requests are grouped by a MicroBatcher into one
+forward pass, and every answer carries its own queue / inference latency.
+"""
+import os
+import queue
+import sys
+import threading
+import time
+
+import numpy as np
+
+
+class _Request:
+    __slots__ = ("state", "enqueued", "done", "action", "error", "timings")
+
+    def __init__(self, state):
+        self.state = state
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.action = None
+        self.error = None
+        self.timings = None
+
+
+class MicroBatcher:
+    """
+    Groups concurrent predict calls into batches. The worker takes every request already waiting,
+    then keeps collecting for up to max_wait seconds (or until max_batch) before one
+    predict(states) call answers them all. max_wait=0 batches only what piled up during the
+    previous forward pass.
+    """
+
+    def __init__(self, predict, max_batch=64, max_wait=0.0):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, state, timeout=5.0):
+        """(action array, timings dict) for one state; raises what predict raised for its batch."""
+        request = _Request(state)
+        self._queue.put(request)
+        if not request.done.wait(timeout):
+            raise TimeoutError("prediction timed out")
+        if request.error is not None:
+            raise request.error
+        return request.action, request.timings
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                actions = self.predict(np.stack([request.state for request in batch]))
+                error = None
+            except Exception as e:
+                actions, error = None, e
+            finished = time.perf_counter()
+            for i, request in enumerate(batch):
+                request.error = error
+                if error is None:
+                    request.action = actions[i]
+                request.timings = {
+                    "queueMs": round((started - request.enqueued) * 1e3, 4),
+                    "inferenceMs": round((finished - started) * 1e3, 4),
+                    "batchSize": len(batch),
+                }
+                request.done.set()
+
+
+class PolicyServer:
+    def __init__(self, bundle_path, td3_dir, max_batch=64, max_wait=0.0):
+        self.bundle_path = bundle_path
+        self.td3_dir = td3_dir
+        self._bundle = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self.batcher = MicroBatcher(self._predict, max_batch=max_batch, max_wait=max_wait)
+
+    def bundle(self):
+        """The loaded ServingBundle, reloaded if its bundle.json changed; None if there is none."""
+        meta_path = os.path.join(self.bundle_path, "bundle.json")
+        try:
+            stat = os.stat(meta_path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        with self._lock:
+            if signature is not None and signature != self._signature:
+                if self.td3_dir not in sys.path:
+                    sys.path.insert(0, self.td3_dir)
+                from src.model.serving import ServingBundle  # torch loads on first use only
+                self._bundle = ServingBundle.load(self.bundle_path)
+                self._signature = signature
+            return self._bundle
+
+    def _predict(self, states):
+        return self._bundle.predict(states)
+
+    def info(self):
+        bundle = self.bundle()
+        if bundle is None:
+            return None
+        return {
+            "featureColumns": bundle.feature_columns,
+            "windowRows": bundle.window_rows,
+            "lookbackWindow": bundle.lookback_window,
+            "frameStack": bundle.frame_stack,
+            "stateDim": bundle.state_dim,
+            "maxBatch": self.batcher.max_batch,
+            "maxWaitMs": self.batcher.max_wait * 1e3,
+        }
+
+    def predict(self, body):
+        """
+        Action for one request: body.state is a ready observation vector, or body.rows holds
+        the last windowRows raw feature rows (with optional body.position, default 0).
+        Returns None if no bundle has been trained yet; raises ValueError on a bad request.
+        """
+        received = time.perf_counter()
+        bundle = self.bundle()
+        if bundle is None:
+            return None
+        if body.get("state") is not None:
+            state = np.asarray(body["state"], dtype=np.float32)
+            if state.shape != (bundle.state_dim,):
+                raise ValueError(f"state must have {bundle.state_dim} values")
+        elif body.get("rows") is not None:
+            state = bundle.state(body["rows"], float(body.get("position", 0.0)))
+        else:
+            raise ValueError("send either state or rows")
+        action, timings = self.batcher.submit(state)
+        return {
+            "action": action.tolist(),
+            "latencyMs": {**timings, "totalMs": round((time.perf_counter() - received) * 1e3, 4)},
+        }
@@ -0,0 +1,124 @@
+"""
+Disk cache of finished TD3 run payloads.
+Training is deterministic (run_csv seeds everything with 42), so a run is keyed by the CSV
+content, the run options and a digest of the td3 source code; a repeat run returns the stored
+td3_results.json and the serving bundle trained with it instead of retraining. Entries are evicted least-recently-used once the
+cache grows past max_bytes.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+RESULTS_FILE = "td3_results.json"
+LOG_FILE = "log.json"
+BUNDLE_DIR = "td3_serving"
+
+
+def _sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+class ResultCache:
+    def __init__(self, cache_dir, code_dir, max_bytes=200 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.code_dir = code_dir
+        self.max_bytes = max_bytes
+        self._file_digests = {}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def file_digest(self, path):
+        """sha256 of a file, memoized on (size, mtime) so unchanged inputs are hashed once."""
+        stat = os.stat(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._file_digests.get(path)
+        if cached is None or cached[0] != signature:
+            cached = (signature, _sha256_file(path))
+            self._file_digests[path] = cached
+        return cached[1]
+
+    def code_version(self):
+        """Digest of every .py file under code_dir, so any code or hyperparameter edit misses."""
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(self.code_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in ("__pycache__", "benchmarks"))
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    path = os.path.join(root, name)
+                    digest.update(os.path.relpath(path, self.code_dir).encode())
+                    digest.update(self.file_digest(path).encode())
+        return digest.hexdigest()
+
+    def key(self, csv_path, options):
+        payload = json.dumps({
+            "csv": self.file_digest(csv_path),
+            "options": options,
+            "code": self.code_version(),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def restore(self, key, results_path, bundle_path):
+        """
+        Copy a stored run's results to results_path (and its serving bundle, if it has one, to
+        bundle_path) and return its log lines, or None on a miss. The copy is made under the
+        cache lock, so eviction cannot remove the entry halfway. A hit marks the entry as
+        recently used.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        stored_results = os.path.join(entry, RESULTS_FILE)
+        with self._lock:
+            if not os.path.exists(stored_results):
+                return None
+            now = time.time()
+            os.utime(entry, (now, now))
+            with open(os.path.join(entry, LOG_FILE)) as f:
+                log_lines = json.load(f)
+            os.makedirs(os.path.dirname(results_path), exist_ok=True)
+            shutil.copyfile(stored_results, results_path)
+            stored_bundle = os.path.join(entry, BUNDLE_DIR)
+            if os.path.isdir(stored_bundle):
+                shutil.copytree(stored_bundle, bundle_path)
+        return log_lines
+
+    def put(self, key, results_path, log_lines, bundle_path=None):
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.cache_dir)
+        try:
+            shutil.copyfile(results_path, os.path.join(tmp_dir, RESULTS_FILE))
+            if bundle_path is not None and os.path.isdir(bundle_path):
+                shutil.copytree(bundle_path, os.path.join(tmp_dir, BUNDLE_DIR))
+            with open(os.path.join(tmp_dir, LOG_FILE), "w") as f:
+                json.dump(list(log_lines), f)
+            entry = os.path.join(self.cache_dir, key)
+            with self._lock:
+                if os.path.exists(entry):
+                    shutil.rmtree(entry)
+                os.replace(tmp_dir, entry)
+                self._evict()
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isdir(path) and not name.startswith("."):
+                entries.append((os.path.getmtime(path), _dir_size(path), path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
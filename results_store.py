@@ -0,0 +1,131 @@
+"""
+In-memory view of the latest results JSON for the backend.
+The file is re-read only when its mtime or size changes; its bytes are served as-is (no
+json.load / jsonify round trip) with a content ETag, and gzip / brotli encodings are built
+once per version and reused for every request. Other media types (e.g. the columnar binary
+format) are encoded from the parsed JSON once per version as well.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+JSON = "application/json"
+
+
+def _accepted_encodings(header):
+    """{token: q} of an Accept / Accept-Encoding header."""
+    accepted = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if token:
+            accepted[token.lower()] = q
+    return accepted
+
+
+def negotiate_media_type(accept, offered):
+    """
+    The offered media type the Accept header ranks highest; ties go to the earlier offer, so
+    clients sending */* or nothing get offered[0].
+    """
+    accepted = _accepted_encodings(accept)
+    if not accepted:
+        return offered[0]
+    best, best_q = None, 0.0
+    for media_type in offered:
+        kind = media_type.split("/")[0]
+        q = next((accepted[key] for key in (media_type, f"{kind}/*", "*/*") if key in accepted), 0.0)
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+class CachedJSONFile:
+    def __init__(self, path, min_compress_bytes=1024, representations=None):
+        """representations: {media type: encode(parsed JSON) -> bytes} served besides JSON."""
+        self.path = path
+        self.min_compress_bytes = min_compress_bytes
+        self.representations = representations or {}
+        self._signature = None
+        self._data = None
+        self._etag = None
+        self._encoded = {}
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Reload if the file changed; returns False when it does not exist."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._signature = None
+            return False
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature != self._signature:
+            with open(self.path, "rb") as f:
+                body = f.read()
+            self._data = json.loads(body)  # validates before the new version is served
+            # Weak: the same validator covers the identity, gzip and brotli representations
+            self._etag = 'W/"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            self._encoded = {}
+            self._bodies = {JSON: body}
+            self._signature = signature
+        return True
+
+    def snapshot(self):
+        """(etag, parsed JSON) of the current file version, or None if it does not exist."""
+        with self._lock:
+            if not self._refresh():
+                return None
+            return self._etag, self._data
+
+    @property
+    def media_types(self):
+        return [JSON, *self.representations]
+
+    def _representation(self, media_type):
+        if media_type not in self._bodies:
+            self._bodies[media_type] = self.representations[media_type](self._data)
+        return self._bodies[media_type]
+
+    def response_parts(self, accept_encoding=None, media_type=JSON):
+        """
+        (etag, body bytes, content-encoding or None) of `media_type` for the current version,
+        choosing brotli or gzip from the client's Accept-Encoding; None if the file does not exist.
+        """
+        with self._lock:
+            if not self._refresh():
+                return None
+            body = self._representation(media_type)
+            # Each media type is a different representation and needs its own validator
+            etag = self._etag if media_type == JSON else f'{self._etag[:-1]}.{media_type.rsplit(".", 1)[-1]}"'
+            if len(body) < self.min_compress_bytes:
+                return etag, body, None
+
+            accepted = _accepted_encodings(accept_encoding)
+            for encoding in ("br", "gzip"):
+                if accepted.get(encoding, 0) <= 0 or (encoding == "br" and brotli is None):
+                    continue
+                if (media_type, encoding) not in self._encoded:
+                    if encoding == "br":
+                        compressed = brotli.compress(body, quality=5)
+                    else:
+                        compressed = gzip.compress(body, compresslevel=6)
+                    self._encoded[media_type, encoding] = compressed
+                return etag, self._encoded[media_type, encoding], encoding
+            return etag, body, None
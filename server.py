@@ -5,37 +5,201 @@ Then open frontend (npm run dev) and use "Run TD3 model" to run and see output o
 """
 import json
 import os
-import subprocess
 import sys
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 
-app = Flask(__name__)
-CORS(app)
+from chart_data import LINE_SERIES, ChartData
+from jobs import FINISHED_STATES, SUCCEEDED, JobManager, QueueFull
+from policy_server import PolicyServer
+from result_cache import ResultCache
+from results_store import CachedJSONFile, negotiate_media_type
+from worker_pool import ForkServer
 
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 TD3_DIR = os.path.join(PROJECT_ROOT, "td3")
-CSV_PATH = os.path.join(PROJECT_ROOT, "CSV file", "AAPL_data.csv")
+sys.path.insert(0, TD3_DIR)
+
+from src.utils import columnar  # noqa: E402  (needs td3/ on the path)
+
+app = Flask(__name__)
+CORS(app)
+
+CSV_PATH = os.environ.get("TD3_CSV", os.path.join(PROJECT_ROOT, "CSV file", "AAPL_data.csv"))
 RESULTS_JSON = os.path.join(PROJECT_ROOT, "frontend", "public", "td3_results.json")
+JOBS_DIR = os.path.join(PROJECT_ROOT, "jobs")
+SERVING_BUNDLE = os.path.join(TD3_DIR, "results", "td3_serving")
+SSE_KEEPALIVE_SECONDS = 15
+
+results_file = CachedJSONFile(RESULTS_JSON, representations={columnar.MEDIA_TYPE: columnar.encode})
+chart_data = ChartData(results_file)
+MAX_CHART_POINTS = 5000
+
+# Runs execute in the background; TD3_MAX_JOBS bounds how many train at once
+job_manager = JobManager(
+    td3_dir=TD3_DIR,
+    jobs_dir=JOBS_DIR,
+    csv_path=CSV_PATH,
+    latest_results_path=RESULTS_JSON,
+    latest_bundle_path=SERVING_BUNDLE,
+    result_cache=ResultCache(
+        os.path.join(PROJECT_ROOT, "result-cache"),
+        code_dir=TD3_DIR,
+        max_bytes=int(os.environ.get("TD3_RESULT_CACHE_MB", 200)) * 1024 * 1024,
+    ),
+    # Runs fork from a process that has torch imported and the CSV features loaded;
+    # TD3_FORK_SERVER=0 goes back to one fresh interpreter per run
+    fork_server=ForkServer(
+        TD3_DIR,
+        preload=CSV_PATH,
+        recycle_after=int(os.environ.get("TD3_FORK_RECYCLE_AFTER", 50)),
+    ) if os.environ.get("TD3_FORK_SERVER", "1") != "0" else None,
+    max_workers=int(os.environ.get("TD3_MAX_JOBS", 1)),
+    max_queued=int(os.environ.get("TD3_MAX_QUEUED", 8)),
+    timeout=600,
+)
+
+# Latest trained policy, kept in memory; concurrent /api/predict calls share forward passes
+policy_server = PolicyServer(
+    SERVING_BUNDLE,
+    td3_dir=TD3_DIR,
+    max_batch=int(os.environ.get("TD3_PREDICT_MAX_BATCH", 64)),
+    max_wait=float(os.environ.get("TD3_PREDICT_MAX_WAIT_MS", 0)) / 1e3,
+)
 
 
 @app.route("/api/td3-results", methods=["GET"])
 def get_td3_results():
-    """Return existing TD3 results JSON if present."""
-    if not os.path.exists(RESULTS_JSON):
+    """
+    Return existing TD3 results JSON if present. The bytes are cached in memory until the file
+    changes; clients revalidate with If-None-Match (304) and get gzip/brotli when accepted.
+    Clients that accept application/vnd.td3.columnar get the same payload as typed columns.
+    """
+    # Anything that accepts neither offer still gets JSON, as before negotiation existed
+    media_type = negotiate_media_type(request.headers.get("Accept"), results_file.media_types) or "application/json"
+    try:
+        parts = results_file.response_parts(request.headers.get("Accept-Encoding"), media_type)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if parts is None:
         return jsonify({"error": "No results yet. Run the model first."}), 404
+
+    etag, body, encoding = parts
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if etag in _if_none_match(request.headers.get("If-None-Match")):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, mimetype=media_type, headers=headers)
+
+
+def _if_none_match(header):
+    # Weak comparison (RFC 9110): W/"x" and "x" match
+    tags = {tag.strip() for tag in (header or "").split(",") if tag.strip()}
+    return tags | {tag[2:] for tag in tags if tag.startswith("W/")} | {f"W/{tag}" for tag in tags}
+
+
+def _chart_response(build):
+    """
+    Run build(pyramid, start, end, points) for the range/points query arguments; the response
+    carries the results version as its ETag, so an unchanged view revalidates with a 304.
+    """
     try:
-        with open(RESULTS_JSON) as f:
-            data = json.load(f)
-        return jsonify(data)
+        points = int(request.args.get("points", 500))
+    except ValueError:
+        return jsonify({"error": "points must be an integer"}), 400
+    points = min(max(points, 3), MAX_CHART_POINTS)
+    start, end = request.args.get("start") or None, request.args.get("end") or None
+    try:
+        current = chart_data.current()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    if current is None:
+        return jsonify({"error": "No results yet. Run the model first."}), 404
+
+    etag, pyramid = current
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in _if_none_match(request.headers.get("If-None-Match")):
+        return Response(status=304, headers=headers)
+    try:
+        body = build(pyramid, start, end, points)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid start/end: {e}"}), 400
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    return jsonify(body), 200, headers
+
+
+@app.route("/api/td3-results/summary", methods=["GET"])
+def get_td3_summary():
+    """Metrics and series extents without the arrays."""
+    return _chart_response(lambda pyramid, start, end, points: pyramid.summary())
+
+
+@app.route("/api/td3-results/ohlc", methods=["GET"])
+def get_td3_ohlc():
+    """
+    Price bars between ?start and ?end (ISO dates, both optional), at most ?points of them.
+    Wide ranges come from a coarser pyramid level; each bar then merges barsPerPoint bars.
+    """
+    return _chart_response(lambda pyramid, start, end, points: pyramid.ohlc(start, end, points))
+
+
+@app.route("/api/td3-results/series/<name>", methods=["GET"])
+def get_td3_series(name):
+    """portfolioHistory, actions or positions between ?start and ?end, LTTB-downsampled to ?points."""
+    if name not in LINE_SERIES:
+        return jsonify({"error": f"Unknown series {name!r}; expected one of {', '.join(LINE_SERIES)}"}), 404
+    return _chart_response(lambda pyramid, start, end, points: pyramid.line(name, start, end, points))
+
+
+@app.route("/api/td3-results/profile", methods=["GET"])
+def get_td3_profile():
+    """Where the last run's time went: per-phase totals, counts and latency histograms, plus counters."""
+    def build(pyramid, start, end, points):
+        if pyramid.profile is None:
+            raise LookupError("These results were written without a profile")
+        return pyramid.profile
+    return _chart_response(build)
+
+
+@app.route("/api/predict", methods=["GET"])
+def get_predict_info():
+    """Feature columns and window shape the predict endpoint expects."""
+    try:
+        info = policy_server.info()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if info is None:
+        return jsonify({"error": "No trained policy yet. Run the model first."}), 404
+    return jsonify(info)
+
+
+@app.route("/api/predict", methods=["POST"])
+def predict():
+    """
+    Action of the latest trained policy for one market state, without retraining.
+    Body: { rows: [[...feature values...], ...], position?: number } or { state: [...] }.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        out = policy_server.predict(body)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if out is None:
+        return jsonify({"error": "No trained policy yet. Run the model first."}), 404
+    return jsonify(out)
 
 
 @app.route("/api/run-td3", methods=["POST"])
 def run_td3():
-    """Run TD3 on CSV; capture stdout/stderr; return log + results."""
+    """
+    Queue a TD3 run on the CSV; returns the job id immediately (poll /api/jobs/<id>).
+    A repeat of a finished run is answered from the result cache unless body.noCache is true.
+    """
     episodes = 3  # fewer episodes so run finishes in 1-3 min and results show
     body = request.get_json(silent=True) or {}
     if isinstance(body.get("episodes"), int) and 1 <= body["episodes"] <= 100:
@@ -56,56 +220,107 @@ def run_td3():
         }), 400
 
     try:
-        proc = subprocess.run(
-            [sys.executable, "run_csv.py", "--episodes", str(episodes)],
-            cwd=TD3_DIR,
-            capture_output=True,
-            text=True,
-            timeout=600,
-            env={**os.environ, "PYTHONUNBUFFERED": "1"},
-        )
-        log_lines = []
-        if proc.stdout:
-            log_lines.extend(proc.stdout.splitlines())
-        if proc.stderr:
-            log_lines.extend(proc.stderr.splitlines())
-        if not log_lines:
-            log_lines = [f"Exit code: {proc.returncode}"]
-
-        if proc.returncode != 0:
-            return jsonify({
-                "success": False,
-                "log": log_lines,
-                "error": f"Process exited with code {proc.returncode}",
-            }), 200
-
-        results = None
-        if os.path.exists(RESULTS_JSON):
-            with open(RESULTS_JSON) as f:
-                results = json.load(f)
+        job = job_manager.submit(episodes, use_cache=not body.get("noCache", False))
+    except QueueFull as e:
+        return jsonify({"success": False, "log": [], "error": f"Too many queued runs: {e}"}), 429
 
-        return jsonify({
-            "success": True,
-            "log": log_lines,
-            "results": results,
-        })
-    except subprocess.TimeoutExpired:
-        return jsonify({
-            "success": False,
-            "log": ["Run timed out (10 min). Try fewer episodes."],
-            "error": "Timeout",
-        }), 200
+    return jsonify({
+        "success": True,
+        **job.to_dict(),
+        "position": job_manager.position(job),
+        "statusUrl": f"/api/jobs/{job.id}",
+    }), 200 if job.cached else 202
+
+
+@app.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    return jsonify([job.to_dict() for job in job_manager.list()])
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Status and latest progress event (episode, val Sharpe, timesteps/s) of a run."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify({**job.to_dict(), "position": job_manager.position(job)})
+
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def stream_job_events(job_id):
+    """
+    Server-Sent Events for one run: `log` (one stdout line), `progress` (episode, val_sharpe,
+    steps_per_sec, ...), `status` (job state; the stream ends once it is final) and `dropped`
+    when this client fell behind its bounded buffer.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    subscriber = job_manager.subscribe(job)
+
+    def events():
+        try:
+            while True:
+                event = subscriber.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event_type, data = event
+                yield f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+                if event_type == "status" and data["status"] in FINISHED_STATES:
+                    return
+        finally:
+            job_manager.unsubscribe(job, subscriber)
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    """Same shape as the former synchronous /api/run-td3 response: success, log, results."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job.status not in FINISHED_STATES:
+        return jsonify({**job.to_dict(), "error": "Job has not finished"}), 409
+
+    log_lines = list(job.log) or [f"Exit code: {job.returncode}"]
+    if job.status != SUCCEEDED:
+        return jsonify({"success": False, "log": log_lines, "error": job.error or job.status})
+    try:
+        with open(job.result_path) as f:
+            results = json.load(f)
     except Exception as e:
-        return jsonify({
-            "success": False,
-            "log": [],
-            "error": str(e),
-        }), 200
+        return jsonify({"success": False, "log": log_lines, "error": str(e)}), 500
+    return jsonify({"success": True, "log": log_lines, "results": results})
 
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5001))
     print(f"TD3 backend: http://127.0.0.1:{port}")
     print("  GET  /api/td3-results  - get last results")
-    print("  POST /api/run-td3      - run model (body: { episodes?: number })")
+    print("  GET  /api/td3-results/{summary,ohlc,series/<name>}?start=&end=&points= - chart views")
+    print("  GET  /api/td3-results/profile - per-phase timing breakdown of the last run")
+    print("  GET/POST /api/predict - action of the latest trained policy (body: { rows } or { state })")
+    print("  POST /api/run-td3      - queue a model run (body: { episodes?: number }) -> jobId")
+    print("  GET  /api/jobs/<id>    - job status and progress")
+    print("  GET  /api/jobs/<id>/events - live log/progress stream (Server-Sent Events)")
+    print("  POST /api/jobs/<id>/cancel, GET /api/jobs/<id>/result")
+    if job_manager.fork_server is not None:
+        job_manager.fork_server.start()  # imports and preloading happen while the server starts
+    try:
+        policy_server.bundle()  # load the Actor before the first /api/predict
+    except Exception as e:
+        print(f"  (serving bundle not loaded: {e})")
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,49 @@
+"""
+Stream years of synthetic bars from the offline LocalHistoryAPI through perform_chunking into
+a temporary bar store and report rows/s and peak RSS. Run it with different --years: peak RSS
+should stay flat because only the fetcher's in-flight chunks are ever held in memory.
+Usage (from td3/):  python benchmarks/chunk_pipeline_bench.py --years 3 --granularity S30
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+_td3_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _td3_dir not in sys.path:
+    sys.path.insert(0, _td3_dir)
+
+from src.data.local_api import LocalHistoryAPI
+from src.data.perform_ops import PerformDataOperations
+from src.utils.resources import peak_rss_mb
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--granularity", default="S30")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    api = LocalHistoryAPI()
+    baseline = peak_rss_mb()
+    with tempfile.TemporaryDirectory() as tmp:
+        pdo = PerformDataOperations(
+            instrument="NAS100_USD", start="", end="", granularity=args.granularity, years=args.years,
+            api_factory=lambda: api, max_workers=args.workers, requests_per_second=1000, data_dir=tmp,
+        )
+        t0 = time.perf_counter()
+        store = pdo.perform_chunking(granularity=args.granularity, load=False)
+        elapsed = time.perf_counter() - t0
+        rows = len(store)
+        size_mb = sum(os.path.getsize(os.path.join(store.path, f)) for f in os.listdir(store.path)) / 2**20
+
+    print(f"{args.years} years of {args.granularity}: {rows:,} rows, {size_mb:.0f} MB on disk")
+    print(f"{rows / elapsed:,.0f} rows/s, peak RSS {peak_rss_mb():.0f} MB (after imports: {baseline:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
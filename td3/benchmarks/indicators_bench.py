@@ -0,0 +1,136 @@
+"""
+Benchmark the NumPy indicator engine against the original per-column pandas implementation.
+Usage (from td3/):  python benchmarks/indicators_bench.py --bars 10000000
+Or, checking the NaN handling:  python benchmarks/indicators_bench.py --bars 1000000 --gaps 0.01
+Exits 1 if any indicator disagrees with the pandas implementation.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+_td3_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _td3_dir not in sys.path:
+    sys.path.insert(0, _td3_dir)
+
+from src.data.indicators import INDICATOR_COLUMNS, compute_indicators
+
+
+def synthetic_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 15000 * np.exp(np.cumsum(rng.normal(0, 2e-4, n)))
+    wiggle = np.abs(rng.normal(0, 3e-4, n)) * close
+    return close + wiggle, close - wiggle, close
+
+
+def punch_gaps(high, low, close, fraction, seed=1):
+    """
+    NaN out runs of 1-30 bars covering about `fraction` of the rows, mostly across all three
+    columns and sometimes in only one of them.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(close)
+    n_gaps = int(fraction * n / 15.5)
+    starts = rng.integers(0, n, n_gaps)
+    lengths = rng.integers(1, 31, n_gaps)
+    which = rng.integers(0, 6, n_gaps)  # 0-2: one column, 3-5: all three
+    high, low, close = high.copy(), low.copy(), close.copy()
+    for start, length, col in zip(starts, lengths, which):
+        for j, arr in enumerate((high, low, close)):
+            if col >= 3 or col == j:
+                arr[start:start + length] = np.nan
+    return high, low, close
+
+
+def pandas_reference(high, low, close):
+    """The indicator code as it was previously duplicated across the pipelines."""
+    df = pd.DataFrame({"high": high, "low": low, "close": close})
+    df["return"] = df["close"].pct_change().fillna(0)
+    df["log_return"] = np.log(df["close"] / df["close"].shift(1)).fillna(0)
+    df["ma5"] = df["close"].rolling(window=5).mean()
+    df["ma10"] = df["close"].rolling(window=10).mean()
+    df["ma_norm"] = df["close"] / df["ma5"]
+    df["cumulative_return"] = (1 + df["return"]).cumprod() - 1
+    high_low = df["high"] - df["low"]
+    high_close_prev = abs(df["high"] - df["close"].shift(1))
+    low_close_prev = abs(df["low"] - df["close"].shift(1))
+    true_range = pd.concat([high_low, high_close_prev, low_close_prev], axis=1).max(axis=1)
+    df["atr"] = true_range.rolling(window=14).mean()
+    df["natr"] = (df["atr"] / df["close"]) * 100
+    df["dpo"] = df["close"].shift(11) - df["close"].rolling(window=21).mean().shift(1)
+    df["dpo"] = df["dpo"].fillna(0)
+    df["volatility"] = df["close"].rolling(window=10).std()
+    df["momentum"] = (df["close"] - df["close"].shift(5)).fillna(0)
+    delta = df["close"].diff()
+    up = delta.clip(lower=0)
+    down = -1 * delta.clip(upper=0)
+    ma_up = up.rolling(window=14, min_periods=1).mean()
+    ma_down = down.rolling(window=14, min_periods=1).mean()
+    df["rsi"] = 100 - (100 / (1 + ma_up / (ma_down + 1e-6)))
+    df["ema12"] = df["close"].ewm(span=12, adjust=False).mean()
+    df["ema26"] = df["close"].ewm(span=26, adjust=False).mean()
+    df["macd"] = df["ema12"] - df["ema26"]
+    df["macd_signal"] = df["macd"].ewm(span=9, adjust=False).mean()
+    ma20 = df["close"].rolling(window=20).mean()
+    std20 = df["close"].rolling(window=20).std()
+    df["boll_upper"] = ma20 + 2 * std20
+    df["boll_lower"] = ma20 - 2 * std20
+    return df[INDICATOR_COLUMNS]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=10_000_000, help="Number of synthetic bars")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions (best is reported)")
+    parser.add_argument("--skip-reference", action="store_true", help="Do not time the pandas implementation")
+    parser.add_argument("--gaps", type=float, default=0.0, help="Fraction of bars to NaN out in short runs")
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="Max error / column scale before failing")
+    args = parser.parse_args()
+
+    high, low, close = synthetic_bars(args.bars)
+    if args.gaps:
+        high, low, close = punch_gaps(high, low, close, args.gaps)
+    print(f"Bars: {args.bars:,}  Indicators: {len(INDICATOR_COLUMNS)}  "
+          f"Missing closes: {np.isnan(close).mean():.2%}")
+
+    best = float("inf")
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        matrix = compute_indicators(high, low, close)
+        best = min(best, time.perf_counter() - t0)
+    print(f"engine:  {best:.3f}s  ({args.bars / best / 1e6:.1f}M bars/s, output {matrix.nbytes / 2**20:.0f} MB float32)")
+
+    if args.skip_reference:
+        return
+
+    t0 = time.perf_counter()
+    reference = pandas_reference(high, low, close)
+    ref_time = time.perf_counter() - t0
+    print(f"pandas:  {ref_time:.3f}s  (speedup {ref_time / best:.1f}x)")
+
+    ref = reference.to_numpy(dtype=np.float64)
+    failed = []
+    for j, name in enumerate(INDICATOR_COLUMNS):
+        expected = ref[:, j]
+        got = matrix[:, j].astype(np.float64)
+        if not np.array_equal(np.isnan(expected), np.isnan(got)):
+            print(f"  {name:<18} NaN layout differs ({np.sum(np.isnan(expected) != np.isnan(got))} rows)")
+            failed.append(name)
+            continue
+        mask = ~np.isnan(expected)
+        scale = np.abs(expected[mask]).max() if mask.any() else 1.0
+        err = np.abs(got[mask] - expected[mask]).max() / (scale + 1e-12) if mask.any() else 0.0
+        print(f"  {name:<18} max err / column scale {err:.2e}")
+        if err > args.tolerance:
+            failed.append(name)
+
+    if failed:
+        print(f"FAIL: {', '.join(failed)} disagree with pandas")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
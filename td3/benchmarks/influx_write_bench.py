@@ -0,0 +1,81 @@
+"""
+Compare per-row (iterrows) and column-template line-protocol encoding, then write the result to the
+offline LocalInfluxServer stand-in in parallel batches with injected 503s.
+Uses influxdb_client.Point for the per-row baseline when it is installed.
+Usage (from td3/):  python benchmarks/influx_write_bench.py --bars 500000 --batch-size 5000 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+_td3_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _td3_dir not in sys.path:
+    sys.path.insert(0, _td3_dir)
+
+from benchmarks.indicators_bench import synthetic_bars
+from src.data.indicators import INDICATOR_COLUMNS, add_indicators
+from src.data.influx_writer import InfluxBulkWriter, to_line_protocol
+from src.data.local_influx import LocalInfluxServer
+
+
+def per_row_lines(df, measurement, instrument):
+    try:
+        from influxdb_client import Point, WritePrecision
+    except ImportError:
+        Point = None
+
+    lines = []
+    for ts, row in df.iterrows():
+        if Point is not None:
+            point = Point(measurement).tag("instrument", instrument).time(ts, WritePrecision.S)
+            for col in df.columns:
+                point.field(col, float(row[col]))
+            lines.append(point.to_line_protocol())
+        else:
+            fields = ",".join(f"{col}={float(row[col])!r}" for col in df.columns)
+            lines.append(f"{measurement},instrument={instrument} {fields} {ts.value // 1_000_000_000}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=500_000)
+    parser.add_argument("--reference-bars", type=int, default=50_000, help="Rows encoded by the per-row baseline")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    high, low, close = synthetic_bars(args.bars)
+    index = pd.date_range("2025-01-02 13:00", periods=args.bars, freq="30s", name="time")
+    df = pd.DataFrame({"open": close, "high": high, "low": low, "close": close,
+                       "spread": np.full(args.bars, 0.8), "volume": np.full(args.bars, 120.0)}, index=index)
+    df = add_indicators(df, columns=INDICATOR_COLUMNS).fillna(0.0)
+    print(f"{len(df)} bars x {len(df.columns)} fields")
+
+    sample = df.iloc[:args.reference_bars]
+    t0 = time.perf_counter()
+    reference = per_row_lines(sample, "nasdaq100_5min", "NAS100_USD")
+    per_row = (time.perf_counter() - t0) / len(sample)
+    t0 = time.perf_counter()
+    lines = to_line_protocol(df, "nasdaq100_5min", {"instrument": "NAS100_USD"})
+    templated = (time.perf_counter() - t0) / len(df)
+    same = lines[:len(reference)] == reference
+    print(f"per-row encode:  {per_row * 1e6:.2f} us/bar")
+    print(f"template encode: {templated * 1e6:.2f} us/bar  ({per_row / templated:.1f}x, identical lines: {same})")
+
+    with LocalInfluxServer(token="bench", failure_rate=args.failure_rate) as server:
+        writer = InfluxBulkWriter(server.url, "bench", "org", "bucket", batch_size=args.batch_size,
+                                  max_workers=args.workers, backoff=0.01)
+        stats = writer.write_lines(lines)
+        received = len(server.lines.get("bucket", []))
+    print(f"write: {stats}  retried batches: {writer.retried}  "
+          f"sent {writer.bytes_sent / 1e6:.1f} MB gzip  received {received}/{len(lines)} lines")
+
+
+if __name__ == "__main__":
+    main()
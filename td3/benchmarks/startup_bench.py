@@ -0,0 +1,83 @@
+"""
+Start-up budget for the td3 entry points, measured with `python -X importtime` in fresh interpreters.
+Checks that `run_csv.py --help` returns without loading numpy/pandas/torch/matplotlib and that
+importing the model for inference (src.model.serving, as the policy server does) stays off
+pandas/matplotlib, each within a time budget. Exits 1 if a case is over budget.
+Usage (from td3/):  python benchmarks/startup_bench.py --help-budget-ms 150 --inference-budget-ms 4000
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+_td3_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """(total import time in µs, {package: cumulative µs}, set of every imported module)"""
+    total, packages, modules = 0, {}, set()
+    for line in stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        modules.add(name)
+        if len(indent) == 1:
+            total += int(cumulative)
+        if "." not in name:
+            packages[name] = packages.get(name, 0) + int(cumulative)  # includes what it imported
+    return total, packages, modules
+
+
+def measure(argv, repeat):
+    """Best-of-`repeat` wall time of a fresh interpreter running `argv`, plus its importtime report."""
+    best_wall, best = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *argv], cwd=_td3_dir,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - t0
+        if proc.returncode != 0:
+            raise SystemExit(f"{' '.join(argv)} exited with {proc.returncode}:\n{proc.stderr[-2000:]}")
+        if wall < best_wall:
+            best_wall, best = wall, parse_importtime(proc.stderr)
+    return best_wall, best
+
+
+def run_case(name, argv, budget_ms, forbidden, repeat, top):
+    wall, (total_us, by_module, modules) = measure(argv, repeat)
+    loaded = sorted(m for m in forbidden if m in modules)
+    over = wall * 1000 > budget_ms
+    status = "FAIL" if over or loaded else "ok"
+    print(f"[{status}] {name}: {wall * 1000:.0f} ms wall, {total_us / 1000:.0f} ms importing "
+          f"({len(modules)} modules), budget {budget_ms:.0f} ms")
+    for module, us in sorted(by_module.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"         {us / 1000:8.1f} ms  {module}")
+    if loaded:
+        print(f"         loads {', '.join(loaded)} (should be deferred)")
+    return status == "ok"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--help-budget-ms", type=float, default=150,
+                        help="Wall-time budget for `python run_csv.py --help`")
+    parser.add_argument("--inference-budget-ms", type=float, default=4000,
+                        help="Wall-time budget for importing src.model.serving")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per case (best is reported)")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages to list per case")
+    args = parser.parse_args()
+
+    ok = run_case("run_csv.py --help", ["run_csv.py", "--help"], args.help_budget_ms,
+                  forbidden={"numpy", "pandas", "torch", "matplotlib"}, repeat=args.repeat, top=args.top)
+    ok &= run_case("import src.model.serving", ["-c", "import src.model.serving"], args.inference_budget_ms,
+                   forbidden={"pandas", "matplotlib"}, repeat=args.repeat, top=args.top)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
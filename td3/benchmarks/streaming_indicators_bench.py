@@ -0,0 +1,73 @@
+"""
+Measure per-bar latency of the streaming indicators and check them against the batch engine,
+including a save/load round trip halfway through the stream.
+Usage (from td3/):  python benchmarks/streaming_indicators_bench.py --bars 200000
+With missing bars:  python benchmarks/streaming_indicators_bench.py --bars 200000 --gaps 0.01
+Exits 1 if any indicator disagrees with the batch engine.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+_td3_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _td3_dir not in sys.path:
+    sys.path.insert(0, _td3_dir)
+
+from benchmarks.indicators_bench import punch_gaps, synthetic_bars
+from src.data.indicators import INDICATOR_COLUMNS, compute_indicators
+from src.data.streaming_indicators import WARMUP_BARS, StreamingIndicators
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=200_000, help="Number of synthetic bars")
+    parser.add_argument("--gaps", type=float, default=0.0, help="Fraction of bars to NaN out in short runs")
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="Max error / column scale before failing")
+    args = parser.parse_args()
+
+    high, low, close = synthetic_bars(args.bars)
+    if args.gaps:
+        high, low, close = punch_gaps(high, low, close, args.gaps)
+    batch = compute_indicators(high, low, close)
+
+    stream = StreamingIndicators()
+    rows = np.empty((args.bars, len(INDICATOR_COLUMNS)))
+    half = args.bars // 2
+    t0 = time.perf_counter()
+    for i in range(args.bars):
+        if i == half:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "state.json")
+                stream.save(path)
+                stream = StreamingIndicators.load(path)
+        row = stream.update(high[i], low[i], close[i])
+        rows[i] = [row[name] for name in INDICATOR_COLUMNS]
+    elapsed = time.perf_counter() - t0
+    print(f"Bars: {args.bars:,}  per-bar update: {elapsed / args.bars * 1e6:.1f} us")
+
+    failed = []
+    for j, name in enumerate(INDICATOR_COLUMNS):
+        expected = batch[WARMUP_BARS:, j].astype(np.float64)
+        got = rows[WARMUP_BARS:, j].astype(np.float32).astype(np.float64)
+        missing = np.isnan(expected)
+        if not np.array_equal(missing, np.isnan(got)):
+            print(f"  {name:<18} NaN layout differs ({np.sum(missing != np.isnan(got))} rows)")
+            failed.append(name)
+            continue
+        scale = np.abs(expected[~missing]).max() + 1e-12
+        err = np.abs(got[~missing] - expected[~missing]).max() / scale
+        print(f"  {name:<18} max err / column scale {err:.2e}")
+        if err > args.tolerance:
+            failed.append(name)
+
+    if failed:
+        print(f"FAIL: {', '.join(failed)} disagree with the batch engine")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
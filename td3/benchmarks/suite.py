@@ -0,0 +1,283 @@
+"""
+Offline benchmark suite for the training stack, on synthetic OHLCV data:
+TradingEnvironment step/reset, ReplayBuffer add/sample across capacities and state dims,
+TD3 train/select_action, CSV preprocessing, and one end-to-end training episode.
+Results are written as JSON and compared with a stored baseline; exits 1 on a regression
+beyond --tolerance. Baselines are machine-specific: refresh with --update-baseline.
+Usage (from td3/):  python benchmarks/suite.py [--quick] [--only env,td3] [--update-baseline]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+
+_td3_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _td3_dir not in sys.path:
+    sys.path.insert(0, _td3_dir)
+
+from src.data.csv_preprocess import load_features
+from src.model.replay_buffer import ReplayBuffer
+from src.model.td3 import TD3
+from src.model.trading_environment import TradingEnvironment
+
+DEFAULT_BASELINE = os.path.join(_td3_dir, "benchmarks", "baseline.json")
+DEFAULT_OUT = os.path.join(_td3_dir, "results", "benchmarks.json")
+GROUPS = ("preprocess", "env", "buffer", "td3", "episode")
+
+
+def synthetic_csv(path, bars, seed=0):
+    """A GBM close with OHLC wiggle in the Date/Open/High/Low/Close/Volume schema."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    open_ = close * (1 + rng.normal(0, 0.002, bars))
+    wiggle = np.abs(rng.normal(0, 0.005, bars)) * close
+    pd.DataFrame({
+        "Date": pd.date_range("2000-01-03", periods=bars, freq="D").strftime("%m/%d/%Y"),
+        "Open": open_,
+        "High": np.maximum(open_, close) + wiggle,
+        "Low": np.minimum(open_, close) - wiggle,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 100_000_000, bars),
+    }).to_csv(path, index=False)
+
+
+def best_of(repeat, fn):
+    """Shortest wall time of `repeat` calls to fn()."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def calls(n, fn, *args):
+    """fn(*args) n times, dropping the results (a list would keep every sampled batch alive)."""
+    def run():
+        for _ in range(n):
+            fn(*args)
+    return run
+
+
+def metric(value, unit, higher_is_better):
+    return {"value": float(value), "unit": unit, "higher_is_better": higher_is_better}
+
+
+def bench_preprocess(csv_path, bars, repeat):
+    seconds = best_of(repeat, lambda: load_features(csv_path, use_cache=False))
+    return {"preprocess.rows_per_sec": metric(bars / seconds, "rows/s", True)}
+
+
+def bench_env(train_df, steps, repeat, lookback, frame_stack):
+    env = TradingEnvironment(train_df, lookback_window=lookback, frame_stack=frame_stack)
+    steps = min(steps, env.end_idx - lookback - 1)
+    actions = np.random.default_rng(1).uniform(-1, 1, steps)
+
+    def run():
+        env.reset()
+        for action in actions:
+            env.step(action)
+
+    step_seconds = best_of(repeat, run)
+    resets = 10 * steps
+    reset_seconds = best_of(repeat, calls(resets, env.reset))
+    return {
+        "env.step_per_sec": metric(steps / step_seconds, "steps/s", True),
+        "env.reset_per_sec": metric(resets / reset_seconds, "resets/s", True),
+    }
+
+
+def bench_buffer(capacities, state_dims, ops, batch_size, max_mb, repeat):
+    results = {}
+    rng = np.random.default_rng(2)
+    for capacity in capacities:
+        for state_dim in state_dims:
+            if 2 * capacity * state_dim * 4 / 2**20 > max_mb:
+                print(f"  skip buffer {capacity}x{state_dim} (over --max-buffer-mb)")
+                continue
+            buffer = ReplayBuffer(state_dim, 1, max_size=capacity)
+            state = rng.standard_normal(state_dim)
+            action = np.zeros(1)
+
+            add = calls(ops, buffer.add, state, action, state, 0.0, False)
+            add_seconds = best_of(repeat, add)
+            while buffer.size < min(capacity, 10 * batch_size):
+                add()
+            sample_seconds = best_of(repeat, calls(ops // 10, buffer.sample, batch_size))
+            tag = f"buffer.{capacity}x{state_dim}"
+            results[f"{tag}.add_us"] = metric(add_seconds / ops * 1e6, "us", False)
+            results[f"{tag}.sample_us"] = metric(sample_seconds / (ops // 10) * 1e6, "us", False)
+    return results
+
+
+def bench_td3(state_dim, updates, batch_size, repeat):
+    policy = TD3(state_dim=state_dim, action_dim=1, max_action=1.0)
+    buffer = ReplayBuffer(state_dim, 1, max_size=10 * batch_size)
+    rng = np.random.default_rng(3)
+    for _ in range(10 * batch_size):
+        buffer.add(rng.standard_normal(state_dim), rng.uniform(-1, 1, 1), rng.standard_normal(state_dim),
+                   rng.normal(), False)
+    policy.train(buffer, batch_size)  # first call pays for lazy optimizer set-up
+
+    train_seconds = best_of(repeat, calls(updates, policy.train, buffer, batch_size))
+    state = rng.standard_normal(state_dim)
+    selects = 10 * updates
+    select_seconds = best_of(repeat, calls(selects, policy.select_action, state))
+    return {
+        "td3.train_updates_per_sec": metric(updates / train_seconds, "updates/s", True),
+        "td3.select_action_us": metric(select_seconds / selects * 1e6, "us", False),
+    }
+
+
+def bench_episode(train_df, steps, batch_size, lookback, frame_stack):
+    """One run_csv-style episode: exploration noise, buffer adds and a TD3 update every step."""
+    env = TradingEnvironment(train_df, lookback_window=lookback, frame_stack=frame_stack)
+    steps = min(steps, env.end_idx - lookback - 1)
+    state_dim = env.get_state_dim()
+    policy = TD3(state_dim=state_dim, action_dim=1, max_action=1.0)
+    buffer = ReplayBuffer(state_dim, 1)
+    rng = np.random.default_rng(4)
+    warmup = min(batch_size, steps // 4)  # random actions until there is something to learn from
+
+    t0 = time.perf_counter()
+    state = env.reset()
+    for step in range(steps):
+        if step < warmup:
+            action = rng.uniform(-1, 1, 1)
+        else:
+            action = np.clip(policy.select_action(np.array(state)) + rng.normal(0, 0.1, 1), -1, 1)
+        next_state, reward, done, _ = env.step(action[0])
+        buffer.add(state, action, next_state, reward, done)
+        state = next_state
+        if step >= warmup:
+            policy.train(buffer, batch_size)
+    seconds = time.perf_counter() - t0
+    return {
+        "episode.seconds": metric(seconds, "s", False),
+        "episode.steps_per_sec": metric(steps / seconds, "steps/s", True),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print current vs baseline per metric; returns the names that regressed beyond tolerance."""
+    regressions = []
+    print(f"\n{'metric':<36} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<36} {'-':>12} {current['value']:>12.4g} {'new':>8}")
+            continue
+        # Positive change = better, whichever direction the metric goes
+        change = current["value"] / base["value"] - 1
+        if not current["higher_is_better"]:
+            change = base["value"] / current["value"] - 1
+        flag = ""
+        if change < -tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36} {base['value']:>12.4g} {current['value']:>12.4g} {change * 100:>+7.1f}%{flag}")
+    return regressions
+
+
+def machine():
+    return {
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes, for a smoke run")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"Comma-separated groups from {', '.join(GROUPS)}")
+    parser.add_argument("--bars", type=int, default=20_000, help="Synthetic bars for preprocessing and the env")
+    parser.add_argument("--lookback", type=int, default=60, help="Environment lookback window")
+    parser.add_argument("--frame-stack", type=int, default=4, help="Environment frame stack")
+    parser.add_argument("--episode-steps", type=int, default=500, help="Steps in the end-to-end episode")
+    parser.add_argument("--batch-size", type=int, default=256, help="TD3 / replay batch size")
+    parser.add_argument("--max-buffer-mb", type=float, default=2048, help="Skip buffer sizes above this")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions (best is reported)")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown vs baseline before a metric counts as a regression")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for data, actions and torch")
+    args = parser.parse_args()
+
+    groups = [group for group in args.only.split(",") if group]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    scale = 10 if args.quick else 1
+    bars = args.bars // scale
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "SYNTH_data.csv")
+        synthetic_csv(csv_path, bars, seed=args.seed)
+        train_df = load_features(csv_path, use_cache=False)[0]
+        state_dim = TradingEnvironment(train_df, lookback_window=args.lookback,
+                                       frame_stack=args.frame_stack).get_state_dim()
+        print(f"Bars: {bars:,}  state_dim: {state_dim}  torch threads: {torch.get_num_threads()}")
+
+        if "preprocess" in groups:
+            results.update(bench_preprocess(csv_path, bars, args.repeat))
+        if "env" in groups:
+            results.update(bench_env(train_df, 10_000 // scale, args.repeat, args.lookback, args.frame_stack))
+        if "buffer" in groups:
+            capacities = (10_000,) if args.quick else (10_000, 100_000)
+            results.update(bench_buffer(capacities, (64, 1024, state_dim), 10_000 // scale,
+                                        args.batch_size, args.max_buffer_mb, args.repeat))
+        if "td3" in groups:
+            results.update(bench_td3(state_dim, 50 // scale, args.batch_size, args.repeat))
+        if "episode" in groups:
+            results.update(bench_episode(train_df, args.episode_steps // scale, args.batch_size, args.lookback, args.frame_stack))
+
+    config = {"quick": args.quick, "bars": bars, "episode_steps": args.episode_steps // scale,
+              "lookback": args.lookback, "frame_stack": args.frame_stack, "batch_size": args.batch_size,
+              "state_dim": state_dim}
+    report = {"machine": machine(), "config": config, "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Updated baseline {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to store one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != config:
+        print(f"Baseline {args.baseline} was recorded with a different configuration "
+              f"({baseline.get('config')}); not comparing")
+        return
+    if baseline.get("machine") != report["machine"]:
+        print("Note: baseline was recorded on a different machine or software stack")
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Fork server for backend runs: imports torch/pandas/matplotlib and run_csv once, preloads the
+CSV features, then forks one child per job so a run starts training without paying for
+interpreter start-up, imports or preprocessing. Each child is its own process (a crash or a
+kill only ends that run) and exits when its run is done.
+
+Protocol, over a Unix socket, one connection per run:
+    client -> {"argv": ["run_csv.py", ...]}\\n      (or {"shutdown": true}\\n)
+    child  -> "@@pid <pid>\\n", then the run's stdout/stderr lines
+    child  -> "@@exit <code>\\n" when the run returns or raises
+    server -> "@@exit <returncode>\\n" once the child has exited (the only one after a crash)
+Started by the backend (worker_pool.ForkServer):  python fork_server.py --socket PATH [--preload CSV]
+"""
+import argparse
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import traceback
+
+_td3_dir = os.path.dirname(os.path.abspath(__file__))
+if _td3_dir not in sys.path:
+    sys.path.insert(0, _td3_dir)
+
+import run_csv  # noqa: E402
+# run_csv imports its stack lazily (fast --help); the fork server pays for it here, once
+from src.data import csv_preprocess  # noqa: E402
+from src.data import dr  # noqa: E402,F401
+from src.model import replay_buffer, serving, td3, trading_environment  # noqa: E402,F401
+from src.utils import columnar, logger  # noqa: E402
+import torch._dynamo  # noqa: E402,F401  (imported lazily by the first torch.optim optimizer, ~2.5s)
+
+PID_PREFIX = "@@pid "
+EXIT_PREFIX = "@@exit "
+
+
+def _run_child(conn, listener, argv):
+    """In the forked child: send output to the client's socket and run run_csv.main()."""
+    listener.close()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    code = 1
+    try:
+        os.dup2(conn.fileno(), 1)
+        os.dup2(conn.fileno(), 2)
+        conn.close()
+        sys.stdout.reconfigure(line_buffering=True)
+        sys.stderr.reconfigure(line_buffering=True)
+        print(f"{PID_PREFIX}{os.getpid()}", flush=True)
+        sys.argv = list(argv)
+        run_csv.main()
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            logger.stop_logging()  # os._exit skips atexit: flush the queued log records first
+            # Reported by the child too, so a normal exit is known even if the server is gone
+            print(f"{EXIT_PREFIX}{code}", flush=True)
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def serve(socket_path, preload=None):
+    if preload:
+        csv_preprocess.warm(preload, cache_dir=run_csv.DEFAULT_CACHE_DIR)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(16)
+    children = {}  # pid -> client connection, answered with the exit code once reaped
+    accepting = True
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    while accepting or children:
+        readable, _, _ = select.select([listener] if accepting else [], [], [], 0.05)
+        if readable:
+            conn, _ = listener.accept()
+            try:
+                conn.settimeout(5.0)
+                request = json.loads(conn.makefile("r").readline() or "{}")
+                conn.settimeout(None)
+            except (OSError, ValueError):
+                conn.close()
+                request = None
+            if request is not None and request.get("shutdown"):
+                # Finish the runs in flight, take no new ones
+                accepting = False
+                conn.close()
+            elif request is not None:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                pid = os.fork()
+                if pid == 0:
+                    _run_child(conn, listener, request["argv"])
+                children[pid] = conn
+
+        while children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            conn = children.pop(pid, None)
+            if conn is not None:
+                try:
+                    conn.sendall(f"{EXIT_PREFIX}{os.waitstatus_to_exitcode(status)}\n".encode())
+                except OSError:
+                    pass
+                conn.close()
+
+    listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", required=True, help="Unix socket path to listen on")
+    parser.add_argument("--preload", default=None, help="CSV whose features are loaded before forking")
+    args = parser.parse_args()
+    serve(args.socket, preload=args.preload)
+
+
+if __name__ == "__main__":
+    main()
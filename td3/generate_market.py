@@ -0,0 +1,67 @@
+"""
+Generate a deterministic synthetic market (src/data/synthetic_market.py) for offline load tests.
+Usage (from td3/):  python generate_market.py --bars 10000000
+Or:  python generate_market.py --format bars --bars 20000000 --instrument SYNTH_USD --granularity S30
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+_td3_dir = os.path.dirname(os.path.abspath(__file__))
+if _td3_dir not in sys.path:
+    sys.path.insert(0, _td3_dir)
+
+logger = logging.getLogger("td3-stock-trading")
+
+DEFAULT_OUT = os.path.join(_td3_dir, "stock-data", "synthetic", "SYNTH_data.csv")
+DEFAULT_BAR_ROOT = os.path.join(_td3_dir, "stock-data", "bars")
+
+
+def _size_mb(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 2 ** 20
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files) / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=10_000_000, help="Number of bars to generate")
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000, help="Bars generated and written per chunk")
+    parser.add_argument("--seed", type=int, default=0, help="Same seed, same bars")
+    parser.add_argument("--freq", default="30s",
+                        help="Bar length (e.g. 30s, 5min, 1D); 9 session hours a weekday, so 10M 30s bars span 37 years")
+    parser.add_argument("--start", default="2010-01-04", help="First trading day")
+    parser.add_argument("--format", choices=("csv", "bars"), default="csv",
+                        help="OHLCV CSV for run_csv.py, or bid/ask bars in a BarStore for PreprocessData")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="CSV path (--format csv)")
+    parser.add_argument("--root", default=DEFAULT_BAR_ROOT, help="BarStore root (--format bars)")
+    parser.add_argument("--instrument", default="SYNTH_USD", help="BarStore instrument (--format bars)")
+    parser.add_argument("--granularity", default="S30", help="BarStore granularity (--format bars)")
+    parser.add_argument("--spread-bps", type=float, default=1.0, help="Typical bid/ask spread in basis points")
+    parser.add_argument("--base-volume", type=int, default=1000, help="Typical volume per bar")
+    args = parser.parse_args()
+
+    from src.utils.logger import setup_logging
+    from src.data.synthetic_market import SyntheticMarket, write_bar_store, write_csv
+    setup_logging()
+
+    market = SyntheticMarket(seed=args.seed, start=args.start, freq=args.freq,
+                             spread_bps=args.spread_bps, base_volume=args.base_volume)
+    t0 = time.perf_counter()
+    if args.format == "csv":
+        write_csv(market, args.out, args.bars, chunk_rows=args.chunk_rows)
+        path = args.out
+    else:
+        store = write_bar_store(market, args.bars, instrument=args.instrument, granularity=args.granularity,
+                                root=args.root, chunk_rows=args.chunk_rows)
+        path = store.path
+    elapsed = time.perf_counter() - t0
+    last = market.timestamps(args.bars - 1, 1)[0]
+    logger.info(f"Generated {args.bars} bars up to {last} in {elapsed:.1f}s "
+                f"({args.bars / max(elapsed, 1e-9):.0f} rows/s), {_size_mb(path):.0f} MB at {path}")
+
+
+if __name__ == "__main__":
+    main()
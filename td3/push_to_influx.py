@@ -1,12 +1,13 @@
-import time
+import argparse
 import os
-from datetime import datetime, timedelta
 import logging
-import tpqoa
-import numpy as np
 import pandas as pd
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import SYNCHRONOUS
+
+from src.data.concurrent_fetch import ConcurrentFetcher
+from src.data.fetch_data import create_api
+from src.data.indicators import INDICATOR_COLUMNS, add_indicators
+from src.data.influx_writer import InfluxBulkWriter
+from src.data.live_ingest import LiveIngestor, run_live
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("nasdaq-fetcher")
@@ -16,11 +17,12 @@ INFLUXDB_ORG = "Hillbert Lab"
 INFLUXDB_URL = "http://localhost:8086"
 INFLUXDB_BUCKET = "dexblaze-web"
 
-influx_client = InfluxDBClient(url=INFLUXDB_URL, token=INFLUXDB_TOKEN, org=INFLUXDB_ORG)
-write_api = influx_client.write_api(write_options=SYNCHRONOUS)
+writer = InfluxBulkWriter(url=INFLUXDB_URL, token=INFLUXDB_TOKEN, org=INFLUXDB_ORG, bucket=INFLUXDB_BUCKET,
+                          precision="s", batch_size=5000, max_workers=4)
 
 INSTRUMENT = "NAS100_USD"
 GRANULARITY = "S30"
+MEASUREMENT = "nasdaq100_5min"
 
 
 def _filter_market_hours(data):
@@ -40,53 +42,8 @@ def _filter_market_hours(data):
     return filtered_df
 
 
-def _add_indicators(df):
-    df['return'] = df['close'].pct_change().fillna(0)
-    df['log_return'] = np.log(df['close'] / df['close'].shift(1)).fillna(0)
-
-    df['ma5'] = df['close'].rolling(window=5).mean()
-    df['ma10'] = df['close'].rolling(window=10).mean()
-    df['ma_norm'] = df['close'] / df['ma5']
-    df['cumulative_return'] = (1 + df['return']).cumprod() - 1
-
-    high_low = df['high'] - df['low']
-    high_close_prev = abs(df['high'] - df['close'].shift(1))
-    low_close_prev = abs(df['low'] - df['close'].shift(1))
-    true_range = pd.concat([high_low, high_close_prev, low_close_prev], axis=1).max(axis=1)
-    df['atr'] = true_range.rolling(window=14).mean()
-    df['natr'] = (df['atr'] / df['close']) * 100
-
-    df['dpo'] = df['close'].shift(11) - df['close'].rolling(window=21).mean().shift(1)
-    df['dpo'] = df['dpo'].fillna(0)
-
-    df['volatility'] = df['close'].rolling(window=10).std()
-    df['momentum'] = df['close'] - df['close'].shift(5)
-    df['momentum'] = df['momentum'].fillna(0)
-
-    window_length = 14
-    delta = df['close'].diff()
-    up = delta.clip(lower=0)
-    down = -1 * delta.clip(upper=0)
-    ma_up = up.rolling(window=window_length, min_periods=1).mean()
-    ma_down = down.rolling(window=window_length, min_periods=1).mean()
-    rs = ma_up / (ma_down + 1e-6)
-    df['rsi'] = 100 - (100 / (1 + rs))
-
-    df['ema12'] = df['close'].ewm(span=12, adjust=False).mean()
-    df['ema26'] = df['close'].ewm(span=26, adjust=False).mean()
-    df['macd'] = df['ema12'] - df['ema26']
-    df['macd_signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-
-    ma20 = df['close'].rolling(window=20).mean()
-    std20 = df['close'].rolling(window=20).std()
-    df['boll_upper'] = ma20 + 2 * std20
-    df['boll_lower'] = ma20 - 2 * std20
-
-    return df
-
-
 def fetch_ohlc(instrument: str, start: str, end: str, granularity: str = "S30"):
-    api = tpqoa.tpqoa("oanda.cfg")
+    api = create_api()
 
     try:
         df_bid = api.get_history(instrument=instrument, start=start, end=end, granularity=granularity, price="B")
@@ -108,37 +65,59 @@ def fetch_ohlc(instrument: str, start: str, end: str, granularity: str = "S30"):
         df = _filter_market_hours(df)
 
         # Add indicators
-        df = _add_indicators(df)
+        df = add_indicators(df, columns=INDICATOR_COLUMNS)
 
         for col in df.columns:
             if df[col].isnull().any():
                 median_val = df[col].median()
                 df[col] = df[col].fillna(median_val)
 
-        # Convert to InfluxDB points
-        points = []
-        for ts, row in df.iterrows():
-            point = Point("nasdaq100_5min").tag("instrument", instrument).time(ts, WritePrecision.S)
-            for col in df.columns:
-                point.field(col, float(row[col]))
-            points.append(point)
-
-        return points
+        return df
 
     except Exception as e:
         logger.error(f"Error fetching data: {e}")
         return None
 
 
-if __name__ == "__main__":
-    end_date = "2025-04-15"
-    start_date = "2025-02-01"
+def run_once(instrument, granularity, start_date, end_date):
+    logger.info(f"Fetching {instrument} data from {start_date} to {end_date}...")
+    data = fetch_ohlc(instrument=instrument, granularity=granularity, start=start_date, end=end_date)
 
-    logger.info(f"Fetching data from {start_date} to {end_date}...")
-    data_points = fetch_ohlc(instrument=INSTRUMENT, granularity=GRANULARITY, start=start_date, end=end_date)
-
-    if data_points:
-        write_api.write(bucket=INFLUXDB_BUCKET, org=INFLUXDB_ORG, record=data_points)
-        logger.info(f"Wrote {len(data_points)} data points.")
+    if data is not None:
+        stats = writer.write(data, MEASUREMENT, tags={"instrument": instrument})
+        logger.info(f"Wrote {stats['lines']} data points in {stats['batches']} batches "
+                    f"({stats['lines_per_sec']} points/s, encoded in {stats['encode_seconds']}s).")
     else:
         logger.warning("No data written due to fetch failure.")
+
+
+def run_daemon(instruments, granularity, backfill_start=None, checkpoint_dir="stock-data/ingest", poll_seconds=None):
+    """Keep every instrument current: backfill from its checkpoint, then poll once per bar."""
+    fetcher = ConcurrentFetcher(api_factory=create_api, max_workers=4, requests_per_second=10)
+    ingestors = [
+        LiveIngestor(instrument, granularity, fetcher, writer, MEASUREMENT,
+                     checkpoint_dir=checkpoint_dir, backfill_start=backfill_start)
+        for instrument in instruments
+    ]
+    logger.info(f"Live ingestion of {', '.join(instruments)} at {granularity}")
+    run_live(ingestors, poll_seconds=poll_seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true", help="Run continuously, polling for new bars")
+    parser.add_argument("--instruments", nargs="+", default=[INSTRUMENT])
+    parser.add_argument("--granularity", default=GRANULARITY)
+    parser.add_argument("--start", default=None,
+                        help="One-shot start date; in --live mode, backfill start for instruments without a checkpoint")
+    parser.add_argument("--end", default="2025-04-15", help="One-shot end date")
+    parser.add_argument("--checkpoint-dir", default="stock-data/ingest")
+    parser.add_argument("--poll-seconds", type=float, default=None, help="Poll interval (default: one bar)")
+    args = parser.parse_args()
+
+    if args.live:
+        run_daemon(args.instruments, args.granularity, backfill_start=args.start,
+                   checkpoint_dir=args.checkpoint_dir, poll_seconds=args.poll_seconds)
+    else:
+        for instrument in args.instruments:
+            run_once(instrument, args.granularity, args.start or "2025-02-01", args.end)
@@ -5,33 +5,40 @@ Or:  python run_csv.py --csv "CSV file/AAPL_data.csv" --out "../frontend/public/
 """
 import argparse
 import json
+import logging
 import os
 import sys
-
-import numpy as np
-import pandas as pd
+import time
 
 # Add td3 directory to path so "from src.xxx" works from both td3/ and project root
 _td3_dir = os.path.dirname(os.path.abspath(__file__))
 if _td3_dir not in sys.path:
     sys.path.insert(0, _td3_dir)
 
-from src.data.csv_preprocess import load_and_preprocess_csv
-from src.model.trading_environment import TradingEnvironment
-from src.model.td3 import TD3
-from src.utils.logger import setup_logging
-
-logger = setup_logging()
+# numpy/pandas/torch and the model stack are imported inside run_inference_and_export, so
+# `--help` and argument errors return without loading them (see benchmarks/startup_bench.py).
+# Handlers are attached by setup_logging() in main().
+logger = logging.getLogger("td3-stock-trading")
 
 # Default paths relative to project root (parent of td3)
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DEFAULT_CSV = os.path.join(PROJECT_ROOT, "CSV file", "AAPL_data.csv")
 DEFAULT_OUT = os.path.join(PROJECT_ROOT, "frontend", "public", "td3_results.json")
 DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feature-cache")
+
+# Lines starting with this prefix carry one JSON progress event (parsed by the backend job runner)
+PROGRESS_PREFIX = "@@progress "
+
+
+def emit_progress(enabled, **event):
+    if enabled:
+        print(PROGRESS_PREFIX + json.dumps(event), flush=True)
 
 
 def set_seeds(seed=42):
     import random
+    import numpy as np
     import torch
     np.random.seed(seed)
     random.seed(seed)
@@ -40,6 +47,14 @@ def set_seeds(seed=42):
         torch.cuda.manual_seed(seed)
 
 
+def torch_sync(device):
+    """torch.cuda.synchronize on a GPU (so phase timers see kernel time), else None."""
+    if device.type != "cuda":
+        return None
+    import torch
+    return torch.cuda.synchronize
+
+
 def run_inference_and_export(
     csv_path: str,
     output_json_path: str,
@@ -49,32 +64,58 @@ def run_inference_and_export(
     max_episodes: int = 30,
     max_timesteps: int = 50000,
     eval_freq: int = 5,
+    cache_dir: str = None,
+    use_cache: bool = True,
+    n_components: int = None,
+    progress: bool = False,
+    binary: bool = False,
+    profiler: str = None,
+    profile_every: int = 1000,
+    profile_steps: int = 20,
 ):
+    import numpy as np
+    from src.data.csv_preprocess import load_features
+    from src.data.dr import DimensionReducer
+    from src.model.trading_environment import TradingEnvironment
+    from src.model.serving import save_bundle
+    from src.model.td3 import TD3, device
+    from src.utils import columnar
+    from src.utils.profiling import PeriodicProfiler, PhaseTimer
+
     print("\n[TD3] Running model on CSV. Model output with explanations will be printed at the end.\n")
     set_seeds()
     os.makedirs(results_dir, exist_ok=True)
-
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    # Per-phase wall time for the payload's "profile". Spans only wait for queued GPU kernels
+    # under --profile: a device sync per span would slow every training step.
+    timer = PhaseTimer(sync=torch_sync(device) if profiler else None)
+    periodic = None
+    if profiler:
+        periodic = PeriodicProfiler(profiler, os.path.join(results_dir, "profiles"), profile_every, profile_steps)
+
+    emit_progress(progress, phase="preprocess", episodes=max_episodes)
     logger.info("Loading and preprocessing CSV: %s", csv_path)
-    train_df, val_df, test_df = load_and_preprocess_csv(csv_path)
+    with timer.phase("preprocess"):
+        # raw_df keeps unnormalized OHLC for the chart; both come from the feature cache on warm runs
+        train_df, val_df, test_df, raw_df, scaler = load_features(csv_path, cache_dir=cache_dir, use_cache=use_cache)
 
-    # Keep raw OHLC for chart (from original CSV)
-    raw_df = pd.read_csv(csv_path)
-    raw_df = raw_df.rename(columns={
-        "Date": "date", "Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume",
-    })
-    raw_df["date"] = pd.to_datetime(raw_df["date"]).astype(str)
+        # Optional per-bar PCA: fitted on the training split only, saved next to the checkpoints
+        reducer = None
+        if n_components:
+            reducer = DimensionReducer(method="pca", n_components=n_components).fit(train_df)
+            reducer.save(os.path.join(results_dir, "td3_dim_reducer"))
 
     train_env = TradingEnvironment(
         train_df, lookback_window=lookback_window, transaction_cost=0.0003,
-        max_position=1.0, frame_stack=frame_stack,
+        max_position=1.0, frame_stack=frame_stack, reducer=reducer,
     )
     val_env = TradingEnvironment(
         val_df, lookback_window=lookback_window, transaction_cost=0.0003,
-        max_position=1.0, frame_stack=frame_stack,
+        max_position=1.0, frame_stack=frame_stack, reducer=reducer,
     )
     test_env = TradingEnvironment(
         test_df, lookback_window=lookback_window, transaction_cost=0.0003,
-        max_position=1.0, frame_stack=frame_stack,
+        max_position=1.0, frame_stack=frame_stack, reducer=reducer,
     )
 
     state_dim = train_env.get_state_dim()
@@ -85,6 +126,7 @@ def run_inference_and_export(
         state_dim=state_dim, action_dim=action_dim, max_action=max_action,
         discount=0.995, tau=0.0005, policy_noise=0.15, noise_clip=0.35, policy_freq=4,
     )
+    policy.timer = timer
 
     from src.model.replay_buffer import ReplayBuffer
     replay_buffer = ReplayBuffer(state_dim, action_dim)
@@ -93,54 +135,89 @@ def run_inference_and_export(
     exploration_noise = 0.1
 
     logger.info("Training TD3 (short run for demo)...")
+    emit_progress(progress, phase="train", episode=0, episodes=max_episodes)
     for episode in range(1, max_episodes + 1):
         state = train_env.reset()
         done = False
         total_timesteps = (episode - 1) * 5000  # approximate
         episode_timesteps = 0
+        episode_start = time.perf_counter()
 
         while not done and episode_timesteps < max_timesteps:
             episode_timesteps += 1
             total_timesteps += 1
-            if total_timesteps < 1000:
-                action = np.random.uniform(-max_action, max_action, size=(action_dim,))
-            else:
-                action = policy.select_action(np.array(state))
-                action = action + np.random.normal(0, exploration_noise, size=action_dim)
-                action = np.clip(action, -max_action, max_action)
-            next_state, reward, done, _ = train_env.step(action[0])
-            replay_buffer.add(state, action, next_state, reward, done)
+            if periodic is not None:
+                periodic.step()
+            with timer.phase("select_action"):
+                if total_timesteps < 1000:
+                    action = np.random.uniform(-max_action, max_action, size=(action_dim,))
+                else:
+                    action = policy.select_action(np.array(state))
+                    action = action + np.random.normal(0, exploration_noise, size=action_dim)
+                    action = np.clip(action, -max_action, max_action)
+            with timer.phase("env_step"):
+                next_state, reward, done, _ = train_env.step(action[0])
+            with timer.phase("replay_add"):
+                replay_buffer.add(state, action, next_state, reward, done)
             state = next_state
             if total_timesteps >= 5000:
-                policy.train(replay_buffer, batch_size=256)
-
-        if episode % eval_freq == 0:
-            val_state = val_env.reset()
-            val_done = False
-            while not val_done:
-                a = policy.select_action(np.array(val_state))
-                val_state, _, val_done, _ = val_env.step(a[0])
-            val_returns = np.array(val_env.portfolio_history[1:]) / np.array(val_env.portfolio_history[:-1]) - 1
-            val_sharpe = np.mean(val_returns) / (np.std(val_returns) + 1e-8) * np.sqrt(252)
+                with timer.phase("train"):
+                    policy.train(replay_buffer, batch_size=256)
+                timer.count("train_updates")
+        timer.count("episodes")
+        timer.count("env_steps", episode_timesteps)
+
+        episode_seconds = time.perf_counter() - episode_start
+        val_sharpe = None
+        # The last episode is always evaluated, so short runs still leave a best checkpoint
+        if episode % eval_freq == 0 or episode == max_episodes:
+            with timer.phase("evaluation"):
+                val_state = val_env.reset()
+                val_done = False
+                while not val_done:
+                    a = policy.select_action(np.array(val_state))
+                    val_state, _, val_done, _ = val_env.step(a[0])
+                val_returns = np.array(val_env.portfolio_history[1:]) / np.array(val_env.portfolio_history[:-1]) - 1
+                val_sharpe = np.mean(val_returns) / (np.std(val_returns) + 1e-8) * np.sqrt(252)
             if val_sharpe > best_val_sharpe:
                 best_val_sharpe = val_sharpe
-                policy.save(os.path.join(results_dir, "td3_best_model"))
+                with timer.phase("checkpoint"):
+                    policy.save(os.path.join(results_dir, "td3_best_model"))
             logger.info("Episode %d | Val Sharpe %.4f", episode, val_sharpe)
-
-    policy.save(os.path.join(results_dir, "td3_final_model"))
-    policy.load(os.path.join(results_dir, "td3_best_model"))
+        emit_progress(
+            progress, phase="train", episode=episode, episodes=max_episodes, timesteps=episode_timesteps,
+            steps_per_sec=round(episode_timesteps / max(episode_seconds, 1e-9), 1),
+            val_sharpe=None if val_sharpe is None else round(float(val_sharpe), 4),
+        )
+
+    if periodic is not None:
+        periodic.stop()
+
+    with timer.phase("checkpoint"):
+        policy.save(os.path.join(results_dir, "td3_final_model"))
+        policy.load(os.path.join(results_dir, "td3_best_model"))
+
+        # Best actor + scaler + feature layout, for the backend's /api/predict
+        save_bundle(
+            os.path.join(results_dir, "td3_serving"), policy.actor, state_dim, action_dim, max_action,
+            feature_columns=train_env.feature_columns, scaler=scaler,
+            fill_values=train_df[train_env.feature_columns].median(),
+            lookback_window=lookback_window, frame_stack=frame_stack, reducer=reducer,
+        )
 
     # Run on test set and collect outputs
+    emit_progress(progress, phase="test", episodes=max_episodes)
     test_state = test_env.reset()
     test_done = False
     test_actions = []
     test_positions = []
 
-    while not test_done:
-        test_action = policy.select_action(np.array(test_state))
-        test_actions.append(float(test_action[0]))
-        test_state, _, test_done, _ = test_env.step(test_action[0])
-        test_positions.append(float(test_env.current_position))
+    with timer.phase("test"):
+        while not test_done:
+            test_action = policy.select_action(np.array(test_state))
+            test_actions.append(float(test_action[0]))
+            test_state, _, test_done, _ = test_env.step(test_action[0])
+            test_positions.append(float(test_env.current_position))
 
     test_returns = np.array(test_env.portfolio_history[1:]) / np.array(test_env.portfolio_history[:-1]) - 1
     test_sharpe = float(np.mean(test_returns) / (np.std(test_returns) + 1e-8) * np.sqrt(252))
@@ -189,12 +266,24 @@ def run_inference_and_export(
         "actions": test_actions,
         "positions": test_positions,
     }
+    # Where the run's time went (export itself is not included: it writes this)
+    payload["profile"] = timer.summary()
+    if periodic is not None:
+        payload["profile"]["captures"] = periodic.captures
+    for line in timer.table():
+        logger.info("profile | %s", line)
 
     os.makedirs(os.path.dirname(output_json_path) or ".", exist_ok=True)
     with open(output_json_path, "w") as f:
         json.dump(payload, f, indent=2)
 
     logger.info("Exported results to %s", output_json_path)
+    if binary:
+        # Same payload as typed float64 columns + JSON header, for clients that skip JSON parsing
+        binary_path = os.path.splitext(output_json_path)[0] + columnar.FILE_SUFFIX
+        columnar.write(payload, binary_path)
+        logger.info("Exported columnar results to %s", binary_path)
+    emit_progress(progress, phase="done", episodes=max_episodes, metrics=payload["metrics"])
     logger.info("Test metrics: Return=%.2f%%, Sharpe=%.4f, MaxDD=%.2f%%", test_return_pct, test_sharpe, test_drawdown_pct)
 
     print_model_output_summary(payload)
@@ -255,13 +344,35 @@ def main():
     parser.add_argument("--out", default=DEFAULT_OUT, help="Output JSON path for frontend")
     parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR, help="Directory for TD3 checkpoints")
     parser.add_argument("--episodes", type=int, default=30, help="Training episodes")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory for cached preprocessed features")
+    parser.add_argument("--no-cache", action="store_true", help="Always preprocess the CSV from scratch")
+    parser.add_argument("--components", type=int, default=None,
+                        help="Project each bar's features onto this many PCA components")
+    parser.add_argument("--progress", action="store_true", help="Print machine-readable progress events")
+    parser.add_argument("--binary", action="store_true",
+                        help="Also write the results as a columnar binary file (.td3c) next to --out")
+    parser.add_argument("--profile", choices=("cprofile", "torch"), default=None,
+                        help="Capture training steps periodically with cProfile or torch.profiler")
+    parser.add_argument("--profile-every", type=int, default=1000, help="Training steps between captures")
+    parser.add_argument("--profile-steps", type=int, default=20, help="Training steps per capture")
     args = parser.parse_args()
 
+    from src.utils.logger import setup_logging
+    setup_logging()
+
     run_inference_and_export(
         csv_path=args.csv,
         output_json_path=args.out,
         results_dir=args.results_dir,
         max_episodes=args.episodes,
+        cache_dir=args.cache_dir,
+        use_cache=not args.no_cache,
+        n_components=args.components,
+        progress=args.progress,
+        binary=args.binary,
+        profiler=args.profile,
+        profile_every=args.profile_every,
+        profile_steps=args.profile_steps,
     )
 
 
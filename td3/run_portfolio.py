@@ -0,0 +1,202 @@
+"""
+Train one TD3 policy across several CSVs at once with PortfolioEnvironment (one action per symbol)
+and export the test-period portfolio as JSON.
+Usage (from td3/):  python run_portfolio.py --csv "../CSV file/AAPL_data.csv" "../CSV file/MSFT_data.csv"
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+_td3_dir = os.path.dirname(os.path.abspath(__file__))
+if _td3_dir not in sys.path:
+    sys.path.insert(0, _td3_dir)
+
+from run_csv import DEFAULT_CACHE_DIR, DEFAULT_RESULTS_DIR, emit_progress, set_seeds
+
+# As in run_csv, the heavy stack is imported by run_portfolio() after the arguments are parsed
+logger = logging.getLogger("td3-stock-trading")
+
+
+def symbol_name(csv_path):
+    """AAPL_data.csv -> AAPL"""
+    return os.path.splitext(os.path.basename(csv_path))[0].split("_")[0].upper()
+
+
+def sharpe(portfolio_history):
+    import numpy as np
+    returns = np.array(portfolio_history[1:]) / np.array(portfolio_history[:-1]) - 1
+    return float(np.mean(returns) / (np.std(returns) + 1e-8) * np.sqrt(252))
+
+
+def run_portfolio(
+    csv_paths,
+    output_json_path: str,
+    results_dir: str,
+    lookback_window: int = 60,
+    frame_stack: int = 4,
+    max_episodes: int = 30,
+    max_timesteps: int = 50000,
+    eval_freq: int = 5,
+    cache_dir: str = None,
+    use_cache: bool = True,
+    progress: bool = False,
+):
+    import numpy as np
+    from src.data.csv_preprocess import load_aligned_features
+    from src.model.portfolio_environment import PortfolioEnvironment
+    from src.model.replay_buffer import ReplayBuffer
+    from src.model.td3 import TD3
+
+    set_seeds()
+    os.makedirs(results_dir, exist_ok=True)
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+
+    symbols = [symbol_name(csv_path) for csv_path in csv_paths]
+    duplicates = sorted({symbol for symbol in symbols if symbols.count(symbol) > 1})
+    if duplicates:
+        raise ValueError(f"Several CSVs map to the same symbol: {', '.join(duplicates)}")
+
+    emit_progress(progress, phase="preprocess", episodes=max_episodes)
+    logger.info("Loading and preprocessing CSVs: %s", ", ".join(csv_paths))
+    # Aligned on shared timestamps before the split, so the splits cover the same period for every symbol
+    features = load_aligned_features(csv_paths, cache_dir=cache_dir, use_cache=use_cache)
+    splits = {"train": {}, "val": {}, "test": {}}
+    for symbol, (train_df, val_df, test_df, _, _) in zip(symbols, features):
+        splits["train"][symbol], splits["val"][symbol], splits["test"][symbol] = train_df, val_df, test_df
+    for name, frames in splits.items():
+        rows = len(next(iter(frames.values())))
+        if rows <= lookback_window + 1:
+            raise ValueError(f"The {name} split has {rows} shared bars; more than {lookback_window + 1} are needed")
+
+    envs = {
+        name: PortfolioEnvironment(
+            frames, lookback_window=lookback_window, transaction_cost=0.0003,
+            max_position=1.0 / len(csv_paths), frame_stack=frame_stack,
+        )
+        for name, frames in splits.items()
+    }
+    train_env, val_env, test_env = envs["train"], envs["val"], envs["test"]
+
+    state_dim = train_env.get_state_dim()
+    action_dim = train_env.get_action_dim()
+    max_action = 1.0
+    logger.info("Portfolio of %s: state_dim=%d, action_dim=%d", ", ".join(train_env.symbols), state_dim, action_dim)
+
+    policy = TD3(
+        state_dim=state_dim, action_dim=action_dim, max_action=max_action,
+        discount=0.995, tau=0.0005, policy_noise=0.15, noise_clip=0.35, policy_freq=4,
+    )
+    replay_buffer = ReplayBuffer(state_dim, action_dim)
+
+    best_val_sharpe = -float("inf")
+    exploration_noise = 0.1
+    total_timesteps = 0
+
+    emit_progress(progress, phase="train", episode=0, episodes=max_episodes)
+    for episode in range(1, max_episodes + 1):
+        state = train_env.reset()
+        done = False
+        episode_timesteps = 0
+        episode_start = time.perf_counter()
+
+        while not done and episode_timesteps < max_timesteps:
+            episode_timesteps += 1
+            total_timesteps += 1
+            if total_timesteps < 1000:
+                action = np.random.uniform(-max_action, max_action, size=(action_dim,))
+            else:
+                action = policy.select_action(np.array(state))
+                action = action + np.random.normal(0, exploration_noise, size=action_dim)
+                action = np.clip(action, -max_action, max_action)
+            next_state, reward, done, _ = train_env.step(action)
+            replay_buffer.add(state, action, next_state, reward, done)
+            state = next_state
+            if total_timesteps >= 5000:
+                policy.train(replay_buffer, batch_size=256)
+
+        episode_seconds = time.perf_counter() - episode_start
+        val_sharpe = None
+        if episode % eval_freq == 0 or episode == max_episodes:
+            val_state = val_env.reset()
+            val_done = False
+            while not val_done:
+                val_state, _, val_done, _ = val_env.step(policy.select_action(np.array(val_state)))
+            val_sharpe = sharpe(val_env.portfolio_history)
+            if val_sharpe > best_val_sharpe:
+                best_val_sharpe = val_sharpe
+                policy.save(os.path.join(results_dir, "td3_portfolio_best_model"))
+            logger.info("Episode %d | Val Sharpe %.4f", episode, val_sharpe)
+        emit_progress(
+            progress, phase="train", episode=episode, episodes=max_episodes, timesteps=episode_timesteps,
+            steps_per_sec=round(episode_timesteps / max(episode_seconds, 1e-9), 1),
+            val_sharpe=None if val_sharpe is None else round(val_sharpe, 4),
+        )
+
+    policy.load(os.path.join(results_dir, "td3_portfolio_best_model"))
+
+    emit_progress(progress, phase="test", episodes=max_episodes)
+    test_state = test_env.reset()
+    test_done = False
+    test_actions = []
+    test_positions = []
+    while not test_done:
+        action = policy.select_action(np.array(test_state))
+        test_actions.append(action.tolist())
+        test_state, _, test_done, _ = test_env.step(action)
+        test_positions.append(test_env.current_position.tolist())
+
+    n_steps = len(test_actions)
+    dates = [str(t) for t in test_env.time[lookback_window:lookback_window + n_steps]]
+    payload = {
+        "symbols": test_env.symbols,
+        "metrics": {
+            "sharpeRatio": round(sharpe(test_env.portfolio_history), 4),
+            "returnPct": round((test_env.portfolio_value - 1.0) * 100, 2),
+            "maxDrawdownPct": round(float(test_env.max_drawdown * 100), 2),
+            "finalPortfolioValue": round(float(test_env.portfolio_value), 4),
+        },
+        "dates": dates,
+        "portfolioHistory": [float(x) for x in test_env.portfolio_history[:n_steps + 1]],
+        "actions": test_actions,
+        "positions": test_positions,
+    }
+
+    os.makedirs(os.path.dirname(output_json_path) or ".", exist_ok=True)
+    with open(output_json_path, "w") as f:
+        json.dump(payload, f, indent=2)
+    logger.info("Exported portfolio results to %s", output_json_path)
+    emit_progress(progress, phase="done", episodes=max_episodes, metrics=payload["metrics"])
+    return payload
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", nargs="+", required=True, help="CSV files, one per symbol")
+    parser.add_argument("--out", default=os.path.join(DEFAULT_RESULTS_DIR, "td3_portfolio_results.json"),
+                        help="Output JSON path")
+    parser.add_argument("--results-dir", default=DEFAULT_RESULTS_DIR, help="Directory for TD3 checkpoints")
+    parser.add_argument("--episodes", type=int, default=30, help="Training episodes")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory for cached preprocessed features")
+    parser.add_argument("--no-cache", action="store_true", help="Always preprocess the CSVs from scratch")
+    parser.add_argument("--progress", action="store_true", help="Print machine-readable progress events")
+    args = parser.parse_args()
+
+    from src.utils.logger import setup_logging
+    setup_logging()
+
+    run_portfolio(
+        csv_paths=args.csv,
+        output_json_path=args.out,
+        results_dir=args.results_dir,
+        max_episodes=args.episodes,
+        cache_dir=args.cache_dir,
+        use_cache=not args.no_cache,
+        progress=args.progress,
+    )
+
+
+if __name__ == "__main__":
+    main()
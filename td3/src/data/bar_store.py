@@ -0,0 +1,185 @@
+"""
+Persistent per-instrument / per-granularity bar store.
+Each column is a flat binary file of fixed-width values, sorted by an int64 nanosecond time index.
+Reads memory-map the files and binary-search the index; writes append to the files and then
+commit the new row count to meta.json, so a crash mid-append never exposes partial rows.
+The store also remembers which time intervals have already been fetched, so callers can ask
+for the gaps only.
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("td3-stock-trading")
+
+META_FILE = "meta.json"
+TIME_FILE = "time.i8"
+
+
+def _to_ns(ts):
+    return pd.Timestamp(ts).value
+
+
+def _merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class BarStore:
+    def __init__(self, instrument: str, granularity: str, root="stock-data/bars"):
+        self.instrument = instrument
+        self.granularity = granularity
+        self.path = os.path.join(root, instrument, granularity)
+        os.makedirs(self.path, exist_ok=True)
+        self.meta = self._load_meta()
+
+    def _load_meta(self):
+        meta_path = os.path.join(self.path, META_FILE)
+        if not os.path.exists(meta_path):
+            return {"rows": 0, "columns": {}, "coverage": []}
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _commit_meta(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    def _column_file(self, column):
+        return os.path.join(self.path, f"{column}.bin")
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    @property
+    def columns(self):
+        return list(self.meta["columns"])
+
+    def _map(self, file_path, dtype):
+        rows = self.meta["rows"]
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode="r", shape=(rows,))
+
+    def _time_index(self):
+        return self._map(os.path.join(self.path, TIME_FILE), np.int64)
+
+    def time_range(self):
+        """(first, last) bar timestamps, or None when the store is empty."""
+        times = self._time_index()
+        if len(times) == 0:
+            return None
+        return pd.Timestamp(int(times[0])), pd.Timestamp(int(times[-1]))
+
+    def read(self, start=None, end=None, columns=None):
+        """Bars with start <= time < end, located by binary search on the memory-mapped index."""
+        times = self._time_index()
+        lo = 0 if start is None else int(np.searchsorted(times, _to_ns(start), side="left"))
+        hi = len(times) if end is None else int(np.searchsorted(times, _to_ns(end), side="left"))
+        columns = self.columns if columns is None else list(columns)
+        data = {
+            col: np.array(self._map(self._column_file(col), np.dtype(self.meta["columns"][col]))[lo:hi])
+            for col in columns
+        }
+        index = pd.DatetimeIndex(np.array(times[lo:hi]).view("datetime64[ns]"), name="time")
+        return pd.DataFrame(data, index=index, columns=columns)
+
+    def missing(self, start, end):
+        """Sub-intervals of [start, end) that have never been fetched into the store."""
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+        gaps = []
+        cursor = start_ns
+        for cov_start, cov_end in self.meta["coverage"]:
+            if cov_end <= cursor:
+                continue
+            if cov_start >= end_ns:
+                break
+            if cov_start > cursor:
+                gaps.append((pd.Timestamp(cursor), pd.Timestamp(cov_start)))
+            cursor = max(cursor, cov_end)
+        if cursor < end_ns:
+            gaps.append((pd.Timestamp(cursor), pd.Timestamp(end_ns)))
+        return gaps
+
+    def append(self, df, start=None, end=None):
+        """
+        Add bars (DatetimeIndex) and mark [start, end) as fetched; the interval defaults to the
+        span of df. Bars newer than the store are appended in place; older or overlapping bars
+        trigger a one-off merge rewrite.
+        """
+        if start is not None and end is not None:
+            self.meta["coverage"] = _merge_intervals(self.meta["coverage"] + [[_to_ns(start), _to_ns(end)]])
+
+        if df is None or df.empty:
+            self._commit_meta()
+            return 0
+
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+        times = df.index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        if start is None or end is None:
+            span = [int(times[0]), int(times[-1]) + 1]
+            self.meta["coverage"] = _merge_intervals(self.meta["coverage"] + [span])
+
+        for col in df.columns:
+            if col not in self.meta["columns"]:
+                if self.meta["rows"]:
+                    raise ValueError(f"Column {col} is not in the existing store: {self.columns}")
+                self.meta["columns"][col] = np.dtype(df[col].dtype).str
+        if set(df.columns) != set(self.meta["columns"]):
+            raise ValueError(f"Expected columns {self.columns}, got {list(df.columns)}")
+
+        stored = self._time_index()
+        if len(stored) and times[0] <= stored[-1]:
+            return self._merge_rewrite(df)
+
+        self._truncate_to_committed()
+        with open(os.path.join(self.path, TIME_FILE), "ab") as f:
+            f.write(times.tobytes())
+        for col, dtype in self.meta["columns"].items():
+            with open(self._column_file(col), "ab") as f:
+                f.write(df[col].to_numpy(dtype=np.dtype(dtype)).tobytes())
+        self.meta["rows"] += len(df)
+        self._commit_meta()
+        logger.info(f"Appended {len(df)} bars to {self.path} ({self.meta['rows']} total)")
+        return len(df)
+
+    def _truncate_to_committed(self):
+        # Drop bytes left behind by an append that crashed before its meta commit
+        rows = self.meta["rows"]
+        files = [(os.path.join(self.path, TIME_FILE), np.dtype(np.int64))]
+        files += [(self._column_file(col), np.dtype(dtype)) for col, dtype in self.meta["columns"].items()]
+        for file_path, dtype in files:
+            if os.path.exists(file_path) and os.path.getsize(file_path) > rows * dtype.itemsize:
+                with open(file_path, "r+b") as f:
+                    f.truncate(rows * dtype.itemsize)
+
+    def _merge_rewrite(self, df):
+        existing = self.read()
+        merged = pd.concat([existing, df[existing.columns]])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        added = len(merged) - len(existing)
+
+        tmp_dir = tempfile.mkdtemp(dir=self.path)
+        try:
+            merged.index.to_numpy(dtype="datetime64[ns]").view(np.int64).tofile(os.path.join(tmp_dir, TIME_FILE))
+            for col, dtype in self.meta["columns"].items():
+                merged[col].to_numpy(dtype=np.dtype(dtype)).tofile(os.path.join(tmp_dir, f"{col}.bin"))
+            for name in os.listdir(tmp_dir):
+                os.replace(os.path.join(tmp_dir, name), os.path.join(self.path, name))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.meta["rows"] = len(merged)
+        self._commit_meta()
+        logger.info(f"Merged {added} bars into {self.path} ({self.meta['rows']} total)")
+        return added
@@ -0,0 +1,136 @@
+"""
+Concurrent, rate-limited historical data fetcher.
+Bid and ask requests for every chunk run in parallel on a thread pool behind a shared
+token-bucket limiter, failed requests are retried with exponential backoff, and chunks are
+yielded strictly in the order they were requested.
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from dateutil.relativedelta import relativedelta
+
+logger = logging.getLogger("td3-stock-trading")
+
+ChunkResult = namedtuple("ChunkResult", ["start", "end", "bid", "ask", "error"])
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def split_intervals(intervals, chunk_delta=relativedelta(months=3)):
+    """Split (start, end) intervals into consecutive chunks of at most chunk_delta."""
+    chunks = []
+    for start, end in intervals:
+        current_start = start
+        while current_start < end:
+            current_end = min(current_start + chunk_delta, end)
+            chunks.append((current_start, current_end))
+            current_start = current_end
+    return chunks
+
+
+class ConcurrentFetcher:
+    def __init__(self,
+                 api_factory,
+                 max_workers=8,
+                 requests_per_second=20,
+                 burst=None,
+                 retries=3,
+                 backoff=0.5,
+        ):
+        self.api_factory = api_factory
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self._local = threading.local()
+        self.requests = 0
+        self.failed_attempts = 0
+        self._stats_lock = threading.Lock()
+
+    def _api(self):
+        # One client per worker thread; tpqoa clients are not documented as thread-safe
+        if not hasattr(self._local, "api"):
+            self._local.api = self.api_factory()
+        return self._local.api
+
+    def _request(self, instrument, start, end, granularity, price):
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            with self._stats_lock:
+                self.requests += 1
+            try:
+                return self._api().get_history(
+                    instrument=instrument,
+                    start=start,
+                    end=end,
+                    granularity=granularity,
+                    price=price,
+                )
+            except Exception as e:
+                with self._stats_lock:
+                    self.failed_attempts += 1
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                logger.warning(f"{price} request {start} - {end} failed ({e}); retry {attempt + 1} in {delay:.2f}s")
+                time.sleep(delay)
+
+    def iter_chunks(self, instrument, chunks, granularity, max_pending=None):
+        """
+        Yield one ChunkResult per (start, end) chunk, in the given order. At most `max_pending`
+        chunks are in flight or buffered at once, which bounds memory on long histories.
+        """
+        max_pending = max_pending or self.max_workers
+        fmt = "%Y-%m-%d %H:%M:%S"
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch") as pool:
+            pending = deque()
+            todo = iter(chunks)
+
+            def submit_next():
+                chunk = next(todo, None)
+                if chunk is None:
+                    return False
+                start, end = chunk
+                futures = [
+                    pool.submit(self._request, instrument, start.strftime(fmt), end.strftime(fmt), granularity, price)
+                    for price in ("B", "A")
+                ]
+                pending.append((start, end, futures))
+                return True
+
+            while len(pending) < max_pending and submit_next():
+                pass
+
+            while pending:
+                start, end, (bid_future, ask_future) = pending.popleft()
+                try:
+                    result = ChunkResult(start, end, bid_future.result(), ask_future.result(), None)
+                except Exception as e:
+                    result = ChunkResult(start, end, None, None, e)
+                submit_next()
+                yield result
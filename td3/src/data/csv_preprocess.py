@@ -2,10 +2,18 @@
 Preprocess OHLCV CSV (Date, Open, High, Low, Close, Volume) for TD3.
 Produces same feature set as PreprocessData without requiring API/bid-ask columns.
 """
+import os
+import sys
+from functools import reduce
+
 import pandas as pd
 import numpy as np
 import logging
 
+from src.data import indicators
+from src.data.feature_cache import FeatureCache, file_digest, source_digest
+from src.data.indicators import add_indicators
+
 logger = logging.getLogger("td3-stock-trading")
 
 FEATURES_TO_NORMALIZE = [
@@ -16,8 +24,11 @@ FEATURES_TO_NORMALIZE = [
 ]
 
 
-def load_and_preprocess_csv(csv_path: str):
-    """Load CSV with columns Date, Open, High, Low, Close, Volume. Return train_df, val_df, test_df."""
+SPLIT_FRACTIONS = (0.7, 0.85)
+RAW_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+
+
+def _read_ohlcv_csv(csv_path: str):
     df = pd.read_csv(csv_path)
     # Normalize column names to lowercase
     df = df.rename(columns={
@@ -31,51 +42,28 @@ def load_and_preprocess_csv(csv_path: str):
     if "time" not in df.columns and "date" in df.columns:
         df["time"] = df["date"]
     df["time"] = pd.to_datetime(df["time"])
-    df = df.sort_values("time").reset_index(drop=True)
+    return df.sort_values("time").reset_index(drop=True)
+
+
+def _raw_ohlc(df):
+    """Unnormalized OHLC for the chart, from the same read as the features."""
+    raw_df = df.rename(columns={"time": "date"})
+    raw_df = raw_df[[col for col in RAW_COLUMNS if col in raw_df.columns]].copy()
+    raw_df["date"] = raw_df["date"].astype(str)
+    return raw_df
+
+
+def _engineer(df):
     df["spread"] = 0.0  # CSV has single price; no spread
 
     logger.info("Feature engineering (returns, MAs, volatility, RSI, MACD, Bollinger, ATR, DPO)")
-    df["return"] = df["close"].pct_change().fillna(0)
-    df["log_return"] = np.log(df["close"] / df["close"].shift(1)).fillna(0)
-    df["ma5"] = df["close"].rolling(window=5).mean()
-    df["ma10"] = df["close"].rolling(window=10).mean()
-    df["ma_norm"] = df["close"] / df["ma5"]
-    df["cumulative_return"] = (1 + df["return"]).cumprod() - 1
-
-    high_low = df["high"] - df["low"]
-    high_close_prev = abs(df["high"] - df["close"].shift(1))
-    low_close_prev = abs(df["low"] - df["close"].shift(1))
-    true_range = pd.concat([high_low, high_close_prev, low_close_prev], axis=1).max(axis=1)
-    df["atr"] = true_range.rolling(window=14).mean()
-    df["natr"] = (df["atr"] / df["close"]) * 100
-    df["dpo"] = df["close"].shift(11) - df["close"].rolling(window=21).mean().shift(1)
-    df["dpo"] = df["dpo"].fillna(0)
-
-    df["volatility"] = df["close"].rolling(window=10).std()
-    df["momentum"] = (df["close"] - df["close"].shift(5)).fillna(0)
-
-    window_length = 14
-    delta = df["close"].diff()
-    up = delta.clip(lower=0)
-    down = -1 * delta.clip(upper=0)
-    ma_up = up.rolling(window=window_length, min_periods=1).mean()
-    ma_down = down.rolling(window=window_length, min_periods=1).mean()
-    rs = ma_up / (ma_down + 1e-6)
-    df["rsi"] = 100 - (100 / (1 + rs))
-
-    ema12 = df["close"].ewm(span=12, adjust=False).mean()
-    ema26 = df["close"].ewm(span=26, adjust=False).mean()
-    df["macd"] = ema12 - ema26
-    df["macd_signal"] = df["macd"].ewm(span=9, adjust=False).mean()
-
-    ma20 = df["close"].rolling(window=20).mean()
-    std20 = df["close"].rolling(window=20).std()
-    df["boll_upper"] = ma20 + 2 * std20
-    df["boll_lower"] = ma20 - 2 * std20
+    return add_indicators(df)
 
+
+def _split_and_scale(df):
     total_rows = len(df)
-    train_end = int(0.7 * total_rows)
-    val_end = int(0.85 * total_rows)
+    train_end = int(SPLIT_FRACTIONS[0] * total_rows)
+    val_end = int(SPLIT_FRACTIONS[1] * total_rows)
     train_df = df.iloc[:train_end].copy()
     val_df = df.iloc[train_end:val_end].copy()
     test_df = df.iloc[val_end:].copy()
@@ -101,4 +89,113 @@ def load_and_preprocess_csv(csv_path: str):
     test_df = test_df.fillna(test_df.median())
 
     logger.info(f"CSV preprocess: Train {train_df.shape}, Val {val_df.shape}, Test {test_df.shape}")
+    return train_df, val_df, test_df, min_max_scaler
+
+
+def _engineer_and_split(df):
+    return _split_and_scale(_engineer(df))
+
+
+def load_and_preprocess_csv(csv_path: str):
+    """Load CSV with columns Date, Open, High, Low, Close, Volume. Return train_df, val_df, test_df."""
+    train_df, val_df, test_df, _ = _engineer_and_split(_read_ohlcv_csv(csv_path))
     return train_df, val_df, test_df
+
+
+def preprocessing_params():
+    """Everything besides the input file that determines the preprocessed output."""
+    return {
+        "pipeline": "csv",
+        "split_fractions": SPLIT_FRACTIONS,
+        "features_to_normalize": FEATURES_TO_NORMALIZE,
+        "code": source_digest(sys.modules[__name__], indicators),
+    }
+
+
+# Cache key -> load_features result, kept in memory by warm() in long-lived processes
+_WARM = {}
+
+
+def warm(csv_path: str, cache_dir="feature-cache"):
+    """
+    Hold csv_path's features in memory, so later load_features calls in this process (and in
+    children forked from it) return them without touching the disk cache.
+    """
+    key = FeatureCache(cache_dir).key(file_digest(csv_path), preprocessing_params())
+    _WARM[key] = load_features(csv_path, cache_dir=cache_dir)
+    return _WARM[key]
+
+
+def load_features(csv_path: str, cache_dir="feature-cache", use_cache=True):
+    """
+    Cached variant of load_and_preprocess_csv that also returns the raw OHLC for the chart and
+    the min-max scaler fitted on the training split ({feature: (min, max)}).
+    Returns train_df, val_df, test_df, raw_df, scaler; a warm call reads the stored columns instead of preprocessing.
+    """
+    cache = FeatureCache(cache_dir)
+    params = preprocessing_params()
+    key = cache.key(file_digest(csv_path), params)
+    if use_cache and key in _WARM:
+        return _WARM[key]
+    if use_cache:
+        cached = cache.load(key)
+        if cached is not None:
+            frames = cached["frames"]
+            return frames["train"], frames["val"], frames["test"], frames["raw"], cached["scaler"]
+
+    df = _read_ohlcv_csv(csv_path)
+    raw_df = _raw_ohlc(df)
+    train_df, val_df, test_df, min_max_scaler = _engineer_and_split(df)
+    if use_cache:
+        cache.store(
+            key,
+            {"train": train_df, "val": val_df, "test": test_df, "raw": raw_df},
+            min_max_scaler,
+            params={**params, "csv_path": os.path.abspath(csv_path)},
+        )
+    return train_df, val_df, test_df, raw_df, min_max_scaler
+
+
+def load_aligned_features(csv_paths, cache_dir="feature-cache", use_cache=True):
+    """
+    load_features for CSVs traded together. Indicators come from each CSV's full history, then
+    every CSV is cut to the timestamps all of them share before the split, so row i of a split is
+    the same bar for every symbol and each scaler is fitted on the common training period.
+    Returns one (train_df, val_df, test_df, raw_df, scaler) tuple per CSV, in order.
+    """
+    cache = FeatureCache(cache_dir)
+    params = {**preprocessing_params(), "aligned": True}
+    digests = [file_digest(path) for path in csv_paths]
+    # Each entry depends on the whole universe, since it decides the shared timestamps
+    keys = [cache.key([digest, sorted(digests)], params) for digest in digests]
+    if use_cache:
+        cached = [cache.load(key) for key in keys]
+        if all(entry is not None for entry in cached):
+            return [
+                (entry["frames"]["train"], entry["frames"]["val"], entry["frames"]["test"],
+                 entry["frames"]["raw"], entry["scaler"])
+                for entry in cached
+            ]
+
+    frames = [_read_ohlcv_csv(path).drop_duplicates("time", keep="last") for path in csv_paths]
+    common = reduce(np.intersect1d, [df["time"].to_numpy() for df in frames])
+    if len(common) == 0:
+        spans = ", ".join(f"{path} ({df['time'].min()} to {df['time'].max()})" for path, df in zip(csv_paths, frames))
+        raise ValueError(f"The CSVs share no timestamps: {spans}")
+    logger.info(f"Aligned {len(csv_paths)} CSVs on {len(common)} shared bars")
+
+    results = []
+    for path, df, key in zip(csv_paths, frames, keys):
+        df = _engineer(df.reset_index(drop=True))
+        df = df[df["time"].isin(common)].reset_index(drop=True)
+        raw_df = _raw_ohlc(df)
+        train_df, val_df, test_df, min_max_scaler = _split_and_scale(df)
+        if use_cache:
+            cache.store(
+                key,
+                {"train": train_df, "val": val_df, "test": test_df, "raw": raw_df},
+                min_max_scaler,
+                params={**params, "csv_path": os.path.abspath(path)},
+            )
+        results.append((train_df, val_df, test_df, raw_df, min_max_scaler))
+    return results
@@ -1,76 +1,195 @@
+import json
+import sys
 import numpy as np
-import pandas as pd
 import logging
 
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-
 logger = logging.getLogger('td3-stock-trading')
 
-class DimensionReducer:
-    def __init__(self, method='pca', n_components=20, feature_columns=None):
 
-        self.method = method
-        self.n_components = n_components
-        self.feature_columns = feature_columns
-        self.pca = None
-        self.scaler = None
+def _iter_batches(data, batch_size):
+    for start in range(0, len(data), batch_size):
+        yield data[start:start + batch_size]
 
-    def fit_transform(self, data):
 
-        if self.method == 'pca':
-            return self._apply_pca(data)
-        else:
-            raise ValueError(f"Unknown method: {self.method}")
+def _is_frame(data):
+    # A DataFrame implies pandas is loaded already; inference on arrays never imports it
+    pd = sys.modules.get('pandas')
+    return pd is not None and isinstance(data, pd.DataFrame)
 
-    def _apply_pca(self, data):
 
-        time_col = None
-        if 'time' in data.columns:
-            time_col = data['time']
-            data = data.drop('time', axis=1)
+def _npz_path(path):
+    return path if str(path).endswith('.npz') else f"{path}.npz"
+
+
+class DimensionReducer:
+    """
+    Standardize + PCA projection of feature rows.
 
+    method='pca' fits an exact PCA in memory, 'randomized' uses randomized SVD, and 'incremental'
+    fits IncrementalPCA batch by batch so years of bars (e.g. a memory-mapped array or a chunk
+    generator via fit_stream) never have to be loaded at once. 'select' keeps feature_columns.
+    The fitted scaler and components are plain arrays, so a saved reducer transforms new data
+    with NumPy only (scikit-learn is imported only for fitting).
+    """
 
-        self.pca = PCA(n_components=self.n_components)
-        reduced_data = self.pca.fit_transform(data)
+    METHODS = ('pca', 'randomized', 'incremental', 'select')
 
-        reduced_df = pd.DataFrame(
-            reduced_data,
-            columns=[f'pc{i + 1}' for i in range(self.n_components)]
-        )
+    def __init__(self, method='pca', n_components=20, feature_columns=None, batch_size=10000):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown method: {method}")
 
+        self.method = method
+        self.n_components = n_components
+        self.feature_columns = feature_columns
+        self.batch_size = batch_size
+        self.pca = None
+        self.scaler = None
+
+        # Fitted projection: ((x - scale_mean) / scale_std - pca_mean) @ components.T
+        self.scale_mean = None
+        self.scale_std = None
+        self.pca_mean = None
+        self.components = None
+        self.explained_variance_ratio = None
+
+    @property
+    def fitted(self):
+        return self.components is not None
+
+    def _matrix(self, data):
+        if _is_frame(data):
+            if self.feature_columns is None:
+                self.feature_columns = [col for col in data.columns if col != 'time']
+            return data[self.feature_columns].to_numpy(dtype=np.float64)
+        return np.asarray(data, dtype=np.float64)
+
+    def _batches(self, data):
+        for batch in _iter_batches(data, self.batch_size):
+            yield self._matrix(batch)
+
+    def fit(self, data):
+        """Fit on a DataFrame or array; 'incremental' reads it batch_size rows at a time."""
+        if self.method == 'select':
+            return self
+        if self.method == 'incremental':
+            return self.fit_stream(lambda: self._batches(data))
+
+        from sklearn.decomposition import PCA
+        from sklearn.preprocessing import StandardScaler
+
+        matrix = self._matrix(data)
+        self.scaler = StandardScaler().fit(matrix)
+        if self.method == 'randomized':
+            self.pca = PCA(n_components=self.n_components, svd_solver='randomized', random_state=0)
+        else:
+            self.pca = PCA(n_components=self.n_components)
+        self.pca.fit(self.scaler.transform(matrix))
+        self._store_projection()
+        return self
+
+    def fit_stream(self, make_batches):
+        """
+        Out-of-core fit. make_batches() must return a fresh iterator of 2-D batches on each call:
+        one pass fits the scaler, a second pass fits IncrementalPCA on the scaled batches.
+        """
+        from sklearn.decomposition import IncrementalPCA
+        from sklearn.preprocessing import StandardScaler
+
+        self.scaler = StandardScaler()
+        rows = 0
+        for batch in make_batches():
+            self.scaler.partial_fit(np.asarray(batch, dtype=np.float64))
+            rows += len(batch)
+
+        self.pca = IncrementalPCA(n_components=self.n_components)
+        pending = []
+        pending_rows = 0
+        for batch in make_batches():
+            pending.append(self.scaler.transform(np.asarray(batch, dtype=np.float64)))
+            pending_rows += len(batch)
+            # IncrementalPCA needs at least n_components rows per partial_fit call
+            if pending_rows >= max(self.n_components, self.batch_size):
+                self.pca.partial_fit(np.concatenate(pending))
+                pending, pending_rows = [], 0
+        if pending:
+            self.pca.partial_fit(np.concatenate(pending))
+
+        self._store_projection()
+        logger.info(f"Incremental PCA fitted on {rows} rows")
+        return self
+
+    def _store_projection(self):
+        self.scale_mean = self.scaler.mean_.astype(np.float64)
+        self.scale_std = self.scaler.scale_.astype(np.float64)
+        self.pca_mean = self.pca.mean_.astype(np.float64)
+        self.components = self.pca.components_.astype(np.float64)
+        self.explained_variance_ratio = self.pca.explained_variance_ratio_.astype(np.float64)
+        logger.info(f"Explained variance ratio: {self.explained_variance_ratio.sum():.4f}")
+
+    def project(self, matrix, out=None, dtype=np.float32):
+        """Project a 2-D array of feature rows in vectorized batches; returns (n, n_components)."""
+        matrix = np.asarray(matrix)
+        if out is None:
+            out = np.empty((len(matrix), self.n_components), dtype=dtype)
+        # Fold the standardization into the projection: x @ W + b
+        weights = (self.components / self.scale_std).T
+        bias = -(self.scale_mean / self.scale_std + self.pca_mean) @ self.components.T
+        for start in range(0, len(matrix), self.batch_size):
+            batch = matrix[start:start + self.batch_size]
+            out[start:start + len(batch)] = batch @ weights + bias
+        return out
+
+    def _to_frame(self, reduced, time_col):
+        import pandas as pd
+        reduced_df = pd.DataFrame(reduced, columns=[f'pc{i + 1}' for i in range(self.n_components)])
         if time_col is not None:
             reduced_df['time'] = time_col.values
-
-        logger.info(f"Explained variance ratio: {self.pca.explained_variance_ratio_.sum():.4f}")
         return reduced_df
 
+    def fit_transform(self, data):
+        if self.method == 'select':
+            return self.transform(data)
+        self.fit(data)
+        return self.transform(data)
 
     def transform(self, data):
-
-        if self.method == 'pca':
-            # Keep time column separate if it exists
-            time_col = None
-            if 'time' in data.columns:
-                time_col = data['time']
-                data = data.drop('time', axis=1)
-
-            # Scale and transform
-            scaled_data = self.scaler.transform(data)
-            reduced_data = self.pca.transform(scaled_data)
-
-            # Convert to DataFrame
-            reduced_df = pd.DataFrame(
-                reduced_data,
-                columns=[f'pc{i + 1}' for i in range(self.n_components)]
-            )
-
-            # Add time column back if it existed
-            if time_col is not None:
-                reduced_df['time'] = time_col.values
-
-            return reduced_df
-        elif self.method == 'select':
+        if self.method == 'select':
             return data[self.feature_columns]
-        else:
-            raise ValueError(f"Unknown method: {self.method}")
\ No newline at end of file
+        if not self.fitted:
+            raise ValueError("DimensionReducer is not fitted")
+
+        time_col = data['time'] if _is_frame(data) and 'time' in data.columns else None
+        return self._to_frame(self.project(self._matrix(data), dtype=np.float64), time_col)
+
+    def save(self, path):
+        """Persist the fitted scaler and components to `path` (.npz, no pickles)."""
+        meta = {
+            'method': self.method,
+            'n_components': self.n_components,
+            'feature_columns': self.feature_columns,
+            'batch_size': self.batch_size,
+        }
+        arrays = {}
+        if self.fitted:
+            arrays = {
+                'scale_mean': self.scale_mean,
+                'scale_std': self.scale_std,
+                'pca_mean': self.pca_mean,
+                'components': self.components,
+                'explained_variance_ratio': self.explained_variance_ratio,
+            }
+        np.savez(_npz_path(path), meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(_npz_path(path), allow_pickle=False) as stored:
+            meta = json.loads(str(stored['meta']))
+            reducer = cls(method=meta['method'], n_components=meta['n_components'],
+                          feature_columns=meta['feature_columns'], batch_size=meta['batch_size'])
+            if 'components' in stored:
+                reducer.scale_mean = stored['scale_mean']
+                reducer.scale_std = stored['scale_std']
+                reducer.pca_mean = stored['pca_mean']
+                reducer.components = stored['components']
+                reducer.explained_variance_ratio = stored['explained_variance_ratio']
+        return reducer
@@ -0,0 +1,139 @@
+"""
+Content-addressed cache of preprocessed feature matrices.
+Entries are keyed by a hash of the input data plus the preprocessing parameters and stored
+column by column as .npy files with a small JSON header. A hit rebuilds the same frames the
+preprocessing returned: writable columns, the original RangeIndex and (min, max) scaler tuples.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("td3-stock-trading")
+
+CACHE_FORMAT_VERSION = 2
+META_FILE = "meta.json"
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """sha256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def frame_digest(df):
+    """sha256 of a DataFrame's index, columns and values."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in df.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def source_digest(*modules):
+    """sha256 of the source files of the given modules, so code changes invalidate entries."""
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _load_index(frame_dir, frame_meta):
+    if "range_index" in frame_meta:
+        start, stop, step = frame_meta["range_index"]
+        return pd.RangeIndex(start, stop, step, name=frame_meta.get("index_name"))
+    return pd.Index(np.load(os.path.join(frame_dir, "index.npy")), name=frame_meta.get("index_name"))
+
+
+def _to_storable(values):
+    if values.dtype == object:
+        # Fixed-width unicode instead of pickled objects
+        return values.astype(str)
+    return values
+
+
+class FeatureCache:
+    def __init__(self, cache_dir="feature-cache"):
+        self.cache_dir = cache_dir
+
+    def key(self, data_digest, params):
+        payload = json.dumps({"version": CACHE_FORMAT_VERSION, "data": data_digest, "params": params},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """Return {"frames": {name: DataFrame}, "scaler": dict, "params": dict} or None on a miss."""
+        entry = self._entry_dir(key)
+        meta_path = os.path.join(entry, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        t0 = time.perf_counter()
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        frames = {}
+        for name, frame_meta in meta["frames"].items():
+            frame_dir = os.path.join(entry, name)
+            # Read into memory rather than memory-mapped, so the frames are writable like cold ones
+            columns = {
+                col: np.load(os.path.join(frame_dir, f"{i}.npy"))
+                for i, col in enumerate(frame_meta["columns"])
+            }
+            index = _load_index(frame_dir, frame_meta)
+            frames[name] = pd.DataFrame(columns, index=index, columns=frame_meta["columns"], copy=False)
+
+        logger.info(f"Feature cache hit {key[:12]} ({time.perf_counter() - t0:.3f}s)")
+        scaler = {feature: tuple(bounds) for feature, bounds in meta["scaler"].items()}
+        return {"frames": frames, "scaler": scaler, "params": meta["params"]}
+
+    def store(self, key, frames, scaler, params=None):
+        """Write every frame column-wise; the entry appears atomically once complete."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.cache_dir)
+        try:
+            meta = {
+                "version": CACHE_FORMAT_VERSION,
+                "created": time.time(),
+                "params": params or {},
+                "scaler": {feature: [float(lo), float(hi)] for feature, (lo, hi) in scaler.items()},
+                "frames": {},
+            }
+            for name, df in frames.items():
+                frame_dir = os.path.join(tmp_dir, name)
+                os.makedirs(frame_dir)
+                for i, col in enumerate(df.columns):
+                    np.save(os.path.join(frame_dir, f"{i}.npy"), _to_storable(df[col].to_numpy()),
+                            allow_pickle=False)
+                meta["frames"][name] = {
+                    "columns": [str(col) for col in df.columns],
+                    "index_name": df.index.name,
+                    "rows": len(df),
+                }
+                if isinstance(df.index, pd.RangeIndex):
+                    index = df.index
+                    meta["frames"][name]["range_index"] = [index.start, index.stop, index.step]
+                else:
+                    np.save(os.path.join(frame_dir, "index.npy"), df.index.to_numpy(), allow_pickle=False)
+            with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+                json.dump(meta, f)
+
+            entry = self._entry_dir(key)
+            if os.path.exists(entry):
+                shutil.rmtree(entry)
+            os.replace(tmp_dir, entry)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"Stored features in cache entry {key[:12]}")
@@ -1,16 +1,22 @@
-import tpqoa
 import pandas as pd
 import logging
 
 logger = logging.getLogger("td3-stock-trading")
 
+
+def create_api(config_file : str = "oanda.cfg"):
+    # Imported here so the pipeline can run offline against src.data.local_api
+    import tpqoa
+    return tpqoa.tpqoa(config_file)
+
+
 def fetch_stock_data(instrument : str,
                      start : str,
                      end : str,
                      granularity : str ="5M",
                      price : str ="B"
     ):
-    api = tpqoa.tpqoa('oanda.cfg')
+    api = create_api()
     try:
         logger.info(f"Fetching price data of {instrument}")
         data = api.get_history(instrument=instrument,
@@ -0,0 +1,293 @@
+"""
+Single-pass technical indicator engine shared by the CSV, OANDA and InfluxDB pipelines.
+Works on raw NumPy arrays, computes shared intermediates (previous close, close deltas,
+running sums) once and writes float32 columns into one preallocated matrix.
+Missing values follow the pandas rolling/ewm semantics: a window is NaN only while it holds a
+NaN, RSI averages the deltas it has, and EMAs carry over a gap, so every indicator recovers
+once the gap has left its window.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+logger = logging.getLogger("td3-stock-trading")
+
+# Full indicator set, in the column order the pipelines have always produced
+INDICATOR_COLUMNS = [
+    "return", "log_return", "ma5", "ma10", "ma_norm", "cumulative_return",
+    "atr", "natr", "dpo", "volatility", "momentum", "rsi",
+    "ema12", "ema26", "macd", "macd_signal", "boll_upper", "boll_lower",
+]
+
+# Feature set used for training (EMAs are only stored in InfluxDB)
+FEATURE_COLUMNS = [col for col in INDICATOR_COLUMNS if col not in ("ema12", "ema26")]
+
+RSI_WINDOW = 14
+ATR_WINDOW = 14
+DPO_WINDOW = 21
+DPO_SHIFT = 11
+BOLL_WINDOW = 20
+STD_BLOCK = 1 << 16
+
+
+def _running_sum(x):
+    """Cumulative sum with a leading zero."""
+    csum = np.empty(len(x) + 1)
+    csum[0] = 0.0
+    np.cumsum(x, out=csum[1:])
+    return csum
+
+
+def _fill_gaps(x, missing):
+    """x with each NaN replaced by the last value before it (leading NaNs by the first value)."""
+    last = np.where(missing, 0, np.arange(len(x)))
+    np.maximum.accumulate(last, out=last)
+    filled = x[last]
+    filled[np.isnan(filled)] = x[np.argmin(missing)]
+    return filled
+
+
+def _mask_gaps(out, nan_csum, window):
+    """NaN out every full trailing window that holds a missing value (nan_csum has a leading zero)."""
+    if nan_csum is not None and len(out) >= window:
+        out[window - 1:][nan_csum[window:] - nan_csum[:-window] > 0] = np.nan
+    return out
+
+
+def _rolling_mean(csum, window, nan_csum=None):
+    """
+    Trailing mean from a cumulative sum with a leading zero; NaN until the window is full and
+    wherever the window holds a missing value (counted by nan_csum).
+    """
+    n = len(csum) - 1
+    out = np.full(n, np.nan)
+    if n >= window:
+        np.subtract(csum[window:], csum[:-window], out=out[window - 1:])
+        out[window - 1:] /= window
+    return _mask_gaps(out, nan_csum, window)
+
+
+def _rolling_std(x, window, nan_csum=None):
+    """
+    Trailing sample std (ddof=1) from cumulative sums taken block by block.
+    Each block is shifted by a local anchor price so the sums stay small and precise.
+    x must be gap-free; windows with a missing value (counted by nan_csum) come out NaN.
+    """
+    n = len(x)
+    out = np.full(n, np.nan)
+    for lo in range(window - 1, n, STD_BLOCK):
+        hi = min(lo + STD_BLOCK, n)
+        seg = x[lo - window + 1:hi] - x[lo]
+        s1 = np.zeros(len(seg) + 1)
+        s2 = np.zeros(len(seg) + 1)
+        np.cumsum(seg, out=s1[1:])
+        np.cumsum(seg * seg, out=s2[1:])
+        sum1 = s1[window:] - s1[:-window]
+        var = (s2[window:] - s2[:-window] - sum1 * sum1 / window) / (window - 1)
+        np.sqrt(np.maximum(var, 0.0), out=out[lo:hi])
+    return _mask_gaps(out, nan_csum, window)
+
+
+def _ema(x, span):
+    """
+    Recursive EMA equivalent to pandas ewm(span=span, adjust=False).
+    Over a gap the last value is held; the next observation is then blended in against a
+    weight of (1 - alpha) ** (gap + 1), and the recursion restarts from there.
+    """
+    alpha = 2.0 / (span + 1)
+    missing = np.isnan(x)
+    if not missing.any():
+        out, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * x[0]])
+        return out
+
+    out = np.full(len(x), np.nan)
+    valid = np.flatnonzero(~missing)
+    if len(valid) == 0:
+        return out
+    breaks = np.flatnonzero(np.diff(valid) > 1) + 1
+    prev, prev_end = None, None
+    for start, stop in zip(valid[np.r_[0, breaks]], valid[np.r_[breaks, len(valid)] - 1] + 1):
+        first = x[start]
+        if prev is not None:
+            out[prev_end:start] = prev
+            held = (1.0 - alpha) ** (start - prev_end + 1)
+            first = (held * prev + alpha * first) / (held + alpha)
+        out[start] = first
+        if stop - start > 1:
+            out[start + 1:stop], _ = lfilter([alpha], [1.0, alpha - 1.0], x[start + 1:stop],
+                                             zi=[(1.0 - alpha) * first])
+        prev, prev_end = out[stop - 1], stop
+    if prev is not None:
+        out[prev_end:] = prev
+    return out
+
+
+def _expanding_then_rolling_mean(csum, window, count_csum=None):
+    """
+    Mean over the last `window` values with min_periods=1 (csum has a leading zero).
+    With count_csum (running count of present values) the sum is divided by the values
+    present in each window, and a window with none is NaN.
+    """
+    n = len(csum) - 1
+    out = np.empty(n)
+    head = min(window, n)
+    if count_csum is None:
+        out[:head] = csum[1:head + 1] / np.arange(1, head + 1)
+        if n > window:
+            np.subtract(csum[window + 1:], csum[1:-window], out=out[window:])
+            out[window:] /= window
+        return out
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[:head] = csum[1:head + 1] / count_csum[1:head + 1]
+        if n > window:
+            out[window:] = (csum[window + 1:] - csum[1:-window]) / (count_csum[window + 1:] - count_csum[1:-window])
+    return out
+
+
+def compute_indicators(high, low, close, columns=None):
+    """
+    Compute technical indicators for aligned high/low/close arrays.
+    Returns a float32 matrix of shape (n, len(columns)), one column per requested indicator,
+    laid out column-major so each column is contiguous.
+    """
+    columns = list(INDICATOR_COLUMNS if columns is None else columns)
+    unknown = set(columns) - set(INDICATOR_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown indicators: {sorted(unknown)}")
+
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+
+    out = np.empty((n, len(columns)), dtype=np.float32, order="F")
+    col_index = {name: i for i, name in enumerate(columns)}
+
+    def put(name, values):
+        if name in col_index:
+            out[:, col_index[name]] = values
+
+    if n == 0:
+        return out
+
+    # Shared intermediates. Running sums are taken over gap-filled closes and windows that
+    # touch a missing close are masked through nan_csum.
+    missing = np.isnan(close)
+    gaps = bool(missing.any())
+    filled = _fill_gaps(close, missing) if gaps else close
+    nan_csum = _running_sum(missing) if gaps else None
+    prev_close = close[:-1]
+    delta = close[1:] - prev_close
+    csum = _running_sum(filled)
+
+    ret = np.zeros(n)
+    np.divide(delta, prev_close, out=ret[1:])
+    if gaps:
+        ret[np.isnan(ret)] = 0.0
+    put("return", ret)
+
+    put("log_return", np.log1p(ret))
+
+    ma5 = _rolling_mean(csum, 5, nan_csum)
+    put("ma5", ma5)
+    put("ma_norm", close / ma5)
+    del ma5
+
+    # Compounded returns: a gap contributes no return, as with pct_change().fillna(0)
+    put("cumulative_return", np.cumprod(1 + ret) - 1 if gaps else close / close[0] - 1)
+
+    # fmax skips a missing term, like the row-wise max over the three candidates
+    true_range = high - low
+    np.fmax(true_range[1:], np.abs(high[1:] - prev_close), out=true_range[1:])
+    np.fmax(true_range[1:], np.abs(low[1:] - prev_close), out=true_range[1:])
+    tr_missing = np.isnan(true_range)
+    tr_nan_csum = None
+    if tr_missing.any():
+        tr_nan_csum = _running_sum(tr_missing)
+        true_range = _fill_gaps(true_range, tr_missing)
+    tr_csum = _running_sum(true_range)
+    del true_range, tr_missing
+    atr = _rolling_mean(tr_csum, ATR_WINDOW, tr_nan_csum)
+    del tr_csum, tr_nan_csum
+    put("atr", atr)
+    put("natr", atr / close * 100)
+    del atr
+
+    # dpo[t] = close[t - 11] - ma21[t - 1], zero until both terms exist
+    dpo = np.zeros(n)
+    if n > DPO_WINDOW:
+        ma21 = _rolling_mean(csum, DPO_WINDOW, nan_csum)
+        dpo[DPO_WINDOW:] = close[DPO_WINDOW - DPO_SHIFT:n - DPO_SHIFT] - ma21[DPO_WINDOW - 1:-1]
+        del ma21
+        if gaps:
+            dpo[np.isnan(dpo)] = 0.0
+    put("dpo", dpo)
+    del dpo
+
+    ma10 = _rolling_mean(csum, 10, nan_csum)
+    put("ma10", ma10)
+    put("volatility", _rolling_std(filled, 10, nan_csum))
+    del ma10
+
+    momentum = np.zeros(n)
+    momentum[5:] = close[5:] - close[:-5]
+    if gaps:
+        momentum[np.isnan(momentum)] = 0.0
+    put("momentum", momentum)
+
+    # RSI averages the deltas present in its window; missing deltas are left out of the count
+    up = np.maximum(delta, 0.0)
+    down = np.maximum(-delta, 0.0)
+    count_csum = None
+    if gaps:
+        delta_missing = np.isnan(delta)
+        up[delta_missing] = 0.0
+        down[delta_missing] = 0.0
+        count_csum = _running_sum(~delta_missing)
+        del delta_missing
+    up_csum = _running_sum(up)
+    down_csum = _running_sum(down)
+    del up, down
+    rsi = np.full(n, np.nan)
+    if n > 1:
+        ma_up = _expanding_then_rolling_mean(up_csum, RSI_WINDOW, count_csum)
+        ma_down = _expanding_then_rolling_mean(down_csum, RSI_WINDOW, count_csum)
+        rsi[1:] = 100 - 100 / (1 + ma_up / (ma_down + 1e-6))
+        del ma_up, ma_down
+    del up_csum, down_csum, count_csum, delta
+    put("rsi", rsi)
+    del rsi
+
+    ema12 = _ema(close, 12)
+    ema26 = _ema(close, 26)
+    put("ema12", ema12)
+    put("ema26", ema26)
+    macd = ema12 - ema26
+    del ema12, ema26
+    put("macd", macd)
+    put("macd_signal", _ema(macd, 9))
+    del macd
+
+    ma20 = _rolling_mean(csum, BOLL_WINDOW, nan_csum)
+    std20 = _rolling_std(filled, BOLL_WINDOW, nan_csum)
+    std20 *= 2
+    put("boll_upper", ma20 + std20)
+    put("boll_lower", ma20 - std20)
+
+    return out
+
+
+def add_indicators(df, columns=FEATURE_COLUMNS):
+    """Return `df` with the requested indicator columns appended (replacing any existing ones)."""
+    columns = list(columns)
+    matrix = compute_indicators(
+        df["high"].to_numpy(dtype=np.float64),
+        df["low"].to_numpy(dtype=np.float64),
+        df["close"].to_numpy(dtype=np.float64),
+        columns=columns,
+    )
+    indicators = pd.DataFrame(matrix, index=df.index, columns=columns, copy=False)
+    base = df.drop(columns=[col for col in columns if col in df.columns])
+    return pd.concat([base, indicators], axis=1)
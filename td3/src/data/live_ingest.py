@@ -0,0 +1,181 @@
+"""
+Continuous ingestion of new bars into InfluxDB.
+Each instrument keeps a JSON checkpoint with the last ingested bar time and the streaming
+indicator state, so a poll only fetches bars after the checkpoint (backfilling any downtime
+in chunks) and indicators advance in O(1) per bar instead of being recomputed over history.
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from src.data.concurrent_fetch import split_intervals
+from src.data.indicators import INDICATOR_COLUMNS
+from src.data.local_api import GRANULARITY_FREQ
+from src.data.perform_ops import _combine_bid_ask
+from src.data.streaming_indicators import StreamingIndicators
+
+logger = logging.getLogger("td3-stock-trading")
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "spread", "volume"]
+
+
+def _utc_now():
+    return pd.Timestamp.now(tz="UTC").tz_localize(None)
+
+
+class LiveIngestor:
+    """
+    Brings one instrument's measurement up to date on every poll(). Writes are idempotent in
+    InfluxDB (same series and timestamp), so a crash between a write and the checkpoint commit
+    only rewrites the same points on restart.
+    """
+
+    def __init__(self,
+                 instrument,
+                 granularity,
+                 fetcher,
+                 writer,
+                 measurement,
+                 checkpoint_dir="stock-data/ingest",
+                 backfill_start=None,
+                 chunk_delta=relativedelta(days=1),
+                 clock=_utc_now,
+        ):
+        self.instrument = instrument
+        self.granularity = granularity
+        self.bar = pd.Timedelta(GRANULARITY_FREQ[granularity])
+        self.fetcher = fetcher
+        self.writer = writer
+        self.measurement = measurement
+        self.chunk_delta = chunk_delta
+        self.clock = clock
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(checkpoint_dir, f"{instrument}_{granularity}.json")
+
+        # start is the fetch cursor: every bar before it has been ingested (or was out of hours)
+        self.start = None
+        self.last_time = None
+        self.indicators = StreamingIndicators()
+        self._load_checkpoint()
+        if self.start is None:
+            self.start = pd.Timestamp(backfill_start) if backfill_start is not None else self.clock() - pd.Timedelta(days=7)
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        self.start = pd.Timestamp(checkpoint["next_start"])
+        if checkpoint["last_time"] is not None:
+            self.last_time = pd.Timestamp(checkpoint["last_time"])
+        self.indicators = StreamingIndicators.from_dict(checkpoint["indicators"])
+        logger.info(f"Resuming {self.instrument} {self.granularity} from {self.start} (last bar {self.last_time})")
+
+    def _commit_checkpoint(self):
+        checkpoint = {
+            "instrument": self.instrument,
+            "granularity": self.granularity,
+            "next_start": self.start.isoformat(),
+            "last_time": self.last_time.isoformat() if self.last_time is not None else None,
+            "indicators": self.indicators.to_dict(),
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.checkpoint_path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _bars_with_indicators(self, bid, ask, chunk_end):
+        """
+        Complete market-hours bars after the checkpoint with incrementally updated indicators,
+        plus the time up to which the chunk is final.
+        """
+        if bid is None or ask is None or bid.empty or ask.empty:
+            return pd.DataFrame(columns=PRICE_COLUMNS + INDICATOR_COLUMNS, dtype=np.float64), chunk_end
+
+        combined = _combine_bid_ask(bid, ask, float_dtype=np.float64)
+        covered_end = chunk_end
+        if {"complete_bid", "complete_ask"}.issubset(combined.columns):
+            complete = combined["complete_bid"].astype(bool) & combined["complete_ask"].astype(bool)
+            # Everything from the first still-forming candle on is fetched again next poll
+            if not complete.all():
+                covered_end = combined.index[~complete.to_numpy()][0]
+                combined = combined[combined.index < covered_end]
+        if self.last_time is not None:
+            combined = combined[combined.index > self.last_time]
+
+        df = pd.DataFrame({col: combined[col] for col in PRICE_COLUMNS if col != "volume"})
+        df["volume"] = (combined["volume_bid"] + combined["volume_ask"]) / 2
+
+        rows = np.empty((len(df), len(INDICATOR_COLUMNS)))
+        for i, (high, low, close) in enumerate(zip(df["high"].tolist(), df["low"].tolist(), df["close"].tolist())):
+            values = self.indicators.update(high, low, close)
+            rows[i] = [values[col] for col in INDICATOR_COLUMNS]
+        return pd.concat([df, pd.DataFrame(rows, index=df.index, columns=INDICATOR_COLUMNS)], axis=1), covered_end
+
+    def poll(self):
+        """Fetch, enrich and write every complete bar up to now; returns the number of bars written."""
+        end = self.clock().floor(self.bar)
+        if end <= self.start:
+            return 0
+
+        chunks = split_intervals([(self.start, end)], self.chunk_delta)
+        if len(chunks) > 1:
+            logger.info(f"Backfilling {self.instrument} {self.granularity} from {self.start} in {len(chunks)} chunks")
+
+        written = 0
+        for chunk in self.fetcher.iter_chunks(self.instrument, chunks, self.granularity):
+            if chunk.error is not None:
+                # Later chunks would leave a hole behind the checkpoint, so stop and retry next poll
+                logger.error(f"Failed to fetch {self.instrument} {chunk.start} to {chunk.end}: {chunk.error}")
+                break
+
+            state = self.indicators.to_dict()
+            try:
+                df, covered_end = self._bars_with_indicators(chunk.bid, chunk.ask, chunk.end)
+                if not df.empty:
+                    self.writer.write(df, self.measurement, tags={"instrument": self.instrument})
+            except Exception:
+                # Keep the indicators consistent with the checkpoint; the chunk is retried next poll
+                self.indicators = StreamingIndicators.from_dict(state)
+                raise
+
+            if not df.empty:
+                self.last_time = df.index[-1]
+                written += len(df)
+            self.start = max(self.start, covered_end)
+            self._commit_checkpoint()
+            if covered_end < chunk.end:
+                break
+
+        if written:
+            logger.info(f"Ingested {written} {self.granularity} bars for {self.instrument} up to {self.last_time}")
+        return written
+
+
+def run_live(ingestors, poll_seconds=None, max_polls=None, error_backoff=30.0):
+    """
+    Poll every ingestor once per bar interval (or every poll_seconds) until max_polls polls,
+    or forever. Errors are logged and retried on the next poll.
+    """
+    interval = poll_seconds or min(ingestor.bar for ingestor in ingestors).total_seconds()
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        t0 = time.monotonic()
+        failed = False
+        for ingestor in ingestors:
+            try:
+                ingestor.poll()
+            except Exception as e:
+                failed = True
+                logger.error(f"Ingestion poll for {ingestor.instrument} failed: {e}")
+        polls += 1
+        if max_polls is not None and polls >= max_polls:
+            break
+        wait = error_backoff if failed else interval - (time.monotonic() - t0)
+        time.sleep(max(0.0, wait))
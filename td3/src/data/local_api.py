@@ -0,0 +1,61 @@
+"""
+Offline stand-in for tpqoa.tpqoa: get_history returns deterministic synthetic candles
+in the same shape as OANDA (o, h, l, c, volume, complete indexed by time), with optional
+latency and injected failures so the fetch pipeline can be exercised without credentials.
+"""
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+GRANULARITY_FREQ = {
+    "S5": "5s", "S10": "10s", "S15": "15s", "S30": "30s",
+    "M1": "1min", "M2": "2min", "M4": "4min", "M5": "5min", "M10": "10min", "M15": "15min", "M30": "30min",
+    "H1": "1h", "H2": "2h", "H4": "4h", "D": "1D",
+}
+
+
+def _mid_price(ticks, salt):
+    noise = ((ticks * 2654435761 + salt) % 1000003) / 1000003.0 - 0.5
+    return 15000 + 200 * np.sin(ticks / 5000.0) + 20 * np.sin(ticks / 37.0) + 5 * noise
+
+
+class LocalHistoryAPI:
+    def __init__(self, latency=0.0, failure_rate=0.0, half_spread=0.5, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.half_spread = half_spread
+        self.seed = seed
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._failures = np.random.default_rng(seed)
+
+    def get_history(self, instrument, start, end, granularity, price, localize=True):
+        with self._lock:
+            self.calls += 1
+            fail = self._failures.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError(f"Injected failure for {instrument} {start} - {end} ({price})")
+
+        freq = GRANULARITY_FREQ[granularity]
+        index = pd.date_range(pd.Timestamp(start).ceil(freq), pd.Timestamp(end), freq=freq,
+                              inclusive="left", name="time")
+        # Prices depend only on the timestamps, so overlapping or split requests agree bar for bar
+        ticks = index.as_unit("ns").asi8 // pd.Timedelta(freq).value
+        salt = zlib.crc32(f"{instrument}-{self.seed}".encode())
+        side = {"B": -self.half_spread, "A": self.half_spread, "M": 0.0}[price]
+        close = _mid_price(ticks, salt) + side
+        open_ = _mid_price(ticks - 1, salt) + side
+        wiggle = 2 + (ticks % 7)
+        return pd.DataFrame({
+            "o": open_,
+            "h": np.maximum(open_, close) + wiggle,
+            "l": np.minimum(open_, close) - wiggle,
+            "c": close,
+            "volume": (100 + (ticks % 50)).astype(np.int64),
+            "complete": True,
+        }, index=index)
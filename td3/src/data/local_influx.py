@@ -0,0 +1,95 @@
+"""
+Offline stand-in for the InfluxDB 2.x write endpoint: a threaded HTTP server that accepts
+POST /api/v2/write (plain or gzip line protocol), keeps the received lines in memory and can
+inject 503 responses, so the bulk writer can be exercised without a database.
+"""
+import gzip
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+class _WriteHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, b'{"status": "pass"}')
+        else:
+            self._reply(404, b"")
+
+    def do_POST(self):
+        server = self.server.stand_in
+        parsed = urllib.parse.urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if parsed.path != "/api/v2/write":
+            return self._reply(404, b"")
+        if server.token and self.headers.get("Authorization") != f"Token {server.token}":
+            return self._reply(401, b'{"code": "unauthorized"}')
+        if server.should_fail():
+            return self._reply(503, b'{"code": "unavailable"}', {"Retry-After": "0"})
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        if server.latency:
+            time.sleep(server.latency)
+        query = urllib.parse.parse_qs(parsed.query)
+        server.record(query.get("bucket", [""])[0], body.decode().splitlines())
+        self._reply(204, b"")
+
+    def _reply(self, status, body, headers=None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+class LocalInfluxServer:
+    """Use as a context manager; `url` points at the running server."""
+
+    def __init__(self, port=0, token=None, latency=0.0, failure_rate=0.0, seed=0):
+        self.token = token
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.lines = {}
+        self._lock = threading.Lock()
+        self._failures = np.random.default_rng(seed)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _WriteHandler)
+        self._httpd.stand_in = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def should_fail(self):
+        with self._lock:
+            self.requests += 1
+            return self._failures.random() < self.failure_rate
+
+    def record(self, bucket, lines):
+        with self._lock:
+            self.lines.setdefault(bucket, []).extend(lines)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="local-influx", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,44 +1,70 @@
-import gc
-import glob
 import os
 import time
 
+import numpy as np
 import pandas as pd
 import logging
 import datetime as dt
 
 from dateutil.relativedelta import relativedelta
 
-from src.data.fetch_data import fetch_stock_data
+from src.data.bar_store import BarStore
+from src.data.concurrent_fetch import ConcurrentFetcher, split_intervals
+from src.data.fetch_data import create_api, fetch_stock_data
+from src.utils.resources import current_rss_mb, peak_rss_mb
 
 logger = logging.getLogger("td3-stock-trading")
 
 
+def _market_hours_mask(index):
+    """Monday to Friday, 13:00 to 21:59 UTC."""
+    hour = np.asarray(index.hour)
+    return (np.asarray(index.dayofweek) <= 4) & (hour >= 13) & (hour <= 21)
+
+
 def _filter_market_hours(data):
     logger.info("Filtering dataframe with relevant market hours")
-    df = data.copy()
+    return data[_market_hours_mask(data.index)]
+
+
+def _downcast(values, float_dtype):
+    if values.dtype.kind == "f":
+        return values.astype(float_dtype, copy=False)
+    if values.dtype.kind in "iu":
+        return values.astype(np.int32, copy=False)
+    return values
+
 
-    df['day_of_week'] = df.index.dayofweek
-    df['hour'] = df.index.hour
+def _combine_bid_ask(bid_data, ask_data, float_dtype=np.float32):
+    """
+    Market-hours bid/ask columns plus mid OHLC and spread, built column by column from the
+    filtered rows only (no intermediate concat/copy). Prices are computed in float64 and
+    stored as float_dtype; integer columns are narrowed to int32.
+    """
+    if not bid_data.index.equals(ask_data.index):
+        bid_data, ask_data = bid_data.align(ask_data, join="outer", axis=0)
 
-    trading_mask = (
-            (df['day_of_week'] <= 4) &
-            (df['hour'] >= 13) & (df['hour'] <= 21)
-    )
+    mask = _market_hours_mask(bid_data.index)
+    columns = {}
+    for suffix, side in (("_bid", bid_data), ("_ask", ask_data)):
+        for col in side.columns:
+            columns[col + suffix] = _downcast(side[col].to_numpy()[mask], float_dtype)
 
-    filtered_df = df[trading_mask].copy()
+    def mid(col):
+        return (bid_data[col].to_numpy()[mask] + ask_data[col].to_numpy()[mask]) / 2
 
-    filtered_df.drop(['day_of_week', 'hour'], axis=1, inplace=True)
+    columns["open"] = mid("o").astype(float_dtype)
+    columns["high"] = mid("h").astype(float_dtype)
+    columns["low"] = mid("l").astype(float_dtype)
+    columns["close"] = mid("c").astype(float_dtype)
+    columns["spread"] = (ask_data["c"].to_numpy()[mask] - bid_data["c"].to_numpy()[mask]).astype(float_dtype)
 
-    return filtered_df
+    combined_data = pd.DataFrame(columns, index=bid_data.index[mask], copy=False)
 
-def _remove_chunks(instrument : str, data_dir="stock-data"):
-    pattern = os.path.join(data_dir, f"{instrument}*.csv")
-    for file_path in glob.glob(pattern):
-        try:
-            os.remove(file_path)
-        except Exception as e:
-            logger.error(f"Error deleting chunks: {e}")
+    data_size_mb = combined_data.memory_usage(deep=True).sum() / (1024 * 1024)
+    logger.debug(f"Chunk size: {data_size_mb:.2f} MB with {len(combined_data)} rows")
+
+    return combined_data
 
 
 class PerformDataOperations:
@@ -47,14 +73,23 @@ class PerformDataOperations:
                  start : str,
                  end : str,
                  granularity : str,
-                 years : int
+                 years : int,
+                 api_factory=create_api,
+                 max_workers : int = 8,
+                 requests_per_second : float = 20,
+                 data_dir : str = "stock-data",
         ):
         self.years = years
         self.instrument = instrument
         self.start = start
         self.end = end
         self.granularity = granularity
-        self.data_dir = "stock-data"
+        self.data_dir = data_dir
+        self.fetcher = ConcurrentFetcher(
+            api_factory=api_factory,
+            max_workers=max_workers,
+            requests_per_second=requests_per_second,
+        )
         os.makedirs(self.data_dir, exist_ok=True)
 
 
@@ -67,7 +102,6 @@ class PerformDataOperations:
             granularity=self.granularity,
             price="B"
         )
-        bid_data = bid_data.add_suffix('_bid')
 
         logger.info(f"Fetching ASK data from {self.start} to {self.end} for instrument: {self.instrument}")
         ask_data = fetch_stock_data(
@@ -77,37 +111,18 @@ class PerformDataOperations:
             granularity=self.granularity,
             price="A"
         )
-        ask_data = ask_data.add_suffix('_ask')
-
-        logger.info(f"Combining BID and ASK data, removing extra dataframes")
-        combined_data = pd.concat([bid_data, ask_data], axis=1)
-
-        del bid_data, ask_data
-        gc.collect()
-
-        logger.info(f"Add mid-price calculations (inplace operation)")
-
-        combined_data['open'] = (combined_data['o_bid'] + combined_data['o_ask']) / 2
-        combined_data['high'] = (combined_data['h_bid'] + combined_data['h_ask']) / 2
-        combined_data['low'] = (combined_data['l_bid'] + combined_data['l_ask']) / 2
-        combined_data['close'] = (combined_data['c_bid'] + combined_data['c_ask']) / 2
-        combined_data['spread'] = combined_data['c_ask'] - combined_data['c_bid']
-
-        combined_data = _filter_market_hours(combined_data)
-
-        data_size_mb = combined_data.memory_usage(deep=True).sum() / (1024 * 1024)
-
-        logger.info(f"Data size: {data_size_mb:.2f} MB with {len(combined_data)} rows")
-
-        data_file = f"{self.data_dir}/{self.instrument}_{self.start}_{self.end}_{self.granularity}.csv"
-
-        combined_data.to_csv(data_file)
-
-        logger.info(f"Saved combined data to path: {data_file}")
 
-        return combined_data
-
-    def perform_chunking(self, granularity="M5"):
+        return _combine_bid_ask(bid_data, ask_data)
+
+    def perform_chunking(self, granularity="M5", load=True, source_granularity=None):
+        """
+        Bring the local bar store up to date for the last `years` years and return the range
+        as a DataFrame (or the BarStore itself with load=False, for callers that range-read).
+        Chunks stream straight from the fetcher into the store, so memory stays bounded by the
+        fetcher's in-flight chunks however many years are requested.
+        With source_granularity (e.g. "S30") only that store is fetched and `granularity` is
+        resampled from it, so every coarser granularity shares one download.
+        """
         years = self.years
         end_date = dt.datetime.now()
 
@@ -116,57 +131,62 @@ class PerformDataOperations:
             end_date -= dt.timedelta(days=days_to_subtract)
 
         start_date = end_date - relativedelta(years=years)
-
-        current_start = start_date
         chunk_delta = relativedelta(months=3)
 
-        all_chunks = []
-
-        logger.info(f"Fetching {years} years of data in 3-month chunks for instrument: {self.instrument}")
-
-        while current_start < end_date:
-            current_end = min(current_start + chunk_delta, end_date)
-
-            logger.info(f"Fetching chunk: {current_start.date()} to {current_end.date()}")
-
-            try:
-                self.start = current_start.strftime("%Y-%m-%d")
-                self.end = current_end.strftime("%Y-%m-%d")
-                self.granularity = granularity
-
-                chunk_df = self.fetch_historical_data()
-
-                if chunk_df is not None and not chunk_df.empty:
-                    all_chunks.append(chunk_df)
-                    logger.info(f"Finished chunk: {current_start.date()} to {current_end.date()} with {len(chunk_df)} rows")
-                else:
-                    logger.warning(f"Chunk {current_start.date()} to {current_end.date()} returned no data")
+        fetch_granularity = source_granularity or granularity
+        store = BarStore(self.instrument, fetch_granularity, root=os.path.join(self.data_dir, "bars"))
+        gaps = store.missing(start_date, end_date)
 
-                time.sleep(1)
-                del chunk_df
-                gc.collect()
+        logger.info(f"{len(store)} bars already stored for {self.instrument} {fetch_granularity}; "
+                    f"fetching {len(gaps)} missing interval(s) of the last {years} years in 3-month chunks")
 
-            except Exception as e:
-                logger.error(f"Failed to fetch chunk {current_start.date()} to {current_end.date()}: {e}")
-
-            current_start = current_end
-
-        if all_chunks:
-            final_data = pd.concat(all_chunks)
-            data_file = f"{self.data_dir}/stock_data_{self.instrument}_{start_date.date()}_{end_date.date()}_{granularity}.csv"
-            final_data.to_csv(data_file)
-
-            logger.info(f"Saved full chunked data to path: {data_file}")
-            logger.info(f"Final data shape: {final_data.shape}")
-
-
-            logger.info(f"Removing chunks from {self.data_dir}")
-            _remove_chunks(instrument=self.instrument, data_dir=self.data_dir)
-
-            return final_data
-        else:
+        chunks = split_intervals(gaps, chunk_delta)
+        self.granularity = granularity
+        rows_written = 0
+        t0 = time.perf_counter()
+
+        for chunk in self.fetcher.iter_chunks(self.instrument, chunks, fetch_granularity):
+            if chunk.error is not None:
+                logger.error(f"Failed to fetch chunk {chunk.start} to {chunk.end}: {chunk.error}")
+                continue
+
+            chunk_df = _combine_bid_ask(chunk.bid, chunk.ask)
+            covered_end = chunk.end
+
+            # A still-forming candle must be fetched again later, so coverage stops before it
+            if {"complete_bid", "complete_ask"}.issubset(chunk_df.columns):
+                incomplete = ~(chunk_df["complete_bid"].astype(bool) & chunk_df["complete_ask"].astype(bool))
+                if incomplete.any():
+                    covered_end = chunk_df.index[incomplete.to_numpy()][0]
+                    chunk_df = chunk_df[chunk_df.index < covered_end]
+
+            rows_written += store.append(chunk_df, start=chunk.start, end=covered_end)
+            logger.info(f"Finished chunk: {chunk.start} to {chunk.end} with {len(chunk_df)} rows "
+                        f"(RSS {current_rss_mb():.0f} MB)")
+            del chunk, chunk_df
+
+        elapsed = time.perf_counter() - t0
+        logger.info(f"Fetcher made {self.fetcher.requests} requests ({self.fetcher.failed_attempts} failed attempts)")
+        logger.info(f"Streamed {rows_written} rows in {elapsed:.1f}s "
+                    f"({rows_written / max(elapsed, 1e-9):.0f} rows/s, peak RSS {peak_rss_mb():.0f} MB)")
+
+        if source_granularity and source_granularity != granularity:
+            # Imported here: resample depends on this module's market-hours mask
+            from src.data.resample import Resampler
+            resampler = Resampler(store, [granularity])
+            resampler.update()
+            store = resampler.store(granularity)
+
+        if not load:
+            return store
+
+        final_data = store.read(start_date, end_date)
+
+        if final_data.empty:
             logger.error("No data fetched across all chunks, returning empty dataframe")
             return pd.DataFrame()
 
+        logger.info(f"Bar store path: {store.path}")
+        logger.info(f"Final data shape: {final_data.shape}")
 
-
+        return final_data
@@ -1,11 +1,15 @@
 import os
+import sys
 import time
 
 import pandas as pd
 import numpy as np
 import logging
 
+from src.data import indicators
 from src.data.dr import DimensionReducer
+from src.data.feature_cache import FeatureCache, frame_digest, source_digest
+from src.data.indicators import add_indicators
 
 logger = logging.getLogger("td3-stock-trading")
 
@@ -33,6 +37,14 @@ class PreprocessData:
 
 
     def preprocess_data(self, combined_data):
+        cache = FeatureCache(self.data_dir)
+        params = {"pipeline": "oanda", "code": source_digest(sys.modules[__name__], indicators)}
+        cache_key = cache.key(frame_digest(combined_data), params)
+        cached = cache.load(cache_key)
+        if cached is not None:
+            frames = cached["frames"]
+            return frames["train"], frames["val"], frames["test"], frames["train"].columns
+
         df = combined_data.copy()
 
         # logger.info("Convert time column to datetime")
@@ -43,50 +55,7 @@ class PreprocessData:
         logger.info(
             "Performing feature engineering (returns / ma5 / ma10 / volatility / momentum / RSI / MACD / Bollinger Bands)")
 
-        df['return'] = df['close'].pct_change().fillna(0)
-        df['log_return'] = np.log(df['close'] / df['close'].shift(1)).fillna(0)
-
-        df['ma5'] = df['close'].rolling(window=5).mean()
-        df['ma10'] = df['close'].rolling(window=10).mean()
-
-        df['ma_norm'] = df['close'] / df['ma5']
-
-        df['cumulative_return'] = (1 + df['return']).cumprod() - 1
-
-        high_low = df['high'] - df['low']
-        high_close_prev = abs(df['high'] - df['close'].shift(1))
-        low_close_prev = abs(df['low'] - df['close'].shift(1))
-        true_range = pd.concat([high_low, high_close_prev, low_close_prev], axis=1).max(axis=1)
-        df['atr'] = true_range.rolling(window=14).mean()
-
-        df['natr'] = (df['atr'] / df['close']) * 100
-
-        df['dpo'] = df['close'].shift(11) - df['close'].rolling(window=21).mean().shift(1)
-        df['dpo'] = df['dpo'].fillna(0)
-
-        df['volatility'] = df['close'].rolling(window=10).std()
-
-        df['momentum'] = df['close'] - df['close'].shift(5)
-        df['momentum'] = df['momentum'].fillna(0)
-
-        window_length = 14
-        delta = df['close'].diff()
-        up = delta.clip(lower=0)
-        down = -1 * delta.clip(upper=0)
-        ma_up = up.rolling(window=window_length, min_periods=1).mean()
-        ma_down = down.rolling(window=window_length, min_periods=1).mean()
-        rs = ma_up / (ma_down + 1e-6)
-        df['rsi'] = 100 - (100 / (1 + rs))
-
-        ema12 = df['close'].ewm(span=12, adjust=False).mean()
-        ema26 = df['close'].ewm(span=26, adjust=False).mean()
-        df['macd'] = ema12 - ema26
-        df['macd_signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-
-        ma20 = df['close'].rolling(window=20).mean()
-        std20 = df['close'].rolling(window=20).std()
-        df['boll_upper'] = ma20 + 2 * std20
-        df['boll_lower'] = ma20 - 2 * std20
+        df = add_indicators(df)
 
         logger.info("Applying Min-Max normalization to numerical features")
 
@@ -102,7 +71,7 @@ class PreprocessData:
 
         df.drop(columns=['o_bid', 'h_bid', 'l_bid', 'c_bid', 'volume_bid',
                          'o_ask', 'h_ask', 'l_ask', 'c_ask', 'volume_ask', 'complete_bid', 'complete_ask'],
-                inplace=True, axis=1)
+                inplace=True)
 
         total_rows = len(df)
         train_end = int(0.7 * total_rows)
@@ -142,12 +111,15 @@ class PreprocessData:
 
         logger.info(f"Train shape: {train_df.shape}, Val shape: {val_df.shape}, Test shape: {test_df.shape}")
 
-        data_file = f"{self.data_dir}/normalized_{self.instrument}_{self.start}_{self.end}_{self.granularity}"
-        train_df.to_csv(data_file + "_train.csv")
-        val_df.to_csv(data_file + "_val.csv")
-        test_df.to_csv(data_file + "_test.csv")
+        cache.store(
+            cache_key,
+            {"train": train_df, "val": val_df, "test": test_df},
+            min_max_scaler,
+            params={**params, "instrument": self.instrument, "start": self.start, "end": self.end,
+                    "granularity": self.granularity},
+        )
 
-        logger.info(f"Saved full chunked data to path: {data_file}_train/_val/_test")
+        logger.info(f"Saved normalized train/val/test features to cache entry: {self.data_dir}/{cache_key}")
 
         features = train_df.columns
 
@@ -0,0 +1,138 @@
+"""
+Derive coarser bars (M1/M5/M15/H1 ...) from the finest stored bars instead of fetching each
+granularity separately. Buckets are formed on the int64 time index and reduced with
+ufunc.reduceat (first/max/min/last/sum), so no per-bucket Python work is done.
+Derived granularities live in their own BarStores next to the source and are brought up to
+date incrementally: only complete buckets of newly covered fine bars are resampled.
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.data.bar_store import BarStore
+from src.data.local_api import GRANULARITY_FREQ
+from src.data.perform_ops import _market_hours_mask
+
+logger = logging.getLogger("td3-stock-trading")
+
+DERIVED_GRANULARITIES = ("M1", "M5", "M15", "H1")
+
+
+def granularity_ns(granularity):
+    return pd.Timedelta(GRANULARITY_FREQ[granularity]).value
+
+
+def _reducer(column):
+    """Bucket reduction for a bar column, by OANDA / _combine_bid_ask naming."""
+    name = column.split("_")[0]
+    if name in ("o", "open"):
+        return "first"
+    if name in ("h", "high"):
+        return "max"
+    if name in ("l", "low"):
+        return "min"
+    if name in ("volume",):
+        return "sum"
+    if name in ("complete",):
+        return "all"
+    # c / close / spread and anything else: value at the end of the bucket
+    return "last"
+
+
+def resample_bars(df, granularity, market_hours=True):
+    """
+    Aggregate time-sorted bars into `granularity` buckets (left-labelled, like OANDA candles).
+    When bid/ask columns are present the mid OHLC and spread are rebuilt from the aggregated
+    sides, so they equal what a direct fetch at the coarse granularity would return.
+    """
+    if df.empty:
+        return df.copy()
+
+    step = granularity_ns(granularity)
+    times = df.index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    buckets = times - times % step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+
+    columns = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        how = _reducer(col)
+        if how == "first":
+            columns[col] = values[starts]
+        elif how == "last":
+            columns[col] = values[ends]
+        elif how == "max":
+            columns[col] = np.maximum.reduceat(values, starts)
+        elif how == "min":
+            columns[col] = np.minimum.reduceat(values, starts)
+        elif how == "sum":
+            columns[col] = np.add.reduceat(values, starts).astype(values.dtype, copy=False)
+        else:
+            columns[col] = np.logical_and.reduceat(values.astype(bool), starts)
+
+    sides = [f"{name}_{side}" for side in ("bid", "ask") for name in "ohlc"]
+    if all(col in columns for col in sides):
+        for mid, name in (("open", "o"), ("high", "h"), ("low", "l"), ("close", "c")):
+            if mid in columns:
+                columns[mid] = ((columns[f"{name}_bid"] + columns[f"{name}_ask"]) / 2).astype(columns[mid].dtype)
+        if "spread" in columns:
+            columns["spread"] = (columns["c_ask"] - columns["c_bid"]).astype(columns["spread"].dtype)
+
+    index = pd.DatetimeIndex(buckets[starts].view("datetime64[ns]"), name=df.index.name)
+    resampled = pd.DataFrame(columns, index=index, columns=df.columns)
+    if market_hours:
+        resampled = resampled[_market_hours_mask(resampled.index)]
+    return resampled
+
+
+class Resampler:
+    """Keeps derived-granularity BarStores in sync with a fine source BarStore."""
+
+    def __init__(self, source: BarStore, granularities=DERIVED_GRANULARITIES, market_hours=True):
+        self.source = source
+        self.granularities = list(granularities)
+        self.market_hours = market_hours
+        source_step = granularity_ns(source.granularity)
+        for granularity in self.granularities:
+            if granularity_ns(granularity) % source_step:
+                raise ValueError(f"{granularity} is not a multiple of {source.granularity}")
+        self.root = os.path.dirname(os.path.dirname(source.path))
+
+    def store(self, granularity):
+        return BarStore(self.source.instrument, granularity, root=self.root)
+
+    def update(self, granularities=None):
+        """
+        Resample every complete bucket covered by the source but not yet by each derived store.
+        Buckets straddling the edge of source coverage wait until the fine bars arrive.
+        Returns {granularity: bars added}.
+        """
+        added = {}
+        source_coverage = [tuple(interval) for interval in self.source.meta["coverage"]]
+        for granularity in granularities or self.granularities:
+            step = granularity_ns(granularity)
+            # Only whole buckets inside a covered interval are final
+            covered = []
+            for start, end in source_coverage:
+                start, end = -(-start // step) * step, end // step * step
+                if start < end:
+                    covered.append((start, end))
+
+            target = self.store(granularity)
+            count = 0
+            for start, end in covered:
+                for gap_start, gap_end in target.missing(pd.Timestamp(start), pd.Timestamp(end)):
+                    fine = self.source.read(gap_start, gap_end)
+                    bars = resample_bars(fine, granularity, market_hours=self.market_hours)
+                    count += target.append(bars, start=gap_start, end=gap_end)
+            added[granularity] = count
+            if count:
+                logger.info(f"Resampled {count} {granularity} bars from {self.source.granularity} "
+                            f"for {self.source.instrument}")
+        return added
+
+    def read(self, granularity, start=None, end=None, columns=None):
+        return self.store(granularity).read(start, end, columns)
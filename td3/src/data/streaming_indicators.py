@@ -0,0 +1,309 @@
+"""
+Incremental (O(1) per bar) versions of the indicators in src.data.indicators for live data.
+After warm-up every value matches compute_indicators on the same history, missing bars
+included: a NaN (or other non-finite) price masks the windows it is in and EMAs carry over it,
+exactly as in the batch engine. The whole state serializes to a JSON-friendly dict so a live
+feed can resume across restarts.
+"""
+import json
+import math
+import logging
+from collections import deque
+
+from src.data.indicators import ATR_WINDOW, BOLL_WINDOW, DPO_SHIFT, DPO_WINDOW, RSI_WINDOW
+
+logger = logging.getLogger("td3-stock-trading")
+
+# Running sums are rebuilt from the window this often so float drift cannot accumulate
+RESYNC_EVERY = 1024
+
+# Bars needed before every indicator is defined (dpo needs a full 21-bar mean of the previous bar)
+WARMUP_BARS = DPO_WINDOW + 1
+
+
+def _or_zero(x):
+    """Terms the batch engine fills with 0 when an input is missing."""
+    return 0.0 if math.isnan(x) else x
+
+
+class RollingStats:
+    """
+    Fixed-window mean / sample std kept as running sums around a periodically reset anchor.
+    NaNs take a slot in the window but stay out of the sums; like pandas rolling, a statistic
+    needs min_periods present values (std needs a full window without gaps).
+    """
+
+    def __init__(self, window, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque(maxlen=window)
+        self.missing = 0  # NaNs currently in the window
+        self.anchor = 0.0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.updates = 0
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    @property
+    def present(self):
+        return len(self.values) - self.missing
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    def update(self, x):
+        if self.full:
+            old = self.values[0]
+            if math.isnan(old):
+                self.missing -= 1
+            else:
+                old -= self.anchor
+                self.sum -= old
+                self.sumsq -= old * old
+        if math.isnan(x):
+            self.missing += 1
+        else:
+            if self.present == 0:
+                self.anchor, self.sum, self.sumsq = x, 0.0, 0.0
+            d = x - self.anchor
+            self.sum += d
+            self.sumsq += d * d
+        self.values.append(x)
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self._resync()
+
+    def _resync(self):
+        present = [v for v in self.values if not math.isnan(v)]
+        self.anchor = present[-1] if present else 0.0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        for v in present:
+            d = v - self.anchor
+            self.sum += d
+            self.sumsq += d * d
+
+    def mean(self):
+        n = self.present
+        if n == 0 or n < self.min_periods:
+            return math.nan
+        return self.anchor + self.sum / n
+
+    def std(self):
+        n = self.present
+        if n < self.window or n < 2:
+            return math.nan
+        var = (self.sumsq - self.sum * self.sum / n) / (n - 1)
+        return math.sqrt(max(var, 0.0))
+
+    def to_dict(self):
+        return {
+            "window": self.window,
+            "min_periods": self.min_periods,
+            "values": list(self.values),
+            "anchor": self.anchor,
+            "sum": self.sum,
+            "sumsq": self.sumsq,
+            "updates": self.updates,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls(state["window"], state["min_periods"])
+        stats.values.extend(state["values"])
+        stats.missing = sum(math.isnan(v) for v in stats.values)
+        stats.anchor = state["anchor"]
+        stats.sum = state["sum"]
+        stats.sumsq = state["sumsq"]
+        stats.updates = state["updates"]
+        return stats
+
+
+class StreamingEMA:
+    """
+    EMA with adjust=False semantics: seeded with the first value. Over NaNs the value is held;
+    the next value is then weighed against (1 - alpha) ** (gap + 1), as pandas ewm does.
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.value = None
+        self.gap = 0
+
+    def update(self, x):
+        if math.isnan(x):
+            if self.value is None:
+                return math.nan
+            self.gap += 1
+        elif self.value is None:
+            self.value = x
+        elif self.gap:
+            held = (1.0 - self.alpha) ** (self.gap + 1)
+            self.value = (held * self.value + self.alpha * x) / (held + self.alpha)
+            self.gap = 0
+        else:
+            self.value = self.alpha * x + (1.0 - self.alpha) * self.value
+        return self.value
+
+    def to_dict(self):
+        return {"span": self.span, "value": self.value, "gap": self.gap}
+
+    @classmethod
+    def from_dict(cls, state):
+        ema = cls(state["span"])
+        ema.value = state["value"]
+        ema.gap = state.get("gap", 0)
+        return ema
+
+
+class StreamingIndicators:
+    """
+    Per-instrument indicator state. Call update(high, low, close) once per new bar;
+    it returns a dict keyed like INDICATOR_COLUMNS.
+    """
+
+    def __init__(self):
+        self.bars = 0
+        # cumulative_return compounds bar returns, and a missing bar contributes none: it is
+        # growth_base * close / segment_close - 1 within each run of bars without gaps
+        self.growth = 1.0
+        self.growth_base = 1.0
+        self.segment_close = None
+        self.prev_close = None
+        self.history = deque(maxlen=DPO_SHIFT)  # previous closes, oldest first
+        self.ma5 = RollingStats(5)
+        self.ma10 = RollingStats(10)
+        self.ma20 = RollingStats(BOLL_WINDOW)
+        self.ma21 = RollingStats(DPO_WINDOW)
+        self.atr = RollingStats(ATR_WINDOW)
+        self.rsi_up = RollingStats(RSI_WINDOW, min_periods=1)
+        self.rsi_down = RollingStats(RSI_WINDOW, min_periods=1)
+        self.ema12 = StreamingEMA(12)
+        self.ema26 = StreamingEMA(26)
+        self.macd_signal = StreamingEMA(9)
+
+    @property
+    def ready(self):
+        return self.bars >= WARMUP_BARS
+
+    def update(self, high, low, close):
+        high, low, close = (v if math.isfinite(v) else math.nan for v in map(float, (high, low, close)))
+        prev = self.prev_close
+
+        if math.isnan(close):
+            self.growth_base, self.segment_close = self.growth, None
+        else:
+            if self.segment_close is None:
+                self.growth_base, self.segment_close = self.growth, close
+            self.growth = self.growth_base * close / self.segment_close
+
+        # Terms that refer to earlier bars are read before this bar enters the windows
+        dpo = 0.0
+        if self.ma21.full:
+            dpo = _or_zero(self.history[0] - self.ma21.mean())
+        momentum = _or_zero(close - self.history[-5]) if len(self.history) >= 5 else 0.0
+
+        if prev is None:
+            ret = 0.0
+            true_range = high - low
+            rsi = math.nan
+        else:
+            ret = _or_zero((close - prev) / prev)
+            # Missing terms are skipped, as by np.fmax in the batch engine
+            true_range = max((v for v in (high - low, abs(high - prev), abs(low - prev)) if not math.isnan(v)),
+                             default=math.nan)
+            delta = close - prev
+            self.rsi_up.update(max(delta, 0.0) if not math.isnan(delta) else math.nan)
+            self.rsi_down.update(max(-delta, 0.0) if not math.isnan(delta) else math.nan)
+            rsi = 100 - 100 / (1 + self.rsi_up.mean() / (self.rsi_down.mean() + 1e-6))
+
+        for stats in (self.ma5, self.ma10, self.ma20, self.ma21):
+            stats.update(close)
+        self.atr.update(true_range)
+
+        ema12 = self.ema12.update(close)
+        ema26 = self.ema26.update(close)
+        macd = ema12 - ema26
+        ma5 = self.ma5.mean()
+        atr = self.atr.mean()
+        ma20 = self.ma20.mean()
+        std20 = self.ma20.std()
+
+        self.history.append(close)
+        self.prev_close = close
+        self.bars += 1
+
+        return {
+            "return": ret,
+            "log_return": math.log1p(ret),
+            "ma5": ma5,
+            "ma10": self.ma10.mean(),
+            "ma_norm": close / ma5,
+            "cumulative_return": self.growth - 1,
+            "atr": atr,
+            "natr": atr / close * 100,
+            "dpo": dpo,
+            "volatility": self.ma10.std(),
+            "momentum": momentum,
+            "rsi": rsi,
+            "ema12": ema12,
+            "ema26": ema26,
+            "macd": macd,
+            "macd_signal": self.macd_signal.update(macd),
+            "boll_upper": ma20 + 2 * std20,
+            "boll_lower": ma20 - 2 * std20,
+        }
+
+    def warm_up(self, high, low, close):
+        """Feed a block of historical bars; returns the indicators of the last one."""
+        row = None
+        for h, l, c in zip(high, low, close):
+            row = self.update(h, l, c)
+        return row
+
+    def to_dict(self):
+        return {
+            "bars": self.bars,
+            "growth": self.growth,
+            "growth_base": self.growth_base,
+            "segment_close": self.segment_close,
+            "prev_close": self.prev_close,
+            "history": list(self.history),
+            "rolling": {name: getattr(self, name).to_dict()
+                        for name in ("ma5", "ma10", "ma20", "ma21", "atr", "rsi_up", "rsi_down")},
+            "ema": {name: getattr(self, name).to_dict() for name in ("ema12", "ema26", "macd_signal")},
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        indicators = cls()
+        indicators.bars = state["bars"]
+        indicators.prev_close = state["prev_close"]
+        if "growth" in state:
+            indicators.growth = state["growth"]
+            indicators.growth_base = state["growth_base"]
+            indicators.segment_close = state["segment_close"]
+        elif state.get("first_close") is not None:
+            # State saved before gaps were handled: one run of bars since the first close
+            indicators.segment_close = state["first_close"]
+            indicators.growth = state["prev_close"] / state["first_close"]
+        indicators.history.extend(state["history"])
+        for name, stats in state["rolling"].items():
+            setattr(indicators, name, RollingStats.from_dict(stats))
+        for name, ema in state["ema"].items():
+            setattr(indicators, name, StreamingEMA.from_dict(ema))
+        return indicators
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,199 @@
+"""
+Deterministic synthetic market for offline load tests of the data and training pipelines.
+
+Prices follow a geometric Brownian motion whose drift and volatility come from a Markov chain of
+regimes (bull / bear / calm by default). On top of that, a mean-reverting log-volatility factor
+clusters volatile bars together, and a bid/ask spread widens with volatility. Bars are produced in
+chunks and written straight to disk in the two schemas the pipelines read:
+  - OHLCV CSV (Date, Open, High, Low, Close, Volume), for csv_preprocess.load_and_preprocess_csv;
+  - OANDA-style bid/ask bars (o_bid .. complete_ask plus mid OHLC and spread, as built by
+    perform_ops._combine_bid_ask), appended to a BarStore for PreprocessData.preprocess_data.
+Each random stream has its own generator and draws a fixed amount per bar, so the same seed
+gives the same bars whatever the chunk size.
+"""
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+from src.data.bar_store import BarStore
+
+logger = logging.getLogger("td3-stock-trading")
+
+# (annual drift, annual volatility) per regime: bull, bear, calm
+DEFAULT_REGIMES = ((0.12, 0.15), (-0.25, 0.35), (0.04, 0.10))
+
+# Intraday bars fall in the same window perform_ops keeps: weekdays, 13:00 to 21:59 UTC
+SESSION_OPEN = pd.Timedelta(hours=13)
+SESSION_CLOSE = pd.Timedelta(hours=22)
+TRADING_DAYS = 252
+# pandas timestamps are int64 nanoseconds and end in 2262
+LAST_DAY = np.datetime64(pd.Timestamp.max.date(), "D")
+
+_STREAMS = ("regime", "jump", "vol", "shock", "gap", "high", "low", "volume", "spread")
+
+
+class SyntheticMarket:
+    def __init__(self,
+                 seed=0,
+                 start="2010-01-04",
+                 freq="5min",
+                 price=100.0,
+                 regimes=DEFAULT_REGIMES,
+                 regime_days=60,
+                 vol_half_life_days=2.0,
+                 vol_of_vol=0.5,
+                 spread_bps=1.0,
+                 base_volume=1000
+        ):
+        self.seed = seed
+        self.freq = pd.Timedelta(freq)
+        self.start_day = np.datetime64(pd.Timestamp(start).date(), "D")
+        if self.freq >= pd.Timedelta(days=1):
+            self.bars_per_day, self.session_open = 1, pd.Timedelta(0)
+        else:
+            self.bars_per_day, self.session_open = int((SESSION_CLOSE - SESSION_OPEN) / self.freq), SESSION_OPEN
+        self.dt = 1.0 / (TRADING_DAYS * self.bars_per_day)  # years per bar
+
+        self.drifts = np.array([drift for drift, _ in regimes], dtype=np.float64)
+        self.vols = np.array([vol for _, vol in regimes], dtype=np.float64)
+        self.switch_prob = 1.0 / (regime_days * self.bars_per_day)
+        # AR(1) log-volatility factor x with stationary std vol_of_vol
+        self.phi = 0.5 ** (1.0 / (vol_half_life_days * self.bars_per_day))
+        self.vol_of_vol = vol_of_vol
+        self.eta_scale = vol_of_vol * np.sqrt(1.0 - self.phi ** 2)
+        self.spread_bps = spread_bps
+        self.base_volume = base_volume
+
+        self.initial_price = price
+        self.reset()
+
+    def reset(self):
+        """Back to bar 0 with fresh generators, so the same bars come out again."""
+        seeds = np.random.SeedSequence(self.seed).spawn(len(_STREAMS))
+        self._rng = {name: np.random.default_rng(seq) for name, seq in zip(_STREAMS, seeds)}
+        self.position = 0
+        self._regime = 0
+        self._vol_state = np.zeros(1)  # last value of the log-volatility factor
+        self._log_price = np.log(self.initial_price)
+        self._close = self.initial_price
+
+    def timestamps(self, first, n):
+        """Bar times of bars first .. first + n - 1: weekdays, session slots at `freq`."""
+        bar = np.arange(first, first + n, dtype=np.int64)
+        days = np.busday_offset(self.start_day, bar // self.bars_per_day, roll="forward")
+        if n and days[-1] >= LAST_DAY:
+            raise ValueError(f"Bar {first + n - 1} would fall on {days[-1]}, past the last datetime64[ns] day; "
+                             f"use a shorter freq (more bars per day) or an earlier start")
+        times = days.astype("datetime64[ns]") + np.timedelta64(self.session_open.value, "ns")
+        times += (bar % self.bars_per_day) * np.timedelta64(self.freq.value, "ns")
+        return pd.DatetimeIndex(times, name="time")
+
+    def next_bars(self, n):
+        """
+        The next n bars as arrays: time, open/high/low/close (mid), volume, spread and regime.
+        """
+        rng = self._rng
+        # Regime chain: at each switch move 1..K-1 regimes ahead, so it always changes
+        k = len(self.drifts)
+        switches = rng["regime"].random(n) < self.switch_prob
+        jumps = rng["jump"].integers(1, k, size=n) if k > 1 else np.zeros(n, dtype=np.int64)
+        regime = (self._regime + np.cumsum(np.where(switches, jumps, 0))) % k
+
+        # x_t = phi * x_{t-1} + eta_t, carried across chunks through the filter state
+        eta = self.eta_scale * rng["vol"].standard_normal(n)
+        x, _ = lfilter([1.0], [1.0, -self.phi], eta, zi=self._vol_state * self.phi)
+        self._vol_state = x[-1:]
+        # exp(x - s^2) keeps the mean variance at the regime's
+        vol = self.vols[regime] * np.exp(x - self.vol_of_vol ** 2)
+        sigma = vol * np.sqrt(self.dt)
+
+        z = rng["shock"].standard_normal(n)
+        log_returns = (self.drifts[regime] - 0.5 * vol ** 2) * self.dt + sigma * z
+        # Summed from the carried log price in one sequence, so chunk boundaries do not change rounding
+        log_close = np.cumsum(np.concatenate(([self._log_price], log_returns)))[1:]
+        close = np.exp(log_close)
+
+        prev_close = np.concatenate(([self._close], close[:-1]))
+        open_ = prev_close * np.exp(0.1 * sigma * rng["gap"].standard_normal(n))
+        high = np.maximum(open_, close) * np.exp(0.5 * sigma * np.abs(rng["high"].standard_normal(n)))
+        low = np.minimum(open_, close) * np.exp(-0.5 * sigma * np.abs(rng["low"].standard_normal(n)))
+        # Busier bars on bigger moves
+        volume = np.rint(self.base_volume * np.exp(0.4 * rng["volume"].standard_normal(n)) * (0.5 + np.abs(z)))
+        spread = close * self.spread_bps * 1e-4 * np.exp(x) * (1.0 + 0.25 * np.abs(rng["spread"].standard_normal(n)))
+
+        bars = {
+            "time": self.timestamps(self.position, n),
+            "open": open_, "high": high, "low": low, "close": close,
+            "volume": volume.astype(np.int64), "spread": spread, "regime": regime,
+        }
+        self.position += n
+        self._regime = int(regime[-1])
+        self._log_price = log_close[-1]
+        self._close = close[-1]
+        return bars
+
+    def chunks(self, n_bars, chunk_rows=1_000_000):
+        """Yield next_bars() dicts of at most chunk_rows bars until n_bars have been produced."""
+        self.timestamps(self.position + n_bars - 1, 1)  # fail before writing anything if out of range
+        remaining = n_bars
+        while remaining > 0:
+            n = min(chunk_rows, remaining)
+            remaining -= n
+            yield self.next_bars(n)
+
+
+def ohlcv_frame(bars):
+    """The CSV schema of _read_ohlcv_csv: Date, Open, High, Low, Close, Volume."""
+    daily = (bars["time"].normalize() == bars["time"]).all()
+    return pd.DataFrame({
+        "Date": bars["time"].strftime("%Y-%m-%d" if daily else "%Y-%m-%d %H:%M:%S"),
+        "Open": bars["open"],
+        "High": bars["high"],
+        "Low": bars["low"],
+        "Close": bars["close"],
+        "Volume": bars["volume"],
+    })
+
+
+def bid_ask_frame(bars, float_dtype=np.float32):
+    """The combined bid/ask schema of perform_ops._combine_bid_ask, indexed by time."""
+    half = bars["spread"] / 2
+    columns = {}
+    for suffix, sign in (("_bid", -1.0), ("_ask", 1.0)):
+        for short, name in (("o", "open"), ("h", "high"), ("l", "low"), ("c", "close")):
+            columns[short + suffix] = (bars[name] + sign * half).astype(float_dtype)
+        columns["volume" + suffix] = bars["volume"].astype(np.int32)
+        columns["complete" + suffix] = np.ones(len(half), dtype=bool)
+    for name in ("open", "high", "low", "close"):
+        columns[name] = bars[name].astype(float_dtype)
+    columns["spread"] = bars["spread"].astype(float_dtype)
+    return pd.DataFrame(columns, index=bars["time"], copy=False)
+
+
+def write_csv(market, path, n_bars, chunk_rows=1_000_000, float_format="%.5f"):
+    """Stream n_bars bars to an OHLCV CSV, one chunk in memory at a time. Returns rows written."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rows = 0
+    t0 = time.perf_counter()
+    with open(path, "w", newline="") as f:
+        for bars in market.chunks(n_bars, chunk_rows):
+            ohlcv_frame(bars).to_csv(f, header=rows == 0, index=False, float_format=float_format)
+            rows += len(bars["close"])
+            logger.info(f"Wrote {rows}/{n_bars} bars to {path} ({rows / (time.perf_counter() - t0):.0f} rows/s)")
+    return rows
+
+
+def write_bar_store(market, n_bars, instrument="SYNTH_USD", granularity="M5", root="stock-data/bars",
+                    chunk_rows=1_000_000):
+    """Append n_bars bid/ask bars to a BarStore, chunk by chunk. Returns the store."""
+    store = BarStore(instrument, granularity, root=root)
+    if len(store):
+        raise ValueError(f"{store.path} already holds {len(store)} bars; use an empty root or instrument")
+    for bars in market.chunks(n_bars, chunk_rows):
+        times = bars["time"]
+        store.append(bid_ask_frame(bars), start=times[0], end=times[-1] + market.freq)
+    return store
@@ -1,9 +1,9 @@
 import numpy as np
 import pandas as pd
 import torch
-import matplotlib.pyplot as plt
 import os
 import datetime
+import json
 from collections import deque
 import random
 
@@ -11,11 +11,11 @@ from src.model.trading_environment import TradingEnvironment
 from src.model.replay_buffer import ReplayBuffer
 
 # Import TD3 implementation
-from src.model.td3 import TD3
+from src.model.td3 import TD3, device
 
 from src.utils.logger import setup_logging
-from src.data.perform_ops import PerformDataOperations
-from src.data.preprocess import PreprocessData
+from src.utils.profiling import PeriodicProfiler, PhaseTimer
+from src.data.dr import DimensionReducer
 logger = setup_logging()
 
 
@@ -74,11 +74,23 @@ def train_td3_for_trading(train_df,
                           policy_freq=2,
                           exploration_noise=0.1,
                           eval_freq=10,
-                          save_dir='results'
+                          save_dir='results',
+                          n_components=None,
+                          reduce_method='incremental',
+                          profiler=None,
+                          profile_every=1000,
+                          profile_steps=20
     ):
 
     set_seeds()
 
+    # Phase breakdown of the run, written to {save_dir}/profile.json; see src/utils/profiling.py.
+    # As in run_csv, spans only synchronize the GPU when a profiler was asked for.
+    timer = PhaseTimer(sync=torch.cuda.synchronize if profiler and device.type == 'cuda' else None)
+    periodic = None
+    if profiler:
+        periodic = PeriodicProfiler(profiler, f"{save_dir}/profiles", profile_every, profile_steps)
+
     if not os.path.exists(save_dir):
         os.makedirs(save_dir)
 
@@ -97,12 +109,19 @@ def train_td3_for_trading(train_df,
 
     logger.info(f"Data split - Train: {len(train_data)}, Validation: {len(val_data)}, Test: {len(test_data)}")
 
+    reducer = None
+    if n_components:
+        reducer = DimensionReducer(method=reduce_method, n_components=n_components).fit(train_data)
+        reducer.save(f"{save_dir}/td3_dim_reducer")
+        logger.info(f"Observations reduced to {n_components} components per bar")
+
     train_env = TradingEnvironment(
         train_data,
         lookback_window=lookback_window,
         transaction_cost=transaction_cost,
         max_position=max_position,
-        frame_stack=frame_stack
+        frame_stack=frame_stack,
+        reducer=reducer
     )
 
     val_env = TradingEnvironment(
@@ -110,7 +129,8 @@ def train_td3_for_trading(train_df,
         lookback_window=lookback_window,
         transaction_cost=transaction_cost,
         max_position=max_position,
-        frame_stack=frame_stack
+        frame_stack=frame_stack,
+        reducer=reducer
     )
 
     test_env = TradingEnvironment(
@@ -118,7 +138,8 @@ def train_td3_for_trading(train_df,
         lookback_window=lookback_window,
         transaction_cost=transaction_cost,
         max_position=max_position,
-        frame_stack=frame_stack
+        frame_stack=frame_stack,
+        reducer=reducer
     )
 
     logger.info("Train, Val, Test environment created successfully")
@@ -139,6 +160,7 @@ def train_td3_for_trading(train_df,
         noise_clip=noise_clip,
         policy_freq=policy_freq
     )
+    policy.timer = timer
 
     replay_buffer = ReplayBuffer(state_dim, action_dim)
 
@@ -166,45 +188,57 @@ def train_td3_for_trading(train_df,
         while not done and episode_timesteps < max_timesteps:
             episode_timesteps += 1
             total_timesteps += 1
-
-            if total_timesteps < 1000:
-                action = np.random.uniform(-max_action, max_action, size=(action_dim,))
-                logger.debug(f"Episode {episode}, timestep {episode_timesteps}: Random action selected.")
-
-            else:
-                action = policy.select_action(np.array(state))
-                action = action + np.random.normal(0, exploration_noise, size=action_dim)
-                action = np.clip(action, -max_action, max_action)
-                logger.debug(f"Episode {episode}, timestep {episode_timesteps}: Policy action with exploration selected.")
-
-            next_state, reward, done, info = train_env.step(action[0])
+            if periodic is not None:
+                periodic.step()
+
+            with timer.phase("select_action"):
+                if total_timesteps < 1000:
+                    action = np.random.uniform(-max_action, max_action, size=(action_dim,))
+                    logger.debug("Episode %d, timestep %d: Random action selected.", episode, episode_timesteps)
+
+                else:
+                    action = policy.select_action(np.array(state))
+                    action = action + np.random.normal(0, exploration_noise, size=action_dim)
+                    action = np.clip(action, -max_action, max_action)
+                    logger.debug("Episode %d, timestep %d: Policy action with exploration selected.", episode, episode_timesteps)
+
+            with timer.phase("env_step"):
+                next_state, reward, done, info = train_env.step(action[0])
             episode_reward += reward
 
-            logger.info(
-                f"Episode {episode} Summary:\n"
-                f"  Portfolio Value: {info['portfolio_value']:.2f}\n"
-                f"  Max Portfolio Value: {info['max_portfolio_value']:.2f}\n"
-                f"  Position: {info['position']}\n"
-                f"  Cash: {info['cash']}\n"
-                # f"  Transaction Cost: {info['transaction_cost']}\n"
-                f"  Drawdown: {info['drawdown']:.4f}\n"
-                f"  Price Return: {info['price_return']:.4f}\n"
-                f"  Reward: {info['reward']:.4f}\n"
-                f"  Normalized Reward: {info['normalized_reward']:.4f}\n"
+            # Per-step detail: DEBUG with lazy %-args, so sampled-out steps cost no formatting
+            logger.debug(
+                "Episode %d Summary:\n"
+                "  Portfolio Value: %.2f\n"
+                "  Max Portfolio Value: %.2f\n"
+                "  Position: %s\n"
+                "  Cash: %s\n"
+                "  Drawdown: %.4f\n"
+                "  Price Return: %.4f\n"
+                "  Reward: %.4f\n"
+                "  Normalized Reward: %.4f\n",
+                episode, info['portfolio_value'], info['max_portfolio_value'], info['position'], info['cash'],
+                info['drawdown'], info['price_return'], info['reward'], info['normalized_reward'],
             )
 
-            replay_buffer.add(state, action, next_state, reward, done)
+            with timer.phase("replay_add"):
+                replay_buffer.add(state, action, next_state, reward, done)
 
             state = next_state
 
             if total_timesteps >= 50000:
-                policy.train(replay_buffer, batch_size)
-                logger.debug(f"Training policy at timestep {total_timesteps}")
+                with timer.phase("train"):
+                    policy.train(replay_buffer, batch_size)
+                timer.count("train_updates")
+                logger.debug("Training policy at timestep %d", total_timesteps)
 
         episode_rewards.append(episode_reward)
+        timer.count("episodes")
+        timer.count("env_steps", episode_timesteps)
 
         if episode % eval_freq == 0:
-            avg_portfolio, avg_sharpe, avg_drawdown, avg_std_dev, last_portfolio_value, last_sharpe_ratio, last_max_drawdown, last_std_dev  = evaluate_policy(policy, val_env)
+            with timer.phase("evaluation"):
+                avg_portfolio, avg_sharpe, avg_drawdown, avg_std_dev, last_portfolio_value, last_sharpe_ratio, last_max_drawdown, last_std_dev  = evaluate_policy(policy, val_env)
             val_returns.append(avg_portfolio - 1.0)  # Convert to return
             val_sharpes.append(avg_sharpe)
             val_drawdowns.append(avg_drawdown)
@@ -217,16 +251,24 @@ def train_td3_for_trading(train_df,
 
             if avg_sharpe > best_val_sharpe:
                 best_val_sharpe = avg_sharpe
-                policy.save(f"{save_dir}/td3_best_model")
+                with timer.phase("checkpoint"):
+                    policy.save(f"{save_dir}/td3_best_model")
                 logger.info(f"New best model saved with Sharpe ratio: {best_val_sharpe:.4f}")
 
         if episode % 100 == 0:
-            policy.save(f"{save_dir}/td3_checkpoint_ep{episode}")
+            with timer.phase("checkpoint"):
+                policy.save(f"{save_dir}/td3_checkpoint_ep{episode}")
             logger.info(f"Checkpoint saved at episode {episode}")
 
+    if periodic is not None:
+        periodic.stop()
+
     logger.info("Training complete. Saving final model and evaluating on test set.")
 
-    policy.save(f"{save_dir}/td3_final_model")
+    with timer.phase("checkpoint"):
+        policy.save(f"{save_dir}/td3_final_model")
+
+    import matplotlib.pyplot as plt  # deferred: only the end-of-training plots need it
 
     plt.figure(figsize=(15, 10))
 
@@ -256,11 +298,12 @@ def train_td3_for_trading(train_df,
     test_actions = []
     test_positions = []
 
-    while not test_done:
-        test_action = policy.select_action(np.array(test_state))
-        test_actions.append(test_action[0])
-        test_state, _, test_done, _ = test_env.step(test_action[0])
-        test_positions.append(test_env.current_position)
+    with timer.phase("test"):
+        while not test_done:
+            test_action = policy.select_action(np.array(test_state))
+            test_actions.append(test_action[0])
+            test_state, _, test_done, _ = test_env.step(test_action[0])
+            test_positions.append(test_env.current_position)
 
     test_returns = np.array(test_env.portfolio_history[1:]) / np.array(test_env.portfolio_history[:-1]) - 1
     test_sharpe = np.mean(test_returns) / (np.std(test_returns) + 1e-8) * np.sqrt(252)
@@ -296,11 +339,23 @@ def train_td3_for_trading(train_df,
 
     test_env.render()
 
+    profile = timer.summary()
+    if periodic is not None:
+        profile["captures"] = periodic.captures
+    with open(f"{save_dir}/profile.json", "w") as f:
+        json.dump(profile, f, indent=2)
+    for line in timer.table():
+        logger.info(f"profile | {line}")
+
     logger.info("TD3 training process completed successfully.")
 
     return policy
 
 def main():
+    # The data pipeline (API client, Influx, preprocessing) is only needed for a full run
+    from src.data.perform_ops import PerformDataOperations
+    from src.data.preprocess import PreprocessData
+
     logger.info("----- Starting data fetch stage -----")
 
     pdo = PerformDataOperations(
@@ -0,0 +1,183 @@
+import logging
+from collections import deque
+from functools import reduce
+
+import numpy as np
+
+logger = logging.getLogger('td3-stock-trading')
+
+
+def align_frames(frames, time_column='time'):
+    """
+    Restrict every instrument's frame to the timestamps all of them share, in time order.
+    `frames` maps symbol -> DataFrame with a `time_column`; returns the same mapping, aligned.
+    """
+    times = [np.asarray(df[time_column].to_numpy()) for df in frames.values()]
+    common = reduce(np.intersect1d, times)
+    aligned = {}
+    for (symbol, df), values in zip(frames.items(), times):
+        part = df[np.isin(values, common)].sort_values(time_column)
+        aligned[symbol] = part.drop_duplicates(time_column).reset_index(drop=True)
+    dropped = max(len(df) for df in frames.values()) - len(common)
+    if dropped:
+        logger.info(f"Aligned {len(frames)} instruments on {len(common)} shared bars ({dropped} unshared dropped)")
+    return aligned
+
+
+class PortfolioEnvironment:
+    """
+    N instruments on one time index with a position per instrument. Prices and features are
+    (time, instrument) arrays, so cash, portfolio value, costs and drawdown are updated with
+    vector operations; the action is an N-vector in [-1, 1] and one TD3 policy with
+    action_dim=N trades the whole universe. With a single instrument it reproduces
+    TradingEnvironment's accounting and reward.
+    """
+
+    def __init__(self,
+                 frames,
+                 lookback_window=60,
+                 transaction_cost=0.001,
+                 max_position=1.0,
+                 frame_stack=4,
+                 reducer=None,
+                 price_column='close'
+        ):
+
+        frames = align_frames(frames)
+        self.symbols = list(frames)
+        self.num_assets = len(self.symbols)
+        self.lookback_window = lookback_window
+        self.transaction_cost = transaction_cost
+        self.max_position = max_position
+        self.frame_stack = frame_stack
+
+        first = frames[self.symbols[0]]
+        self.reducer = reducer
+        if reducer is not None and reducer.feature_columns is not None:
+            self.feature_columns = list(reducer.feature_columns)
+        else:
+            self.feature_columns = [col for col in first.columns if col != 'time']
+
+        # (time, asset) prices and (time, asset, feature) observations, built once
+        self.prices = np.stack([frames[s][price_column].to_numpy(dtype=np.float64) for s in self.symbols], axis=1)
+        features = np.stack([frames[s][self.feature_columns].to_numpy(dtype=np.float64) for s in self.symbols], axis=1)
+        if reducer is not None and reducer.method != 'select':
+            steps, assets, _ = features.shape
+            features = reducer.project(features.reshape(steps * assets, -1)).reshape(steps, assets, -1)
+        self.features = features
+        self.num_features = features.shape[2]
+        self.time = first['time'].to_numpy() if 'time' in first.columns else None
+
+        self.end_idx = len(self.prices) - 1
+        self.reward_mean = 0.0
+        self.reward_std = 1.0
+        self.reward_alpha = 0.01
+        self.reset()
+
+    def get_state_dim(self):
+        # +num_assets for the current positions
+        return self.num_assets * self.num_features * self.lookback_window * self.frame_stack + self.num_assets
+
+    def get_action_dim(self):
+        return self.num_assets
+
+    def reset(self):
+        self.current_idx = self.lookback_window
+        self.current_position = np.zeros(self.num_assets)
+        self.cash = 1.0
+        self.portfolio_value = 1.0
+        self.portfolio_history = [1.0]
+        self.max_portfolio_value = 1.0
+        self.last_action = np.zeros(self.num_assets)
+        self.max_drawdown = 0.0
+
+        self.trade_count = 0
+
+        self.state_buffer = deque(maxlen=self.frame_stack)
+        for _ in range(self.frame_stack):
+            self.state_buffer.append(np.zeros(self.num_assets * self.num_features * self.lookback_window))
+
+        return self._get_observation()
+
+    def _get_observation(self):
+        window = self.features[self.current_idx - self.lookback_window:self.current_idx]
+        self.state_buffer.append(window.ravel())
+        return np.concatenate(list(self.state_buffer) + [self.current_position])
+
+    def step(self, action):
+
+        action = np.clip(np.asarray(action, dtype=np.float64).reshape(self.num_assets), -1, 1)
+
+        target_position = action * self.max_position
+        position_change = target_position - self.current_position
+
+        current_price = self.prices[self.current_idx]
+
+        costs = np.abs(position_change) * self.transaction_cost * current_price
+        transaction_cost = costs.sum()
+
+        self.cash -= position_change @ current_price + transaction_cost
+        self.current_position = target_position
+        self.trade_count += int(np.count_nonzero(np.abs(position_change) > 1e-8))
+
+        self.current_idx += 1
+
+        done = self.current_idx >= self.end_idx or self.portfolio_value < 0.25
+
+        next_price = self.prices[self.current_idx]
+
+        self.portfolio_value = self.cash + self.current_position @ next_price
+        self.portfolio_history.append(self.portfolio_value)
+
+        self.max_portfolio_value = max(self.max_portfolio_value, self.portfolio_value)
+
+        drawdown = (self.max_portfolio_value - self.portfolio_value) / self.max_portfolio_value
+        self.max_drawdown = max(self.max_drawdown, drawdown)
+
+        price_return = next_price / current_price - 1
+        position_return = self.current_position @ price_return
+
+        base_reward = position_return - transaction_cost
+
+        drawdown_penalty = drawdown * drawdown * 2.0
+
+        # Per-asset penalties are averaged, so their scale does not grow with the universe
+        stability_penalty = np.abs(self.last_action - action).mean() * 0.05
+        change_penalty = (np.abs(position_change) ** 1.5).mean() * 0.01
+        trade_penalty = np.abs(position_change).mean() * 0.001
+        reversal = self.last_action * action
+        reversal_penalty = np.where(reversal < 0, np.abs(reversal), 0.0).mean() * 0.1
+
+        reward = (base_reward * 0.4
+                  - drawdown_penalty * 0.2
+                  - change_penalty * 0.1
+                  - stability_penalty * 0.1
+                  - trade_penalty * 0.1
+                  - reversal_penalty * 0.1)
+
+        self.last_action = action
+
+        next_observation = self._get_observation()
+
+        self.reward_mean = (1 - self.reward_alpha) * self.reward_mean + self.reward_alpha * reward
+        self.reward_std = (1 - self.reward_alpha) * self.reward_std + self.reward_alpha * (
+                    reward - self.reward_mean) ** 2
+
+        normalized_reward = (reward - self.reward_mean) / (np.sqrt(self.reward_std) + 1e-8)
+
+        normalized_reward = np.clip(normalized_reward, -10, 10)
+
+        info = {
+            'portfolio_value': self.portfolio_value,
+            'max_portfolio_value': self.max_portfolio_value,
+            'position': self.current_position,
+            'cash': self.cash,
+            'transaction_cost': transaction_cost,
+            'asset_costs': costs,
+            'drawdown': drawdown,
+            'price_return': price_return,
+            'reward': reward,
+            'normalized_reward': normalized_reward,
+        }
+
+        return next_observation, normalized_reward, done, info
@@ -0,0 +1,130 @@
+"""
+Serving bundle: everything needed to turn raw feature rows into an action without the training
+pipeline. It holds the trained Actor weights, the min-max scaler and median fill values fitted on
+the training split, the feature column order, the window/frame-stack shape and the optional
+DimensionReducer. run_csv writes one next to the checkpoints; the backend loads it once and keeps
+the Actor warm.
+"""
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import torch
+
+from src.data.dr import DimensionReducer
+from src.model.td3 import Actor
+
+BUNDLE_FILE = "bundle.json"
+ACTOR_FILE = "actor.pt"
+REDUCER_FILE = "dim_reducer.npz"
+
+
+def save_bundle(path, actor, state_dim, action_dim, max_action, feature_columns, scaler,
+                fill_values, lookback_window, frame_stack, reducer=None):
+    """
+    Write a bundle directory. It is assembled next to `path` and swapped in by rename, so a
+    server watching `path` never loads a half-written bundle.
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".bundle-", dir=parent)
+    try:
+        torch.save({name: tensor.detach().cpu() for name, tensor in actor.state_dict().items()},
+                   os.path.join(tmp_dir, ACTOR_FILE))
+        if reducer is not None:
+            reducer.save(os.path.join(tmp_dir, REDUCER_FILE))
+        meta = {
+            "state_dim": int(state_dim),
+            "action_dim": int(action_dim),
+            "max_action": float(max_action),
+            "feature_columns": list(feature_columns),
+            "scaler": {feature: [float(lo), float(hi)] for feature, (lo, hi) in scaler.items()},
+            "fill_values": {col: float(fill_values[col]) for col in feature_columns},
+            "lookback_window": int(lookback_window),
+            "frame_stack": int(frame_stack),
+            "reducer": REDUCER_FILE if reducer is not None else None,
+        }
+        with open(os.path.join(tmp_dir, BUNDLE_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+        replace_dir(tmp_dir, path)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def replace_dir(src, dst):
+    """Move directory src to dst, replacing any existing dst with two renames."""
+    old = None
+    if os.path.exists(dst):
+        old = tempfile.mkdtemp(prefix=".old-", dir=os.path.dirname(os.path.abspath(dst)))
+        os.rmdir(old)
+        os.replace(dst, old)
+    os.replace(src, dst)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class ServingBundle:
+    def __init__(self, meta, actor, reducer=None):
+        self.meta = meta
+        self.actor = actor
+        self.reducer = reducer
+        self.state_dim = meta["state_dim"]
+        self.feature_columns = meta["feature_columns"]
+        self.lookback_window = meta["lookback_window"]
+        self.frame_stack = meta["frame_stack"]
+        # Frame k of the stacked state is the window ending k bars before the latest one
+        self.window_rows = self.lookback_window + self.frame_stack - 1
+
+        # Column-aligned scaling arrays: columns outside the scaler pass through (lo=0, span=1)
+        lo = np.zeros(len(self.feature_columns))
+        span = np.ones(len(self.feature_columns))
+        self.constant = np.zeros(len(self.feature_columns), dtype=bool)
+        for i, col in enumerate(self.feature_columns):
+            if col in meta["scaler"]:
+                low, high = meta["scaler"][col]
+                lo[i], span[i] = low, high - low
+                self.constant[i] = low == high
+        span[self.constant] = 1.0
+        self.lo, self.span = lo, span
+        self.fill = np.array([meta["fill_values"][col] for col in self.feature_columns])
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, BUNDLE_FILE)) as f:
+            meta = json.load(f)
+        actor = Actor(meta["state_dim"], meta["action_dim"], meta["max_action"])
+        actor.load_state_dict(torch.load(os.path.join(path, ACTOR_FILE), map_location="cpu"))
+        actor.eval()
+        reducer = DimensionReducer.load(os.path.join(path, meta["reducer"])) if meta.get("reducer") else None
+        return cls(meta, actor, reducer)
+
+    def state(self, rows, position=0.0):
+        """
+        Observation for the latest of `rows`: the last window_rows raw feature rows, oldest first,
+        each a list in feature_columns order or a {column: value} dict.
+        """
+        if rows and isinstance(rows[0], dict):
+            rows = [[row.get(col, np.nan) for col in self.feature_columns] for row in rows]
+        features = np.asarray(rows, dtype=np.float64)
+        if features.ndim != 2 or features.shape[1] != len(self.feature_columns):
+            raise ValueError(f"expected rows of {len(self.feature_columns)} features")
+        if len(features) < self.window_rows:
+            raise ValueError(f"need at least {self.window_rows} rows, got {len(features)}")
+        features = (features[-self.window_rows:] - self.lo) / self.span
+        features[:, self.constant] = 0.0
+        features = np.where(np.isnan(features), self.fill, features)
+        if self.reducer is not None and self.reducer.method != "select":
+            features = self.reducer.project(features)
+        frames = [features[k:k + self.lookback_window].ravel() for k in range(self.frame_stack)]
+        return np.concatenate(frames + [np.array([position], dtype=np.float64)])
+
+    def predict(self, states):
+        """Actions for a (batch, state_dim) array of observations."""
+        states = np.asarray(states, dtype=np.float32)
+        if states.ndim != 2 or states.shape[1] != self.state_dim:
+            raise ValueError(f"expected states of dimension {self.state_dim}")
+        with torch.inference_mode():
+            return self.actor(torch.from_numpy(states)).numpy()
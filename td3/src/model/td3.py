@@ -4,6 +4,8 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+from src.utils.profiling import PhaseTimer
+
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 
@@ -91,6 +93,8 @@ class TD3(object):
         self.policy_freq = policy_freq
 
         self.total_it = 0
+        # Replaced by the training loop to break train() down into phases; disabled by default
+        self.timer = PhaseTimer(enabled=False)
 
     def select_action(self, state):
         state = torch.FloatTensor(state.reshape(1, -1)).to(device)
@@ -98,53 +102,58 @@ class TD3(object):
 
     def train(self, replay_buffer, batch_size=256):
         self.total_it += 1
+        timer = self.timer
 
         # Sample replay buffer
-        state, action, next_state, reward, not_done = replay_buffer.sample(batch_size)
+        with timer.phase("td3.sample"):
+            state, action, next_state, reward, not_done = replay_buffer.sample(batch_size)
 
-        with torch.no_grad():
-            # Select action according to policy and add clipped noise
-            noise = (
-                    torch.randn_like(action) * self.policy_noise
-            ).clamp(-self.noise_clip, self.noise_clip)
+        with timer.phase("td3.critic"):
+            with torch.no_grad():
+                # Select action according to policy and add clipped noise
+                noise = (
+                        torch.randn_like(action) * self.policy_noise
+                ).clamp(-self.noise_clip, self.noise_clip)
 
-            next_action = (
-                    self.actor_target(next_state) + noise
-            ).clamp(-self.max_action, self.max_action)
+                next_action = (
+                        self.actor_target(next_state) + noise
+                ).clamp(-self.max_action, self.max_action)
 
-            # Compute the target Q value
-            target_Q1, target_Q2 = self.critic_target(next_state, next_action)
-            target_Q = torch.min(target_Q1, target_Q2)
-            target_Q = reward + not_done * self.discount * target_Q
+                # Compute the target Q value
+                target_Q1, target_Q2 = self.critic_target(next_state, next_action)
+                target_Q = torch.min(target_Q1, target_Q2)
+                target_Q = reward + not_done * self.discount * target_Q
 
-        # Get current Q estimates
-        current_Q1, current_Q2 = self.critic(state, action)
+            # Get current Q estimates
+            current_Q1, current_Q2 = self.critic(state, action)
 
-        # Compute critic loss
-        critic_loss = F.mse_loss(current_Q1, target_Q) + F.mse_loss(current_Q2, target_Q)
+            # Compute critic loss
+            critic_loss = F.mse_loss(current_Q1, target_Q) + F.mse_loss(current_Q2, target_Q)
 
-        # Optimize the critic
-        self.critic_optimizer.zero_grad()
-        critic_loss.backward()
-        self.critic_optimizer.step()
+            # Optimize the critic
+            self.critic_optimizer.zero_grad()
+            critic_loss.backward()
+            self.critic_optimizer.step()
 
         # Delayed policy updates
         if self.total_it % self.policy_freq == 0:
 
-            # Compute actor losse
-            actor_loss = -self.critic.Q1(state, self.actor(state)).mean()
+            with timer.phase("td3.actor"):
+                # Compute actor losse
+                actor_loss = -self.critic.Q1(state, self.actor(state)).mean()
 
-            # Optimize the actor
-            self.actor_optimizer.zero_grad()
-            actor_loss.backward()
-            self.actor_optimizer.step()
+                # Optimize the actor
+                self.actor_optimizer.zero_grad()
+                actor_loss.backward()
+                self.actor_optimizer.step()
 
-            # Update the frozen target models
-            for param, target_param in zip(self.critic.parameters(), self.critic_target.parameters()):
-                target_param.data.copy_(self.tau * param.data + (1 - self.tau) * target_param.data)
+            with timer.phase("td3.target"):
+                # Update the frozen target models
+                for param, target_param in zip(self.critic.parameters(), self.critic_target.parameters()):
+                    target_param.data.copy_(self.tau * param.data + (1 - self.tau) * target_param.data)
 
-            for param, target_param in zip(self.actor.parameters(), self.actor_target.parameters()):
-                target_param.data.copy_(self.tau * param.data + (1 - self.tau) * target_param.data)
+                for param, target_param in zip(self.actor.parameters(), self.actor_target.parameters()):
+                    target_param.data.copy_(self.tau * param.data + (1 - self.tau) * target_param.data)
 
     def save(self, filename):
         torch.save(self.critic.state_dict(), filename + "_critic")
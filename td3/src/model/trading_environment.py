@@ -1,8 +1,6 @@
 import logging
 
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 
 from collections import deque
 
@@ -14,7 +12,8 @@ class TradingEnvironment:
                  lookback_window=60,
                  transaction_cost=0.001,
                  max_position=1.0,
-                 frame_stack=4
+                 frame_stack=4,
+                 reducer=None
         ):
 
         self.data = data
@@ -23,8 +22,18 @@ class TradingEnvironment:
         self.max_position = max_position
         self.frame_stack = frame_stack
 
-        self.feature_columns = [col for col in data.columns if col != 'time']
-        self.num_features = len(self.feature_columns)
+        self.reducer = reducer
+        if reducer is not None and reducer.feature_columns is not None:
+            self.feature_columns = list(reducer.feature_columns)
+        else:
+            self.feature_columns = [col for col in data.columns if col != 'time']
+
+        # Observation rows are built once: raw features, or each bar projected to k components
+        # by a fitted DimensionReducer, so windows are plain slices of this matrix
+        self.features = data[self.feature_columns].to_numpy(dtype=np.float64)
+        if reducer is not None and reducer.method != 'select':
+            self.features = reducer.project(self.features)
+        self.num_features = self.features.shape[1]
 
         self.current_idx = lookback_window
         self.end_idx = len(data) - 1
@@ -69,9 +78,7 @@ class TradingEnvironment:
         return self._get_observation()
 
     def _get_observation(self):
-        lookback_data = self.data.iloc[self.current_idx - self.lookback_window:self.current_idx]
-
-        features = lookback_data[self.feature_columns].values.flatten()
+        features = self.features[self.current_idx - self.lookback_window:self.current_idx].flatten()
 
         self.state_buffer.append(features)
 
@@ -157,6 +164,8 @@ class TradingEnvironment:
         return next_observation, normalized_reward, done, info
 
     def render(self, mode='human'):
+        import matplotlib.pyplot as plt  # only needed for plotting; keeps the import off the training path
+
         plt.figure(figsize=(12, 8))
         plt.subplot(2, 1, 1)
         plt.plot(self.portfolio_history)
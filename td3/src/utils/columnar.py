@@ -0,0 +1,112 @@
+"""
+Columnar binary encoding of a results payload (.td3c, media type application/vnd.td3.columnar).
+
+    "TD3C" | uint32 LE header length | UTF-8 JSON header | padding to 8 bytes | column data
+
+Every numeric array of the payload is stored as little-endian float64 at an 8-byte aligned
+offset (relative to the start of the column data), so a browser can wrap each column in a
+Float64Array over the response buffer without parsing anything. Lists of row dicts (e.g. ohlc) are split into one column per key; their date
+strings become epoch-millisecond columns. The header keeps everything else (metrics, symbols)
+plus each column's offset, length and shape.
+"""
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b"TD3C"
+VERSION = 1
+MEDIA_TYPE = "application/vnd.td3.columnar"
+FILE_SUFFIX = ".td3c"
+
+_DATE_FORMATS = {"date": "%Y-%m-%d", "datetime": "%Y-%m-%d %H:%M:%S"}
+
+
+def _aligned(size):
+    return -(-size // 8) * 8
+
+
+def _numeric_array(values):
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+
+
+def _date_column(values):
+    stamps = np.array(values, dtype="datetime64[ms]")
+    fmt = "date" if all(len(value) == 10 for value in values) else "datetime"
+    return stamps.astype(np.int64).astype(np.float64), fmt
+
+
+def encode(payload):
+    """bytes of `payload` in the columnar format."""
+    fields, columns = {}, []
+    for key, value in payload.items():
+        if isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
+            for name in value[0]:
+                column = [row.get(name) for row in value]
+                if name == "date":
+                    array, fmt = _date_column(column)
+                    columns.append((f"{key}.{name}", array, {"rows": key, "date": fmt}))
+                else:
+                    columns.append((f"{key}.{name}", np.asarray(column, dtype=np.float64), {"rows": key}))
+        elif isinstance(value, list) and (array := _numeric_array(value)) is not None:
+            columns.append((key, array, {}))
+        else:
+            fields[key] = value
+
+    header = {"version": VERSION, "fields": fields, "columns": []}
+    offset = 0
+    for name, array, extra in columns:
+        header["columns"].append({"name": name, "offset": offset, "shape": list(array.shape), **extra})
+        offset += _aligned(array.nbytes)
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    data_start = _aligned(8 + len(header_bytes))
+    out = bytearray(data_start + offset)
+    out[:4] = MAGIC
+    out[4:8] = struct.pack("<I", len(header_bytes))
+    out[8:8 + len(header_bytes)] = header_bytes
+    for column, (_, array, _) in zip(header["columns"], columns):
+        raw = np.ascontiguousarray(array, dtype="<f8").tobytes()
+        start = data_start + column["offset"]
+        out[start:start + len(raw)] = raw
+    return bytes(out)
+
+
+def decode(data):
+    """The payload dict back from encoded bytes (the inverse of encode)."""
+    if data[:4] != MAGIC:
+        raise ValueError("not a columnar results file")
+    (header_length,) = struct.unpack("<I", data[4:8])
+    header = json.loads(data[8:8 + header_length])
+    data_start = _aligned(8 + header_length)
+    if header["version"] != VERSION:
+        raise ValueError(f"unsupported columnar version {header['version']}")
+
+    payload = dict(header["fields"])
+    rows = {}
+    for column in header["columns"]:
+        count = int(np.prod(column["shape"]))
+        array = np.frombuffer(data, dtype="<f8", count=count, offset=data_start + column["offset"]).reshape(column["shape"])
+        if "rows" not in column:
+            payload[column["name"]] = array.tolist()
+            continue
+        key, name = column["name"].split(".", 1)
+        if "date" in column:
+            fmt = _DATE_FORMATS[column["date"]]
+            stamps = array.astype(np.int64).astype("datetime64[ms]").astype(object)
+            values = [stamp.strftime(fmt) for stamp in stamps]
+        else:
+            values = array.tolist()
+        rows.setdefault(key, {})[name] = values
+    for key, named in rows.items():
+        names = list(named)
+        payload[key] = [dict(zip(names, values)) for values in zip(*named.values())]
+    return payload
+
+
+def write(payload, path):
+    with open(path, "wb") as f:
+        f.write(encode(payload))
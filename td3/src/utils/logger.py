@@ -1,25 +1,94 @@
+import atexit
 import json
 import logging.config
+import logging.handlers
 import os
+import queue
+import time
 from pathlib import Path
 from datetime import datetime
 
+# td3/, where log-config.json lives; logs/ is created next to it whatever the CWD
+TD3_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_CONFIG = TD3_DIR / "log-config.json"
 
-def setup_logging():
-    config_file = Path("log-config.json")
+_listener = None
+
+
+class DebugSampler(logging.Filter):
+    """
+    Lets at most `per_second` DEBUG records per call site through each second; INFO and above
+    always pass. The next record let through from a throttled site says how many were dropped.
+    """
+
+    def __init__(self, per_second=20):
+        super().__init__()
+        self.per_second = per_second
+        self._sites = {}  # (pathname, lineno) -> [window start, passed in window, suppressed]
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        now = time.monotonic()
+        site = self._sites.setdefault((record.pathname, record.lineno), [now, 0, 0])
+        if now - site[0] >= 1.0:
+            site[0], site[1] = now, 0
+        if site[1] >= self.per_second:
+            site[2] += 1
+            return False
+        site[1] += 1
+        if site[2]:
+            record.msg = f"{record.msg} (+{site[2]} similar suppressed)"
+            site[2] = 0
+        return True
+
+
+def _start_queue(root, debug_per_second):
+    """Move the root handlers behind a QueueListener thread; callers only enqueue records."""
+    global _listener
+    handlers = list(root.handlers)
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    if debug_per_second:
+        queue_handler.addFilter(DebugSampler(debug_per_second))
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread (also registered with atexit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def setup_logging(config_file=None):
+    config_file = Path(config_file) if config_file else DEFAULT_CONFIG
     with open(config_file) as f:
         log_config = json.load(f)
+    # Not a dictConfig key: {"enabled": bool, "debug_per_second": int}
+    queue_config = log_config.pop("queue", {})
 
     filename = f"log-{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
 
-    log_path = Path("logs") / filename
+    log_path = config_file.parent / "logs" / filename
     os.makedirs(log_path.parent, exist_ok=True)
-    log_config['handlers']['file']['filename'] = f"logs/{filename}"
+    log_config['handlers']['file']['filename'] = str(log_path)
 
+    stop_logging()  # a second call replaces the previous listener instead of leaking it
     logging.config.dictConfig(log_config)
+    if queue_config.get("enabled", True) and os.environ.get("TD3_LOG_QUEUE", "1") != "0":
+        _start_queue(logging.getLogger(), queue_config.get("debug_per_second", 20))
 
     logger = logging.getLogger("td3-stock-trading")
     logger.info("Logging setup successful")
-    logger.info(f"Logs being saved to - log/{filename}")
+    logger.info(f"Logs being saved to - {log_path}")
 
-    return logger
\ No newline at end of file
+    return logger
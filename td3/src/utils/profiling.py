@@ -0,0 +1,195 @@
+"""
+Phase timers for training runs. A PhaseTimer keeps, per named phase, the call count, total/min/max
+time and a log2 histogram of durations, plus plain counters; summary() is JSON-ready and goes into
+the results payload. A disabled timer hands out a shared no-op span, so instrumented code costs
+next to nothing when nobody is measuring.
+
+PeriodicProfiler adds deeper captures: every `every` training steps it records `steps` steps with
+cProfile (.prof, open with snakeviz or pstats) or torch.profiler (Chrome trace .json).
+"""
+import os
+import time
+
+# Bucket i counts durations in [2**(i-1), 2**i) microseconds; bucket 0 is under 1 µs
+HISTOGRAM_BUCKETS = 40
+
+
+class _PhaseStats:
+    __slots__ = ("count", "total_ns", "min_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, ns):
+        self.count += 1
+        self.total_ns += ns
+        if self.min_ns is None or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.buckets[min((ns // 1000).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def quantile_us(self, q):
+        """Upper edge of the histogram bucket holding the q-quantile (an upper bound, within 2x)."""
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= target:
+                return min(float(2 ** i), self.max_ns / 1000)
+        return self.max_ns / 1000
+
+
+class _Span:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        if self.timer.sync is not None:
+            self.timer.sync()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        if self.timer.sync is not None:
+            self.timer.sync()
+        self.timer.record(self.name, time.perf_counter_ns() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class PhaseTimer:
+    """
+    with timer.phase("env_step"): ...   times one call of a phase (phases may nest)
+    timer.count("env_steps")            bumps a counter
+    `sync` (e.g. torch.cuda.synchronize) is called around each span so GPU work lands in the
+    phase that queued it instead of the next one that blocks.
+    """
+
+    def __init__(self, enabled=True, sync=None):
+        self.enabled = enabled
+        self.sync = sync
+        self.phases = {}
+        self.counters = {}
+        self._started_ns = time.perf_counter_ns()
+
+    def phase(self, name):
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def record(self, name, ns):
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = _PhaseStats()
+        stats.add(ns)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self):
+        wall_ns = time.perf_counter_ns() - self._started_ns
+        phases = {}
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].total_ns):
+            phases[name] = {
+                "count": stats.count,
+                "totalMs": round(stats.total_ns / 1e6, 3),
+                "sharePct": round(100 * stats.total_ns / max(wall_ns, 1), 2),
+                "meanUs": round(stats.total_ns / stats.count / 1000, 2),
+                "minUs": round(stats.min_ns / 1000, 2),
+                "maxUs": round(stats.max_ns / 1000, 2),
+                "p50Us": round(stats.quantile_us(0.5), 2),
+                "p95Us": round(stats.quantile_us(0.95), 2),
+                "p99Us": round(stats.quantile_us(0.99), 2),
+                # [upper edge in µs, count] for every non-empty bucket
+                "histogram": [[2 ** i, n] for i, n in enumerate(stats.buckets) if n],
+            }
+        return {"wallMs": round(wall_ns / 1e6, 3), "phases": phases, "counters": dict(self.counters)}
+
+    def table(self, top=12):
+        """The heaviest phases as text lines, for logs."""
+        lines = []
+        for name, stats in list(self.summary()["phases"].items())[:top]:
+            lines.append(f"{name:<18} {stats['totalMs'] / 1000:9.2f}s {stats['sharePct']:6.1f}% "
+                         f"{stats['count']:>9} calls  mean {stats['meanUs']:.1f}us  p95 <={stats['p95Us']:.0f}us")
+        return lines
+
+
+class PeriodicProfiler:
+    """
+    Call step() once per training step: steps [every, every + steps), [2 * every, ...) and so on
+    are captured with `kind` ('cprofile' or 'torch'), one file per capture in out_dir.
+    """
+
+    KINDS = ("cprofile", "torch")
+
+    def __init__(self, kind, out_dir, every=1000, steps=20):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown profiler {kind!r}; expected one of {', '.join(self.KINDS)}")
+        self.kind = kind
+        self.out_dir = out_dir
+        self.every = max(1, int(every))
+        self.steps = max(1, int(steps))
+        self.captures = []
+        self._step = 0
+        self._active = None
+        self._first_step = 0
+
+    def step(self):
+        self._step += 1
+        if self._active is None:
+            if self._step % self.every == 0:
+                self._start()
+        elif self._step - self._first_step >= self.steps:
+            self._finish(self.steps)
+
+    def _start(self):
+        self._first_step = self._step
+        if self.kind == "cprofile":
+            import cProfile
+            self._active = cProfile.Profile()
+            self._active.enable()
+        else:
+            import torch
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._active = torch.profiler.profile(activities=activities)
+            self._active.__enter__()
+
+    def stop(self):
+        """End a capture in progress after the last training step, writing its file."""
+        if self._active is not None:
+            self._finish(self._step - self._first_step + 1)
+
+    def _finish(self, steps):
+        os.makedirs(self.out_dir, exist_ok=True)
+        stem = os.path.join(self.out_dir, f"{self.kind}-step{self._first_step}")
+        if self.kind == "cprofile":
+            self._active.disable()
+            path = stem + ".prof"
+            self._active.dump_stats(path)
+        else:
+            self._active.__exit__(None, None, None)
+            path = stem + ".json"
+            self._active.export_chrome_trace(path)
+        self._active = None
+        self.captures.append({"step": self._first_step, "steps": steps, "path": path})
@@ -0,0 +1,211 @@
+"""
+Backend side of td3/fork_server.py: keeps one preloaded fork server running and starts runs in
+it. A run looks like a subprocess.Popen to JobManager (stdout lines, poll, wait, terminate,
+kill), but starts in milliseconds because it is forked from a process that has already imported
+torch and loaded the CSV features. A fork server that dies is restarted. After `recycle_after`
+runs a replacement starts in the background; runs keep going to the current server until the
+replacement accepts connections, then the old one finishes its runs and exits. Fork server
+output goes to `log_path`.
+"""
+import itertools
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PID_PREFIX = "@@pid "  # must match td3/fork_server.py
+EXIT_PREFIX = "@@exit "
+
+logger = logging.getLogger(__name__)
+
+
+def _try_connect(socket_path):
+    """A connection to a listening fork server, or None if it is not accepting yet."""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path)
+        return conn
+    except (FileNotFoundError, ConnectionRefusedError):
+        conn.close()
+        return None
+
+
+class ForkedRun:
+    """One run forked by the fork server, driven through its socket."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._lines = conn.makefile("r", encoding="utf-8", errors="replace")
+        self.stdout = self
+        self.pid = None
+        self.returncode = None
+        self._done = threading.Event()
+        # The child announces its pid first, so it can be signalled right after spawn()
+        first = self._lines.readline()
+        self._pending = [first] if first else []
+        if first.startswith(PID_PREFIX):
+            self.pid = int(first[len(PID_PREFIX):])
+            self._pending = []
+
+    def __iter__(self):
+        for line in itertools.chain(self._pending, self._lines):
+            if line.startswith(PID_PREFIX) and self.pid is None:
+                self.pid = int(line[len(PID_PREFIX):])
+            elif line.startswith(EXIT_PREFIX):
+                self.returncode = int(line[len(EXIT_PREFIX):])
+                break
+            else:
+                yield line
+        if self.returncode is None:
+            self.returncode = -signal.SIGKILL  # the fork server went away mid-run
+        self._done.set()
+
+    def close(self):
+        self._lines.close()
+        self._conn.close()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired("forked run", timeout)
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.pid is None or self.returncode is not None:
+            return
+        try:
+            os.kill(self.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class ForkServer:
+    def __init__(self, td3_dir, env=None, preload=None, recycle_after=50, start_timeout=120, log_path=None):
+        self.td3_dir = td3_dir
+        self.env = env
+        self.preload = preload
+        self.recycle_after = recycle_after
+        self.start_timeout = start_timeout
+        self.log_path = log_path or os.path.join(td3_dir, "logs", "fork_server.log")
+        self._dir = tempfile.mkdtemp(prefix="td3-forkserver-")
+        self._process = None
+        self._socket_path = None
+        self._next = None  # (process, socket_path) of a replacement that is still warming up
+        self._runs = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Launch a fork server in the background; spawn() waits until it is listening."""
+        with self._lock:
+            self._start()
+
+    def _launch(self):
+        self._generation += 1
+        socket_path = os.path.join(self._dir, f"fork-{self._generation}.sock")
+        command = [sys.executable, "fork_server.py", "--socket", socket_path]
+        if self.preload:
+            command += ["--preload", self.preload]
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, "ab") as log:
+            process = subprocess.Popen(
+                command, cwd=self.td3_dir, env=self.env, stdout=log, stderr=subprocess.STDOUT,
+            )
+        return process, socket_path
+
+    def _start(self):
+        self._process, self._socket_path = self._launch()
+        self._runs = 0
+
+    def _connect(self):
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"fork server exited with code {self._process.returncode}; see {self.log_path}")
+            conn = _try_connect(self._socket_path)
+            if conn is not None:
+                return conn
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"fork server did not start in time; see {self.log_path}")
+            time.sleep(0.05)
+
+    def _promote(self):
+        """
+        Switch to the warming replacement if it accepts connections, retiring the current
+        server; returns a connection to it, or None (keep using the current server).
+        """
+        if self._next is None:
+            return None
+        process, socket_path = self._next
+        if process.poll() is not None:
+            logger.error(f"Replacement fork server exited with code {process.returncode}; see {self.log_path}")
+            self._next = None
+            return None
+        conn = _try_connect(socket_path)
+        if conn is None:
+            return None
+        if self._process is not None and self._process.poll() is None:
+            self._retire(self._process, self._socket_path)
+        self._process, self._socket_path = process, socket_path
+        self._next = None
+        self._runs = 0
+        return conn
+
+    def _retire(self, process, socket_path):
+        """Ask an old fork server to exit once its runs have finished."""
+        try:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.connect(socket_path)
+            conn.sendall(json.dumps({"shutdown": True}).encode() + b"\n")
+            conn.close()
+        except OSError:
+            process.kill()
+        threading.Thread(target=process.wait, daemon=True).start()
+
+    def spawn(self, argv):
+        """Fork a run of `argv` (e.g. ["run_csv.py", "--csv", ...]); returns a ForkedRun."""
+        with self._lock:
+            conn = self._promote()
+            if conn is None:
+                if self._process is None or self._process.poll() is not None:
+                    if self._next is not None:
+                        # The current server crashed: wait for the replacement already warming
+                        (self._process, self._socket_path), self._next = self._next, None
+                        self._runs = 0
+                    else:
+                        self._start()  # first use, or the previous fork server crashed
+                try:
+                    conn = self._connect()
+                except RuntimeError:
+                    self._start()  # one retry with a fresh fork server
+                    conn = self._connect()
+            conn.sendall(json.dumps({"argv": list(argv)}).encode() + b"\n")
+            self._runs += 1
+            if self._runs >= self.recycle_after and self._next is None:
+                # The replacement warms up in the background; runs keep coming here until it listens
+                self._next = self._launch()
+        return ForkedRun(conn)
+
+    def close(self):
+        with self._lock:
+            for process in (self._process, self._next and self._next[0]):
+                if process is not None and process.poll() is None:
+                    process.terminate()
+            self._process = None
+            self._next = None
+        shutil.rmtree(self._dir, ignore_errors=True)